@@ -3,8 +3,9 @@ Sistema de Monitoreo Médico - Jorge Agustín
 Aplicación principal Streamlit
 """
 
+import os
 import streamlit as st
-from datetime import datetime
+from datetime import date, datetime, timedelta
 import pandas as pd
 import plotly.graph_objects as go
 import plotly.express as px
@@ -12,9 +13,15 @@ from src.core.models import PatientData, LabResult, ConditionType, AlertLevel
 from src.core.calculators import MedicalCalculator
 from src.core.validators import MedicalValidator
 from src.core import database as db
+from src.core.connection import get_connection_manager
+from src.core.snapshot import get_snapshot_manager
 from src.ui.forms import render_lab_form, render_condition_form
 from src.ui.dashboard import render_dashboard, render_alerts
-from src.ui.charts import create_trend_chart
+from src.ui.charts import create_series_chart, create_rollup_chart
+from src.ui.cache import get_query_cache
+
+# Con MEDICAL_MONITOR_SNAPSHOT=1 las lecturas usan una copia en memoria de la base
+SNAPSHOT_MODE = os.environ.get('MEDICAL_MONITOR_SNAPSHOT') == '1'
 
 # Configuración de la página
 st.set_page_config(
@@ -59,18 +66,54 @@ def initialize_session_state():
     """Inicializa el estado de la sesión"""
     if 'patient_data' not in st.session_state:
         st.session_state.patient_data = PatientData()
-        # Inicializar base de datos y cargar datos existentes
-        st.session_state.db_conn = db.init_database()
-        db.load_existing_data(st.session_state.db_conn, st.session_state.patient_data)
+        # Conexión compartida por todas las sesiones del proceso; cargar datos existentes
+        st.session_state.db_manager = get_connection_manager()
+        st.session_state.db_manager.health_check()
+        # Lecturas: la instantánea en memoria (modo snapshot) o la conexión compartida
+        st.session_state.db_reader = get_snapshot_manager() if SNAPSHOT_MODE else st.session_state.db_manager
+        db.load_existing_data(st.session_state.db_reader.cursor(), st.session_state.patient_data)
     if 'show_lab_form' not in st.session_state:
         st.session_state.show_lab_form = False
     if 'show_condition_form' not in st.session_state:
         st.session_state.show_condition_form = False
 
 
+def refresh_patient_data() -> int:
+    """
+    Trae los resultados nuevos desde la base (carga completa si se borraron datos).
+
+    Solo la llama poll_new_data: en cada rerun de la página corre una vez
+    y, sin novedades, cuesta la consulta de data_watermarks.
+
+    Returns:
+        Cantidad de resultados nuevos
+    """
+    conn = st.session_state.db_reader.cursor()
+    patient_data = st.session_state.patient_data
+    new_results = db.refresh_existing_data(conn, patient_data)
+    if new_results is None:
+        patient_data = PatientData(patient_id=patient_data.patient_id)
+        db.load_existing_data(conn, patient_data)
+        st.session_state.patient_data = patient_data
+        return len(patient_data.lab_results)
+    return new_results
+
+
+@st.fragment(run_every=timedelta(seconds=10))
+def poll_new_data():
+    """Consulta periódicamente la base y redibuja la página si hay datos nuevos"""
+    patient_data = st.session_state.patient_data
+    loaded = (dict(patient_data.clinical_watermarks), list(patient_data.conditions))
+    new_results = refresh_patient_data()
+    # También medicaciones, signos vitales, eventos o condiciones que guardó otro proceso
+    if new_results > 0 or loaded != (dict(patient_data.clinical_watermarks), list(patient_data.conditions)):
+        st.rerun(scope="app")
+
+
 def main():
     """Función principal de la aplicación"""
     initialize_session_state()
+    poll_new_data()
 
     # Header
     st.title("🏥 Sistema de Monitoreo Médico")
@@ -120,6 +163,10 @@ def main():
         else:
             st.info("Sin condiciones registradas")
 
+        cache_stats = get_query_cache().stats()
+        st.caption(f"🗃️ Caché: {cache_stats['hits']} aciertos, {cache_stats['misses']} fallos "
+                   f"({cache_stats['hit_rate']:.0%})")
+
     # Área principal
     if st.session_state.show_lab_form:
         render_lab_form()
@@ -156,25 +203,57 @@ def render_trends_tab():
     """Renderiza la pestaña de tendencias"""
     st.header("📈 Tendencias de Valores")
 
-    if not st.session_state.patient_data.lab_results:
+    if not st.session_state.patient_data.get_test_names():
         st.info("No hay datos de laboratorio para mostrar tendencias. Ingrese algunos resultados primero.")
         return
 
     # Obtener lista de tests únicos
-    test_names = list(set(r.test_name for r in st.session_state.patient_data.lab_results))
+    test_names = st.session_state.patient_data.get_test_names()
 
     if test_names:
-        selected_test = st.selectbox("Seleccione el test a visualizar:", test_names)
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            selected_test = st.selectbox("Seleccione el test a visualizar:", test_names)
+        with col2:
+            periods = {"3 meses": 90, "1 año": 365, "3 años": 3 * 365, "10 años": 10 * 365}
+            period = st.selectbox("Período:", list(periods), index=1)
 
         if selected_test:
-            results = st.session_state.patient_data.get_lab_trend(selected_test, days=365)
-            if len(results) > 1:
-                chart = create_trend_chart(results, selected_test)
+            # Corte al inicio del día: la clave de la caché no cambia en cada rerun
+            cutoff = datetime.combine(date.today(), datetime.min.time()) - timedelta(days=periods[period])
+            chart = get_query_cache().get(st.session_state.patient_data, "trend_chart",
+                                          build_trend_chart, selected_test, cutoff,
+                                          test_name=selected_test)
+            if chart is not None:
                 st.plotly_chart(chart, use_container_width=True)
             else:
                 st.info(f"Se necesitan al menos 2 mediciones de {selected_test} para mostrar tendencia.")
 
 
+def build_trend_chart(test_name: str, cutoff: datetime):
+    """
+    Consulta la base (más los resultados aún no guardados) y arma el gráfico de tendencia de un test.
+
+    Returns:
+        Figura de Plotly, o None si hay menos de 2 mediciones
+    """
+    conn = st.session_state.db_reader.cursor()
+    patient_id = st.session_state.patient_data.patient_id
+    # La resolución (puntos crudos o media diaria/semanal/mensual) depende del período
+    trend = db.load_lab_trend(conn, test_name, cutoff, patient_id=patient_id)
+    # Los resultados que la cola de ingesta todavía no guardó no están en la base
+    pending = st.session_state.patient_data.get_pending_lab_series(test_name, cutoff)
+    if pending is not None:
+        trend = trend.with_points(pending)
+    if trend.resolution != 'raw':
+        return create_rollup_chart(trend, test_name)
+
+    # Puntos crudos (load_lab_trend ya leyó la serie, con el historial archivado del período)
+    if len(trend.series) > 1:
+        return create_series_chart(trend.series, test_name)
+    return None
+
+
 def render_calculators_tab():
     """Renderiza la pestaña de calculadoras médicas"""
     st.header("🧮 Calculadoras Médicas")
@@ -184,13 +263,14 @@ def render_calculators_tab():
     calculator = MedicalCalculator()
 
     # Obtener valores más recientes si existen
-    latest_creatinine = patient_data.get_latest_lab("Creatinina")
-    latest_tsh = patient_data.get_latest_lab("TSH")
-    latest_t4 = patient_data.get_latest_lab("T4 Libre")
-    latest_calcium = patient_data.get_latest_lab("Calcio")
-    latest_pth = patient_data.get_latest_lab("PTH")
-    latest_phosphorus = patient_data.get_latest_lab("Fósforo")
-    latest_hemoglobin = patient_data.get_latest_lab("Hemoglobina")
+    latest = patient_data.get_latest_snapshot()
+    latest_creatinine = latest.get("Creatinina")
+    latest_tsh = latest.get("TSH")
+    latest_t4 = latest.get("T4 Libre")
+    latest_calcium = latest.get("Calcio")
+    latest_pth = latest.get("PTH")
+    latest_phosphorus = latest.get("Fósforo")
+    latest_hemoglobin = latest.get("Hemoglobina")
 
     # Calculadora eGFR
     with st.expander("Tasa de Filtración Glomerular (eGFR)", expanded=True):
@@ -382,7 +462,7 @@ def render_questions_tab():
     questions = []
 
     # Generar preguntas basadas en los datos disponibles
-    if patient.lab_results:
+    if patient.get_test_names():
         # Buscar valores críticos
         critical_values = patient.get_critical_values()
         for value in critical_values:
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Script para archivar el historial antiguo en Parquet.
+Mueve laboratorios, signos vitales y eventos anteriores a la fecha de corte
+a archivos zstd particionados por paciente y mes. Las consultas siguen
+viéndolos a través de database.table_source(). Después reordena por
+paciente las filas que quedan en la base.
+
+Uso: python archive_data.py AAAA-MM-DD [directorio]
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from datetime import datetime
+from src.core.database import init_database, recluster
+from src.core.archive import archive_old_data
+
+
+def archive_data(cutoff: datetime, archive_dir: str = "archive"):
+    """Archiva las filas anteriores a cutoff."""
+    conn = init_database('medical_data.db')
+    archived = archive_old_data(conn, cutoff, archive_dir)
+    reclustered = recluster(conn)
+    hot_rows = conn.execute("SELECT COUNT(*) FROM lab_results").fetchone()[0]
+    conn.close()
+
+    print(f"📦 Archivo histórico (anterior al {cutoff.strftime('%d/%m/%Y')}) en {os.path.abspath(archive_dir)}:")
+    for table, rows in archived.items():
+        print(f"   - {table}: {rows} filas archivadas")
+    print(f"\n🔀 Tablas reordenadas por paciente: {', '.join(reclustered)}")
+    print(f"🗄️ Quedan {hot_rows} resultados de laboratorio en medical_data.db")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Uso: python archive_data.py AAAA-MM-DD [directorio]")
+        sys.exit(1)
+    archive_data(datetime.strptime(sys.argv[1], "%Y-%m-%d"), *sys.argv[2:3])
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Script para medir el tiempo de arranque de sesión (carga de laboratorios)
+y de escritura de resultados.
+Genera resultados sintéticos en una base en memoria y cronometra
+load_existing_data para distintos volúmenes, y save_lab_result frente a
+save_lab_results para una importación de 50.000 filas.
+
+save_lab_result paga una transacción y tres sentencias por fila (unos 9 ms):
+se mide sobre una muestra de SAVE_SAMPLE filas y se extrapola, porque las
+50.000 filas tardarían varios minutos.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import time
+from datetime import datetime, timedelta
+from src.core.models import PatientData, LabResult, AlertLevel
+from src.core import database as db
+
+SIZES = (10_000, 100_000, 1_000_000)
+SAVE_ROWS = 50_000
+SAVE_SAMPLE = 1_000
+
+
+def create_synthetic_labs(conn, rows: int):
+    """Inserta `rows` resultados sintéticos repartidos en 40 tests."""
+    conn.execute("DELETE FROM lab_results")
+    conn.execute("""
+        INSERT INTO lab_results
+        (test_name, value, unit, date, reference_min, reference_max, alert_level, notes)
+        SELECT
+            'Test ' || (i % 40),
+            (i % 97) / 10.0,
+            'mg/dL',
+            TIMESTAMP '2020-01-01' + to_minutes(CAST(i AS BIGINT) * 7),
+            1.0,
+            8.0,
+            CASE WHEN i % 97 > 80 THEN 'critico' WHEN i % 97 > 60 THEN 'alerta' ELSE 'normal' END,
+            CASE WHEN i % 10 = 0 THEN 'control' ELSE '' END
+        FROM range(?) t(i)
+    """, [rows])
+    db.rebuild_lab_summaries(conn)
+
+
+def bench_load(sizes=SIZES):
+    """Imprime el tiempo de carga para cada volumen."""
+    conn = db.init_database(":memory:")
+
+    print("⏱️ Tiempo de carga de laboratorios (load_existing_data):")
+    for rows in sizes:
+        create_synthetic_labs(conn, rows)
+        patient_data = PatientData()
+        start = time.perf_counter()
+        db.load_existing_data(conn, patient_data)
+        elapsed = time.perf_counter() - start
+        print(f"   - {rows:>9,} filas: {elapsed:7.2f} s "
+              f"({rows / elapsed:,.0f} filas/s, {len(patient_data.get_test_names())} tests)")
+
+    conn.close()
+
+
+def create_synthetic_results(rows: int) -> list:
+    """Genera `rows` LabResult sintéticos repartidos en 40 tests."""
+    start = datetime(2020, 1, 1)
+    return [
+        LabResult(
+            test_name=f"Test {i % 40}",
+            value=(i % 97) / 10.0,
+            unit="mg/dL",
+            date=start + timedelta(minutes=7 * i),
+            reference_min=1.0,
+            reference_max=8.0,
+            alert_level=AlertLevel.CRITICO if i % 97 > 80 else AlertLevel.NORMAL,
+        )
+        for i in range(rows)
+    ]
+
+
+def bench_save(rows: int = SAVE_ROWS, sample: int = SAVE_SAMPLE):
+    """Compara la escritura fila por fila (estimada con una muestra) con la escritura en lote."""
+    results = create_synthetic_results(rows)
+    print(f"💾 Escritura de {rows:,} resultados:")
+
+    sample = min(sample, rows)
+    conn = db.init_database(":memory:")
+    start = time.perf_counter()
+    for result in results[:sample]:
+        db.save_lab_result(conn, result)
+    per_row = (time.perf_counter() - start) * rows / sample
+    conn.close()
+    print(f"   - save_lab_result (una transacción por fila): {per_row:7.2f} s "
+          f"(estimado con {sample:,} filas, {per_row / rows * 1000:.1f} ms/fila)")
+
+    conn = db.init_database(":memory:")
+    start = time.perf_counter()
+    ids = db.save_lab_results(conn, results)
+    batched = time.perf_counter() - start
+    conn.close()
+    print(f"   - save_lab_results (una transacción):          {batched:7.2f} s "
+          f"({len(ids):,} ids, {per_row / batched:.0f}x)")
+
+
+if __name__ == "__main__":
+    bench_load([int(arg) for arg in sys.argv[1:]] or SIZES)
+    bench_save()
@@ -11,45 +11,13 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from datetime import datetime
 from src.core.models import LabResult, PatientData
 from src.core.validators import AlertLevel
-import duckdb
+from src.core.database import init_database, upsert_lab_results, ALERT_LEVEL_LOOKUP, DEFAULT_PATIENT_ID
 
 def load_historical_data():
     """Carga los datos históricos de laboratorio."""
 
     # Inicializar base de datos
-    conn = duckdb.connect('medical_data.db')
-
-    # Crear tablas si no existen
-    conn.execute("""
-        CREATE SEQUENCE IF NOT EXISTS lab_results_seq START 1
-    """)
-
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS lab_results (
-            id INTEGER PRIMARY KEY DEFAULT nextval('lab_results_seq'),
-            test_name VARCHAR,
-            value DOUBLE,
-            unit VARCHAR,
-            date DATE,
-            reference_min DOUBLE,
-            reference_max DOUBLE,
-            alert_level VARCHAR,
-            notes VARCHAR,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS medical_conditions (
-            condition VARCHAR PRIMARY KEY,
-            active BOOLEAN,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-
-    # Limpiar datos anteriores
-    conn.execute("DELETE FROM lab_results")
-    conn.execute("DELETE FROM medical_conditions")
+    conn = init_database('medical_data.db')
 
     # Datos históricos organizados por fecha
     historical_data = {
@@ -246,8 +214,8 @@ def load_historical_data():
         ],
     }
 
-    # Insertar todos los datos históricos
-    total_inserted = 0
+    # Preparar todos los datos históricos
+    lab_results = []
     for date, results in historical_data.items():
         for test_name, value, unit, ref_min, ref_max, notes in results:
             # Determinar nivel de alerta
@@ -266,12 +234,14 @@ def load_historical_data():
                 else:
                     alert_level = "normal"
 
-            conn.execute("""
-                INSERT INTO lab_results
-                (test_name, value, unit, date, reference_min, reference_max, alert_level, notes)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """, [test_name, value, unit, date, ref_min, ref_max, alert_level, notes or ""])
-            total_inserted += 1
+            lab_results.append(LabResult(
+                test_name=test_name, value=value, unit=unit, date=date,
+                reference_min=ref_min, reference_max=ref_max,
+                alert_level=ALERT_LEVEL_LOOKUP[alert_level], notes=notes or ""
+            ))
+
+    # Carga idempotente: solo escribe resultados nuevos o corregidos
+    counts = upsert_lab_results(conn, lab_results, source="load_historical_data")
 
     # Establecer condiciones médicas confirmadas
     conditions = [
@@ -292,27 +262,29 @@ def load_historical_data():
         """, [condition, active])
 
     # Verificar inserción
-    count_labs = conn.execute("SELECT COUNT(*) FROM lab_results").fetchone()[0]
-    count_conditions = conn.execute("SELECT COUNT(*) FROM medical_conditions").fetchone()[0]
+    patient = [DEFAULT_PATIENT_ID]
+    count_labs = conn.execute("SELECT COUNT(*) FROM lab_results WHERE patient_id = ?", patient).fetchone()[0]
+    count_conditions = conn.execute("SELECT COUNT(*) FROM medical_conditions WHERE patient_id = ?",
+                                    patient).fetchone()[0]
 
     # Obtener resumen de valores críticos más recientes
     critical_values = conn.execute("""
         SELECT test_name, value, unit, date, notes
-        FROM lab_results
-        WHERE alert_level IN ('critico', 'alerta')
-        AND date = (SELECT MAX(date) FROM lab_results WHERE test_name = lab_results.test_name)
+        FROM lab_latest
+        WHERE patient_id = ? AND alert_level IN ('critico', 'crítico', 'alerta')
         ORDER BY
             CASE alert_level
-                WHEN 'critico' THEN 1
                 WHEN 'alerta' THEN 2
+                ELSE 1
             END,
             test_name
         LIMIT 10
-    """).fetchall()
+    """, patient).fetchall()
 
     conn.close()
 
     print(f"✅ Datos históricos cargados exitosamente:")
+    print(f"   - {counts.inserted} nuevos, {counts.updated} actualizados, {counts.unchanged} sin cambios")
     print(f"   - {count_labs} resultados de laboratorio totales")
     print(f"   - {count_conditions} condiciones médicas")
     print(f"   - Datos desde junio hasta septiembre 2025")
@@ -10,46 +10,14 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from datetime import datetime
 from src.core.models import LabResult, PatientData
 from src.core.validators import AlertLevel
-import duckdb
+from src.core.database import init_database, upsert_lab_results, ALERT_LEVEL_LOOKUP
 import json
 
 def load_lab_data():
     """Carga los datos de laboratorio del 06/09/2025."""
 
     # Inicializar base de datos
-    conn = duckdb.connect('medical_data.db')
-
-    # Crear tablas si no existen
-    conn.execute("""
-        CREATE SEQUENCE IF NOT EXISTS lab_results_seq START 1
-    """)
-
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS lab_results (
-            id INTEGER PRIMARY KEY DEFAULT nextval('lab_results_seq'),
-            test_name VARCHAR,
-            value DOUBLE,
-            unit VARCHAR,
-            date DATE,
-            reference_min DOUBLE,
-            reference_max DOUBLE,
-            alert_level VARCHAR,
-            notes VARCHAR,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS medical_conditions (
-            condition VARCHAR PRIMARY KEY,
-            active BOOLEAN,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-
-    # Limpiar datos anteriores
-    conn.execute("DELETE FROM lab_results")
-    conn.execute("DELETE FROM medical_conditions")
+    conn = init_database('medical_data.db')
 
     # Fecha de los análisis
     lab_date = datetime(2025, 9, 6)
@@ -105,7 +73,8 @@ def load_lab_data():
         ("PCR", 2.8, "mg/L", 0, 5, None),
     ]
 
-    # Insertar resultados de laboratorio
+    # Preparar resultados de laboratorio
+    results = []
     for test_name, value, unit, ref_min, ref_max, notes in lab_results:
         # Determinar nivel de alerta
         if notes and "CRÍTICO" in notes:
@@ -120,11 +89,14 @@ def load_lab_data():
             else:
                 alert_level = "normal"
 
-        conn.execute("""
-            INSERT INTO lab_results
-            (test_name, value, unit, date, reference_min, reference_max, alert_level, notes)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """, [test_name, value, unit, lab_date, ref_min, ref_max, alert_level, notes or ""])
+        results.append(LabResult(
+            test_name=test_name, value=value, unit=unit, date=lab_date,
+            reference_min=ref_min, reference_max=ref_max,
+            alert_level=ALERT_LEVEL_LOOKUP[alert_level], notes=notes or ""
+        ))
+
+    # Carga idempotente: solo escribe resultados nuevos o corregidos
+    counts = upsert_lab_results(conn, results, source="load_initial_data")
 
     # Establecer condiciones médicas conocidas
     conditions = [
@@ -139,7 +111,7 @@ def load_lab_data():
 
     for condition, active in conditions:
         conn.execute("""
-            INSERT INTO medical_conditions (condition, active)
+            INSERT OR REPLACE INTO medical_conditions (condition, active)
             VALUES (?, ?)
         """, [condition, active])
 
@@ -150,6 +122,7 @@ def load_lab_data():
     conn.close()
 
     print(f"✅ Datos cargados exitosamente:")
+    print(f"   - {counts.inserted} nuevos, {counts.updated} actualizados, {counts.unchanged} sin cambios")
     print(f"   - {count_labs} resultados de laboratorio")
     print(f"   - {count_conditions} condiciones médicas")
     print(f"\n📅 Fecha de los análisis: 06/09/2025")
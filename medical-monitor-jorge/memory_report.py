@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Script para medir la memoria ocupada por los datos del paciente.
+Carga PatientData desde medical_data.db y reporta bytes por registro y el
+tamaño total en memoria, comparando el almacén columnar con lo que ocuparían
+los mismos resultados como LabResult o CompactLabResult.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import resource
+import tracemalloc
+import duckdb
+from src.core.models import PatientData, CompactLabResult
+from src.core.memory import records_footprint, patient_footprint
+from src.core import database as db
+
+
+def memory_report(db_path: str = 'medical_data.db'):
+    """Imprime el reporte de memoria para la base de datos indicada."""
+
+    conn = duckdb.connect(db_path, read_only=True)
+
+    tracemalloc.start()
+    patient_data = PatientData()
+    db.load_existing_data(conn, patient_data)
+    loaded_bytes, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    conn.close()
+
+    report = patient_footprint(patient_data)
+    objects = records_footprint(patient_data.lab_results)
+    compact = records_footprint(CompactLabResult.from_lab_result(r) for r in patient_data.lab_results)
+    # ru_maxrss está en KB en Linux y en bytes en macOS
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform != 'darwin':
+        max_rss *= 1024
+
+    print(f"📦 Memoria de PatientData ({db_path}):")
+    for name, stats in report['collections'].items():
+        print(f"   - {name}: {stats['records']} registros, "
+              f"{stats['bytes']:,} bytes ({stats['bytes_per_record']:.0f} bytes/registro)")
+
+    print(f"\n🧪 Resultados de laboratorio por representación:")
+    labs = report['collections']['lab_results']
+    print(f"   - ColumnarLabStore (en uso): {labs['bytes_per_record']:.0f} bytes/registro")
+    print(f"   - LabResult: {objects['bytes_per_record']:.0f} bytes/registro")
+    print(f"   - CompactLabResult: {compact['bytes_per_record']:.0f} bytes/registro")
+
+    print(f"\n📊 Totales:")
+    print(f"   - PatientData en memoria: {report['total_bytes']:,} bytes")
+    print(f"   - Asignado durante la carga: {loaded_bytes:,} bytes (pico {peak_bytes:,})")
+    print(f"   - RSS máximo del proceso: {max_rss:,} bytes")
+
+
+if __name__ == "__main__":
+    memory_report(sys.argv[1] if len(sys.argv) > 1 else 'medical_data.db')
@@ -0,0 +1,107 @@
+"""
+Archivo histórico en Parquet.
+Mueve las filas anteriores a una fecha de corte desde las tablas de DuckDB a
+archivos Parquet comprimidos con zstd, particionados por paciente y mes
+(<directorio>/<tabla>/patient_id=<id>/month=<AAAA-MM>/part_<lote>_<n>.parquet).
+Las consultas de database.py los vuelven a unir con table_source().
+"""
+
+import glob
+import os
+import re
+import uuid
+from datetime import date, datetime
+from typing import Dict, Iterable
+
+import duckdb
+
+from src.core import database as db
+
+_PARTITION_PATTERN = re.compile(r"patient_id=(\d+)[\\/]month=(\d{4})-(\d{2})")
+
+
+def archive_old_data(conn: duckdb.DuckDBPyConnection, cutoff: datetime, archive_dir: str = "archive",
+                     tables: Iterable[str] = db.ARCHIVABLE_TABLES) -> Dict[str, int]:
+    """
+    Archiva las filas con fecha anterior al corte.
+
+    Cada tabla se archiva en una transacción: los archivos se escriben y las
+    filas se borran sobre la misma instantánea, de modo que ninguna fila
+    queda fuera o duplicada. lab_latest y lab_rollups no se tocan (siguen
+    resumiendo el historial completo).
+
+    Args:
+        conn: Conexión a la base de datos
+        cutoff: Fecha de corte (se archivan las filas con date < cutoff)
+        archive_dir: Directorio raíz del archivo
+        tables: Tablas a archivar
+
+    Returns:
+        Diccionario tabla -> filas archivadas
+    """
+    archived = {}
+    for table in tables:
+        archived[table] = _archive_table(conn, table, cutoff, os.path.abspath(archive_dir))
+    if any(archived.values()):
+        # Liberar en el archivo .db el espacio de las filas borradas
+        conn.execute("CHECKPOINT")
+    return archived
+
+
+def _archive_table(conn: duckdb.DuckDBPyConnection, table: str, cutoff: datetime, archive_dir: str) -> int:
+    columns = db.table_columns(conn, table)
+    if not columns:
+        return 0
+    # Tablas sin patient_id pertenecen al paciente por defecto
+    patient = "patient_id" if 'patient_id' in columns else f"{db.DEFAULT_PATIENT_ID} AS patient_id"
+    select = ', '.join(column for column in columns if column != 'patient_id')
+
+    target = os.path.join(archive_dir, table)
+    batch = uuid.uuid4().hex[:12]
+    written = []
+
+    conn.begin()
+    try:
+        count = conn.execute(f"SELECT COUNT(*) FROM {table} WHERE date < ?", [cutoff]).fetchone()[0]
+        if count == 0:
+            conn.rollback()
+            return 0
+
+        os.makedirs(target, exist_ok=True)
+        conn.execute(f"""
+            COPY (
+                SELECT {select}, {patient}, strftime(date, '%Y-%m') AS month
+                FROM {table}
+                WHERE date < ?
+            ) TO '{target.replace("'", "''")}' (
+                FORMAT parquet,
+                COMPRESSION zstd,
+                PARTITION_BY (patient_id, month),
+                FILENAME_PATTERN 'part_{batch}_{{i}}',
+                OVERWRITE_OR_IGNORE
+            )
+        """, [cutoff])
+        written = glob.glob(os.path.join(target, "patient_id=*", "month=*", f"part_{batch}_*.parquet"))
+
+        for path in written:
+            match = _PARTITION_PATTERN.search(path)
+            patient_id, year, month = int(match.group(1)), int(match.group(2)), int(match.group(3))
+            rows = conn.execute("SELECT COUNT(*) FROM read_parquet(?)", [path]).fetchone()[0]
+            conn.execute("""
+                INSERT INTO archive_partitions (table_name, patient_id, month, path, row_count)
+                VALUES (?, ?, ?, ?, ?)
+            """, [table, patient_id, date(year, month, 1), path, rows])
+
+        conn.execute(f"DELETE FROM {table} WHERE date < ?", [cutoff])
+        if table == 'lab_results':
+            # Los resultados archivados dejan de estar en memoria tras la próxima recarga
+            for patient_id in {int(_PARTITION_PATTERN.search(path).group(1)) for path in written}:
+                db.bump_lab_revision(conn, patient_id)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        for path in written:
+            os.remove(path)
+        raise
+
+    return count
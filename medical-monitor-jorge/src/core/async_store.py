@@ -0,0 +1,202 @@
+"""
+Acceso asíncrono a la base de datos.
+AsyncMedicalStore expone corutinas sobre las funciones de database.py para
+servicios basados en asyncio. Las llamadas a DuckDB corren en un pool de
+hilos acotado (cada hilo con su cursor de ConnectionManager), así que las
+lecturas independientes —laboratorios, condiciones, medicaciones, signos
+vitales y eventos— se ejecutan en paralelo sin bloquear el event loop.
+
+PatientData no es seguro entre hilos: los hilos solo leen, y los resultados
+se aplican al paciente en el hilo del event loop.
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, List, Optional
+
+from src.core import database as db
+from src.core.connection import ConnectionManager
+from src.core.lab_store import LabSeries, LabTrend
+from src.core.models import ClinicalEvent, LabResult, Medication, PatientData, VitalSigns
+
+
+async def _no_results() -> None:
+    """Lugar de una lectura que no hace falta dentro de un gather"""
+    return None
+
+
+class AsyncMedicalStore:
+    """
+    Fachada asíncrona de database.py sobre un ConnectionManager compartido.
+
+    Uso:
+        store = AsyncMedicalStore(get_connection_manager())
+        patient_data = await store.load_patient_data()
+        await store.save_lab_results(results)
+        await store.close()
+    """
+
+    def __init__(self, manager: ConnectionManager, max_workers: int = 4):
+        """
+        Args:
+            manager: Conexión compartida a la base de datos
+            max_workers: Consultas simultáneas como máximo
+        """
+        self.manager = manager
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="medical-store")
+
+    async def _run(self, func: Callable, *args, write: bool = False) -> Any:
+        """Ejecuta func(cursor, *args) en el pool; las escrituras se serializan con writer()"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._call, func, args, write)
+
+    def _call(self, func: Callable, args: tuple, write: bool) -> Any:
+        if write:
+            with self.manager.writer() as conn:
+                return func(conn, *args)
+        return func(self.manager.cursor(), *args)
+
+    async def load_patient_data(self, patient_data: Optional[PatientData] = None) -> PatientData:
+        """
+        Carga un paciente leyendo todas sus tablas en paralelo.
+
+        Equivale a database.load_existing_data (mismas lecturas, con sus
+        tiempos registrados): un error en una tabla se informa y no impide
+        cargar las demás.
+
+        Args:
+            patient_data: Paciente a llenar (por defecto uno nuevo)
+
+        Returns:
+            El PatientData cargado
+        """
+        if patient_data is None:
+            patient_data = PatientData()
+        watermarks = await self._run(db.data_watermarks, patient_data.patient_id)
+        loaders = db.hydration_loaders(patient_data)
+        results = await asyncio.gather(*(self._run(db.load_table, table, loader)
+                                         for table, loader in loaders.items()))
+        db.apply_hydration(patient_data, dict(zip(loaders, results)), watermarks)
+        return patient_data
+
+    async def refresh(self, patient_data: PatientData) -> Optional[int]:
+        """
+        Versión asíncrona de database.refresh_existing_data.
+
+        Lee primero data_watermarks; los laboratorios nuevos y las tablas
+        clínicas que cambiaron se leen después en paralelo.
+
+        Returns:
+            Cantidad de resultados nuevos, o None si hace falta una carga completa
+        """
+        watermark = patient_data.lab_watermark
+        watermarks = await self._run(db.data_watermarks, patient_data.patient_id, watermark)
+        if not db.lab_results_current(patient_data, watermarks):
+            return None
+
+        changed = db.changed_clinical_tables(patient_data, watermarks)
+        loaders = db.hydration_loaders(patient_data)
+        labs, *clinical = await asyncio.gather(
+            self._run(db.fetch_lab_results, patient_data.patient_id, watermark)
+            if watermarks.lab_last_id > watermark else _no_results(),
+            *(self._run(db.load_table, table, loaders[table]) for table in changed),
+            return_exceptions=True
+        )
+        if isinstance(labs, Exception):
+            raise labs
+        if patient_data.lab_watermark != watermark:
+            # Otra corutina aplicó los mismos resultados mientras se leían
+            return 0
+
+        new_results = db.add_fetched_lab_results(patient_data, labs) if labs is not None else 0
+        if set(watermarks.conditions) != set(patient_data.conditions):
+            patient_data.set_conditions(watermarks.conditions)
+        db.apply_hydration(patient_data, dict(zip(changed, clinical)), watermarks)
+        return new_results
+
+    async def load_lab_results(self, patient_id: int = db.DEFAULT_PATIENT_ID,
+                               after_id: int = 0) -> db.FetchedLabResults:
+        """Resultados de laboratorio con id mayor a after_id"""
+        return await self._run(db.fetch_lab_results, patient_id, after_id)
+
+    async def load_conditions(self, patient_id: int = db.DEFAULT_PATIENT_ID) -> list:
+        """Condiciones médicas del paciente"""
+        return await self._run(db.load_conditions, patient_id)
+
+    async def load_medications(self, patient_id: int = db.DEFAULT_PATIENT_ID) -> List[Medication]:
+        """Medicaciones del paciente"""
+        return await self._run(db.load_medications, patient_id)
+
+    async def load_vital_signs(self, patient_id: int = db.DEFAULT_PATIENT_ID,
+                               start: Optional[datetime] = None, end: Optional[datetime] = None,
+                               include_archived: bool = False) -> List[VitalSigns]:
+        """Signos vitales del paciente (con include_archived, también los archivados)"""
+        return await self._run(db.load_vital_signs, patient_id, start, end, include_archived)
+
+    async def load_clinical_events(self, patient_id: int = db.DEFAULT_PATIENT_ID,
+                                   start: Optional[datetime] = None, end: Optional[datetime] = None,
+                                   include_archived: bool = False) -> List[ClinicalEvent]:
+        """Eventos clínicos del paciente (con include_archived, también los archivados)"""
+        return await self._run(db.load_clinical_events, patient_id, start, end, include_archived)
+
+    async def load_latest_results(self, patient_id: int = db.DEFAULT_PATIENT_ID) -> dict:
+        """Último resultado de cada test (tabla lab_latest)"""
+        return await self._run(db.load_latest_results, patient_id)
+
+    async def load_lab_series(self, test_name: str, start: Optional[datetime] = None,
+                              end: Optional[datetime] = None,
+                              patient_id: int = db.DEFAULT_PATIENT_ID) -> LabSeries:
+        """Serie cruda de un test, incluido el historial archivado"""
+        return await self._run(db.load_lab_series, test_name, start, end, patient_id)
+
+    async def load_lab_trend(self, test_name: str, start: datetime, end: Optional[datetime] = None,
+                             patient_id: int = db.DEFAULT_PATIENT_ID, max_points: int = 500) -> LabTrend:
+        """Tendencia de un test con la resolución adecuada al rango"""
+        return await self._run(db.load_lab_trend, test_name, start, end, patient_id, max_points)
+
+    async def save_lab_results(self, lab_results: List[LabResult],
+                               patient_id: int = db.DEFAULT_PATIENT_ID) -> list:
+        """Guarda resultados de laboratorio en una transacción y devuelve sus ids"""
+        return await self._run(db.save_lab_results, lab_results, patient_id, write=True)
+
+    async def save_vital_signs(self, vital_signs: List[VitalSigns],
+                               patient_id: int = db.DEFAULT_PATIENT_ID) -> list:
+        """Guarda signos vitales en una transacción y devuelve sus ids"""
+        return await self._run(db.save_vital_signs, vital_signs, patient_id, write=True)
+
+    async def save_clinical_events(self, events: List[ClinicalEvent],
+                                   patient_id: int = db.DEFAULT_PATIENT_ID) -> list:
+        """Guarda eventos clínicos en una transacción y devuelve sus ids"""
+        return await self._run(db.save_clinical_events, events, patient_id, write=True)
+
+    async def query(self, sql: str, params: Optional[list] = None) -> List[tuple]:
+        """
+        Ejecuta una consulta de solo lectura.
+
+        Args:
+            sql: Consulta SQL con parámetros ?
+            params: Valores de los parámetros
+
+        Returns:
+            Filas del resultado
+        """
+        return await self._run(_fetch_all, sql, params or [])
+
+    async def execute(self, sql: str, params: Optional[list] = None) -> None:
+        """Ejecuta una sentencia de escritura serializada con las demás escrituras"""
+        await self._run(_execute, sql, params or [], write=True)
+
+    async def close(self) -> None:
+        """Espera las consultas en curso y libera el pool (la conexión sigue abierta)"""
+        await asyncio.get_running_loop().run_in_executor(None, self._executor.shutdown, True)
+
+
+def _fetch_all(conn, sql: str, params: list) -> List[tuple]:
+    return conn.execute(sql, params).fetchall()
+
+
+def _execute(conn, sql: str, params: list) -> None:
+    conn.execute(sql, params)
+
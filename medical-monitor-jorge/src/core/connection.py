@@ -0,0 +1,181 @@
+"""
+Conexión compartida a DuckDB para todo el proceso.
+Streamlit ejecuta cada sesión del navegador en su propio hilo; en lugar de
+abrir una conexión por sesión (y chocar con el bloqueo del archivo), todas
+comparten una única conexión de escritura y cada hilo usa su propio cursor.
+"""
+
+import os
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+import duckdb
+
+from src.core import database as db
+
+
+class ConnectionManager:
+    """
+    Una conexión de escritura por archivo de base de datos y un cursor por hilo.
+
+    Los cursores de DuckDB comparten la base abierta por la conexión pero no
+    son seguros entre hilos, por eso cada hilo recibe el suyo. Las escrituras
+    se serializan con writer() para evitar conflictos entre transacciones.
+    """
+
+    def __init__(self, db_path: str = "medical_data.db", read_only: bool = False):
+        """
+        Args:
+            db_path: Ruta a la base de datos
+            read_only: Abrir sin migrar y sin permitir escrituras (p. ej. reportes)
+        """
+        self.db_path = db_path
+        self.read_only = read_only
+
+        self._conn: Optional[duckdb.DuckDBPyConnection] = None
+        # Se incrementa al reconectar: invalida los cursores de la conexión anterior
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._write_lock = threading.RLock()
+        self._local = threading.local()
+        self._publish_listeners: List[Callable[[int, Optional[tuple]], None]] = []
+
+        self.reconnects = 0
+        # Cantidad de puntos de control publicados (ver publish)
+        self.published = 0
+
+    def connection(self) -> duckdb.DuckDBPyConnection:
+        """Conexión principal, abierta (y migrada) la primera vez que se pide"""
+        with self._lock:
+            if self._conn is None:
+                self._open()
+            return self._conn
+
+    def _open(self) -> None:
+        if self.read_only:
+            self._conn = duckdb.connect(self.db_path, read_only=True)
+        else:
+            self._conn = db.init_database(self.db_path)
+        self._generation += 1
+
+    def cursor(self) -> duckdb.DuckDBPyConnection:
+        """Cursor del hilo actual (se crea la primera vez o tras una reconexión)"""
+        conn = self.connection()
+        local = self._local
+        if getattr(local, 'generation', None) != self._generation:
+            local.cursor = conn.cursor()
+            local.generation = self._generation
+        return local.cursor
+
+    @contextmanager
+    def writer(self) -> Iterator[duckdb.DuckDBPyConnection]:
+        """
+        Cursor para escribir, con las escrituras de todos los hilos serializadas.
+
+        Uso:
+            with manager.writer() as conn:
+                db.save_lab_results(conn, results)
+        """
+        if self.read_only:
+            raise PermissionError(f"{self.db_path} está abierta en modo solo lectura")
+        with self._write_lock:
+            yield self.cursor()
+
+    def publish(self, tables: Optional[Iterable[str]] = None) -> int:
+        """
+        Publica lo escrito hasta ahora: hace un CHECKPOINT (el archivo .db queda
+        al día) y avisa a quienes se registraron con on_publish, p. ej. las
+        instantáneas en memoria de los dashboards.
+
+        Args:
+            tables: Tablas modificadas desde la última publicación (None = cualquiera)
+
+        Returns:
+            Número de la publicación
+        """
+        with self.writer() as conn:
+            try:
+                conn.execute("CHECKPOINT")
+            except duckdb.Error as e:
+                print(f"Error en el CHECKPOINT de {self.db_path}: {e}")
+            self.published += 1
+            version = self.published
+        changed = None if tables is None else tuple(tables)
+        for listener in list(self._publish_listeners):
+            listener(version, changed)
+        return version
+
+    def on_publish(self, listener: Callable[[int, Optional[tuple]], None]) -> None:
+        """
+        Registra una función que se llama tras cada publish().
+
+        Args:
+            listener: Recibe el número de la publicación y las tablas modificadas
+                (None si pudo cambiar cualquiera)
+        """
+        self._publish_listeners.append(listener)
+
+    def health_check(self) -> bool:
+        """
+        Verifica que la conexión responda; si no, reconecta una vez.
+
+        Returns:
+            True si la base responde (tras reconectar si hizo falta)
+        """
+        try:
+            self.cursor().execute("SELECT 1").fetchone()
+            return True
+        except duckdb.Error as e:
+            print(f"Conexión a {self.db_path} no responde, reconectando: {e}")
+
+        try:
+            self.reconnect()
+            self.cursor().execute("SELECT 1").fetchone()
+            return True
+        except duckdb.Error as e:
+            print(f"Error reconectando a {self.db_path}: {e}")
+            return False
+
+    def reconnect(self) -> None:
+        """Cierra la conexión y abre una nueva; los cursores viejos dejan de usarse"""
+        with self._write_lock, self._lock:
+            self._close()
+            self._open()
+            self.reconnects += 1
+
+    def close(self) -> None:
+        """Cierra la conexión (se reabre sola si se vuelve a pedir)"""
+        with self._write_lock, self._lock:
+            self._close()
+
+    def _close(self) -> None:
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except duckdb.Error:
+                pass
+            self._conn = None
+
+
+_managers: Dict[str, ConnectionManager] = {}
+_managers_lock = threading.Lock()
+
+
+def get_connection_manager(db_path: str = "medical_data.db") -> ConnectionManager:
+    """
+    Administrador de conexión compartido por todo el proceso para un archivo.
+
+    Args:
+        db_path: Ruta a la base de datos
+
+    Returns:
+        El mismo ConnectionManager para todas las llamadas con la misma ruta
+    """
+    key = db_path if db_path == ":memory:" else os.path.abspath(db_path)
+    with _managers_lock:
+        manager = _managers.get(key)
+        if manager is None:
+            manager = ConnectionManager(db_path)
+            _managers[key] = manager
+        return manager
@@ -2,181 +2,1832 @@
 Módulo de base de datos para el sistema de monitoreo médico.
 """
 
+import hashlib
+import logging
+import time
 import duckdb
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Optional
-from src.core.models import PatientData, LabResult, ConditionType, AlertLevel
+from functools import partial
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+from src.core.models import (PatientData, LabResult, ConditionType, AlertLevel,
+                             Medication, VitalSigns, ClinicalEvent, to_timestamp)
+from src.core.lab_store import ALERT_CODES, LabSeries, LabTrend
 
+logger = logging.getLogger(__name__)
 
-def init_database(db_path: str = "medical_data.db") -> duckdb.DuckDBPyConnection:
-    """
-    Inicializa la base de datos y crea las tablas si no existen.
+# Niveles de alerta tal como se guardan en la base (con y sin tilde)
+ALERT_LEVEL_LOOKUP = {
+    "normal": AlertLevel.NORMAL,
+    "atencion": AlertLevel.ATENCION,
+    "atención": AlertLevel.ATENCION,
+    "alerta": AlertLevel.ALERTA,
+    "critico": AlertLevel.CRITICO,
+    "crítico": AlertLevel.CRITICO,
+}
 
-    Args:
-        db_path: Ruta a la base de datos
+# Condiciones guardadas en la base y su ConditionType
+CONDITION_MAP = {
+    "Insuficiencia Renal Crónica": ConditionType.IRC_TERMINAL,
+    "Hipotiroidismo": ConditionType.HIPOTIROIDISMO,
+    "Hiperparatiroidismo Secundario": ConditionType.HIPERPARATIROIDISMO,
+    "Anemia": ConditionType.ANEMIA,
+    "Hipertensión": ConditionType.HIPERTENSION,
+    "Diabetes": ConditionType.DIABETES,
+    "Enfermedad Cardíaca": ConditionType.ENFERMEDAD_CARDIACA
+}
 
-    Returns:
-        Conexión a la base de datos
-    """
-    conn = duckdb.connect(db_path)
+# Paciente al que pertenecen los datos de bases creadas antes de tener varios pacientes
+DEFAULT_PATIENT_ID = 1
 
-    # Crear secuencia para IDs
-    conn.execute("""
-        CREATE SEQUENCE IF NOT EXISTS lab_results_seq START 1
-    """)
 
-    # Crear tabla de resultados de laboratorio
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS lab_results (
+# Esquema canónico: la única definición de cada tabla ({table} es el nombre a crear)
+TABLES = {
+    'patients': """
+        CREATE TABLE IF NOT EXISTS {table} (
+            id INTEGER PRIMARY KEY,
+            name VARCHAR,
+            age INTEGER,
+            weight DOUBLE,
+            height DOUBLE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """,
+    'lab_results': """
+        CREATE TABLE IF NOT EXISTS {table} (
             id INTEGER PRIMARY KEY DEFAULT nextval('lab_results_seq'),
             test_name VARCHAR,
             value DOUBLE,
             unit VARCHAR,
-            date DATE,
+            date TIMESTAMP,
             reference_min DOUBLE,
             reference_max DOUBLE,
             alert_level VARCHAR,
             notes VARCHAR,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            patient_id INTEGER DEFAULT 1,
+            -- Origen de la fila si la cargó upsert_lab_results, y su clave de contenido
+            source VARCHAR,
+            content_key VARCHAR UNIQUE
         )
-    """)
-
-    # Crear tabla de condiciones médicas
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS medical_conditions (
-            condition VARCHAR PRIMARY KEY,
-            active BOOLEAN,
+    """,
+    # Último resultado de cada test (lo mantienen las funciones save_lab_result*)
+    'lab_latest': """
+        CREATE TABLE IF NOT EXISTS {table} (
+            patient_id INTEGER,
+            test_name VARCHAR,
+            lab_result_id INTEGER,
+            value DOUBLE,
+            unit VARCHAR,
+            date TIMESTAMP,
+            reference_min DOUBLE,
+            reference_max DOUBLE,
+            alert_level VARCHAR,
+            notes VARCHAR,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (patient_id, test_name)
+        )
+    """,
+    # Resúmenes por test e intervalo (día, semana, mes) para tendencias largas
+    'lab_rollups': """
+        CREATE TABLE IF NOT EXISTS {table} (
+            patient_id INTEGER,
+            test_name VARCHAR,
+            resolution VARCHAR,
+            bucket TIMESTAMP,
+            count INTEGER,
+            sum DOUBLE,
+            min DOUBLE,
+            max DOUBLE,
+            PRIMARY KEY (patient_id, test_name, resolution, bucket)
+        )
+    """,
+    # Archivos Parquet del archivo histórico: uno o más por tabla, paciente y mes
+    'archive_partitions': """
+        CREATE TABLE IF NOT EXISTS {table} (
+            table_name VARCHAR,
+            patient_id INTEGER,
+            month DATE,
+            path VARCHAR,
+            row_count BIGINT,
+            archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (table_name, patient_id, month, path)
+        )
+    """,
+    # Último número de secuencia de cada archivo de cola de ingesta ya guardado
+    'ingest_log': """
+        CREATE TABLE IF NOT EXISTS {table} (
+            spool VARCHAR PRIMARY KEY,
+            last_seq BIGINT,
             updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         )
-    """)
-
-    # Crear tabla de medicaciones
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS medications (
-            id INTEGER PRIMARY KEY,
+    """,
+    # Revisión de los laboratorios de cada paciente: crece cuando cambian filas
+    # ya cargadas (correcciones de upsert_lab_results, archivo a Parquet)
+    'lab_revisions': """
+        CREATE TABLE IF NOT EXISTS {table} (
+            patient_id INTEGER PRIMARY KEY,
+            revision BIGINT,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """,
+    'medical_conditions': """
+        CREATE TABLE IF NOT EXISTS {table} (
+            patient_id INTEGER DEFAULT 1,
+            condition VARCHAR,
+            active BOOLEAN,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (patient_id, condition)
+        )
+    """,
+    'medications': """
+        CREATE TABLE IF NOT EXISTS {table} (
+            id INTEGER PRIMARY KEY DEFAULT nextval('medications_seq'),
             name VARCHAR,
+            type VARCHAR,
             dose VARCHAR,
             frequency VARCHAR,
+            route VARCHAR,
             start_date DATE,
             end_date DATE,
             active BOOLEAN,
             notes VARCHAR,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            patient_id INTEGER DEFAULT 1
+        )
+    """,
+    'vital_signs': """
+        CREATE TABLE IF NOT EXISTS {table} (
+            id INTEGER PRIMARY KEY DEFAULT nextval('vital_signs_seq'),
+            date TIMESTAMP,
+            blood_pressure_systolic INTEGER,
+            blood_pressure_diastolic INTEGER,
+            heart_rate INTEGER,
+            oxygen_saturation INTEGER,
+            temperature DOUBLE,
+            respiratory_rate INTEGER,
+            glasgow_score INTEGER,
+            notes VARCHAR,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            patient_id INTEGER DEFAULT 1
+        )
+    """,
+    'medical_events': """
+        CREATE TABLE IF NOT EXISTS {table} (
+            id INTEGER PRIMARY KEY DEFAULT nextval('medical_events_seq'),
+            date TIMESTAMP,
+            type VARCHAR,
+            title VARCHAR,
+            description VARCHAR,
+            urgency VARCHAR,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            patient_id INTEGER DEFAULT 1
+        )
+    """,
+    'monitoring_targets': """
+        CREATE TABLE IF NOT EXISTS {table} (
+            parameter VARCHAR PRIMARY KEY,
+            target_min DOUBLE,
+            target_max DOUBLE,
+            unit VARCHAR,
+            frequency VARCHAR,
+            critical BOOLEAN,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         )
+    """,
+    'dialysis_recommendations': """
+        CREATE TABLE IF NOT EXISTS {table} (
+            id INTEGER PRIMARY KEY,
+            date DATE,
+            mode VARCHAR,
+            parameters VARCHAR,
+            rationale VARCHAR,
+            priority VARCHAR,
+            active BOOLEAN,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            patient_id INTEGER DEFAULT 1
+        )
+    """,
+}
+
+# Secuencias de ids y la tabla que las usa
+SEQUENCES = {
+    'lab_results_seq': 'lab_results',
+    'medications_seq': 'medications',
+    'vital_signs_seq': 'vital_signs',
+    'medical_events_seq': 'medical_events',
+}
+
+# Índices secundarios: (nombre, tabla, columnas)
+INDEXES = [
+    # Series de un test en un rango de fechas (gráficos de tendencia, último valor)
+    ('idx_lab_results_test_date', 'lab_results', 'test_name, date'),
+    ('idx_lab_results_patient_date', 'lab_results', 'patient_id, date'),
+    ('idx_medications_start_date', 'medications', 'start_date'),
+    ('idx_vital_signs_date', 'vital_signs', 'date'),
+    ('idx_medical_events_date', 'medical_events', 'date'),
+]
+
+# Orden físico de las tablas por paciente: DuckDB guarda el mínimo y el máximo
+# de cada columna por grupo de filas, así que con las filas agrupadas por
+# paciente (y por test) una consulta de un paciente saltea los grupos ajenos
+CLUSTER_KEYS = {
+    'lab_results': 'patient_id, test_name, date, id',
+    'medical_conditions': 'patient_id, condition',
+    'medications': 'patient_id, start_date, id',
+    'vital_signs': 'patient_id, date, id',
+    'medical_events': 'patient_id, date, id',
+}
+
+# Fecha y hora que antes se guardaban por separado (date DATE y time VARCHAR
+# 'HH:MM'): al recrear la tabla o leer un archivo viejo se combinan en date
+_DATE_WITH_TIME = ("CASE WHEN time IS NULL THEN CAST(date AS TIMESTAMP) "
+                   "ELSE CAST(date AS DATE) + COALESCE(TRY_CAST(time AS TIME), TIME '00:00') END")
+DERIVED_COLUMNS = {
+    'vital_signs': {'date': ('time', _DATE_WITH_TIME)},
+    'medical_events': {'date': ('time', _DATE_WITH_TIME)},
+}
+
+
+def table_columns(conn: duckdb.DuckDBPyConnection, table: str) -> dict:
+    """Columnas de una tabla existente y su tipo ({} si la tabla no existe)"""
+    rows = conn.execute("""
+        SELECT column_name, data_type FROM duckdb_columns()
+        WHERE table_name = ? ORDER BY column_index
+    """, [table]).fetchall()
+    return dict(rows)
+
+
+def _canonical_columns(conn: duckdb.DuckDBPyConnection, table: str) -> dict:
+    """Columnas que tendría la tabla según el esquema canónico"""
+    probe = f"{table}_canonical"
+    conn.execute(TABLES[table].format(table=probe))
+    columns = table_columns(conn, probe)
+    conn.execute(f"DROP TABLE {probe}")
+    return columns
+
+
+def _rebuild_table(conn: duckdb.DuckDBPyConnection, table: str, renames: Optional[dict] = None,
+                   force: bool = False) -> bool:
+    """
+    Recrea una tabla con el esquema canónico si su estructura difiere.
+
+    Copia las columnas en común (convirtiendo tipos, p. ej. DATE a TIMESTAMP,
+    y combinando las de DERIVED_COLUMNS); las columnas nuevas toman su valor
+    por defecto. DuckDB no permite cambiar
+    claves primarias ni alterar tablas con índices, por eso se recrea. Las
+    filas se copian en el orden de CLUSTER_KEYS.
+
+    Args:
+        conn: Conexión a la base de datos
+        table: Nombre de la tabla
+        renames: Columnas viejas que pasan a llamarse distinto {vieja: nueva}
+        force: Recrear aunque la estructura no cambie (para reordenar las filas)
+
+    Returns:
+        True si la tabla se recreó
+    """
+    current = table_columns(conn, table)
+    target = _canonical_columns(conn, table)
+    if not current or (current == target and not force):
+        return False
+
+    renames = renames or {}
+    sources = {renames.get(column, column): column for column in current}
+    for column, (needs, expression) in DERIVED_COLUMNS.get(table, {}).items():
+        if column in sources and needs in current:
+            sources[column] = expression
+    shared = [column for column in target if column in sources]
+
+    order = CLUSTER_KEYS.get(table) if 'patient_id' in current else None
+    conn.execute(TABLES[table].format(table=f"{table}_new"))
+    conn.execute(f"""
+        INSERT INTO {table}_new ({', '.join(shared)})
+        SELECT {', '.join(sources[column] for column in shared)} FROM {table}
+        {f"ORDER BY {order}" if order else ""}
     """)
+    conn.execute(f"DROP TABLE {table}")
+    conn.execute(f"ALTER TABLE {table}_new RENAME TO {table}")
+    _create_indexes(conn, table)
+    return True
+
+
+def _create_indexes(conn: duckdb.DuckDBPyConnection, table: Optional[str] = None):
+    for name, index_table, columns in INDEXES:
+        if table is None or index_table == table:
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {index_table} ({columns})")
+
+
+def _migrate_base_schema(conn: duckdb.DuckDBPyConnection):
+    for sequence in SEQUENCES:
+        conn.execute(f"CREATE SEQUENCE IF NOT EXISTS {sequence} START 1")
+    for table, ddl in TABLES.items():
+        conn.execute(ddl.format(table=table))
+    conn.execute("""
+        INSERT INTO patients (id, name, age) VALUES (?, 'Jorge Agustín', 65)
+        ON CONFLICT DO NOTHING
+    """, [DEFAULT_PATIENT_ID])
+
+
+def _migrate_lab_results(conn: duckdb.DuckDBPyConnection):
+    # date DATE -> TIMESTAMP (conservar la hora) y patient_id
+    _rebuild_table(conn, 'lab_results')
+
+
+def _migrate_conditions(conn: duckdb.DuckDBPyConnection):
+    # La clave primaria pasa de (condition) a (patient_id, condition)
+    _rebuild_table(conn, 'medical_conditions')
+
+
+def _migrate_clinical_tables(conn: duckdb.DuckDBPyConnection):
+    # update_medical_data_17_09.py creaba medications con medication_name
+    _rebuild_table(conn, 'medications', renames={'medication_name': 'name'})
+    _rebuild_table(conn, 'vital_signs')
+    _rebuild_table(conn, 'medical_events')
+
+    # Los scripts insertaban ids explícitos: adelantar las secuencias
+    _advance_sequences(conn)
+
+
+def _advance_sequences(conn: duckdb.DuckDBPyConnection):
+    """Deja cada secuencia justo por encima del mayor id de su tabla (nunca la retrocede)"""
+    for sequence, table in SEQUENCES.items():
+        # duckdb_sequences().last_value no es confiable tras reabrir el archivo:
+        # se toma un valor para saber dónde está (deja a lo sumo un id sin usar)
+        current, max_id = conn.execute(f"""
+            SELECT nextval('{sequence}'), (SELECT COALESCE(MAX(id), 0) FROM {table})
+        """).fetchall()[0]
+        if max_id > current:
+            conn.execute(f"SELECT max(nextval('{sequence}')) FROM range(?)", [max_id - current]).fetchall()
+
+
+def _migrate_indexes(conn: duckdb.DuckDBPyConnection):
+    _create_indexes(conn)
+
+
+def _migrate_lab_latest(conn: duckdb.DuckDBPyConnection):
+    conn.execute(TABLES['lab_latest'].format(table='lab_latest'))
+    rebuild_lab_latest(conn)
+
+
+def _migrate_lab_rollups(conn: duckdb.DuckDBPyConnection):
+    conn.execute(TABLES['lab_rollups'].format(table='lab_rollups'))
+    rebuild_lab_rollups(conn)
+
+
+def _migrate_archive(conn: duckdb.DuckDBPyConnection):
+    conn.execute(TABLES['archive_partitions'].format(table='archive_partitions'))
+
+
+def _migrate_ingest_log(conn: duckdb.DuckDBPyConnection):
+    conn.execute(TABLES['ingest_log'].format(table='ingest_log'))
+
+
+def _migrate_lab_content_keys(conn: duckdb.DuckDBPyConnection):
+    # source y content_key para la carga idempotente (las filas existentes quedan sin clave)
+    _rebuild_table(conn, 'lab_results')
+
+
+def _migrate_patient_clustering(conn: duckdb.DuckDBPyConnection):
+    # patient_id en medicaciones, signos vitales y eventos (las filas existentes
+    # son del paciente por defecto) y todas las tablas ordenadas por paciente
+    for table in CLUSTER_KEYS:
+        _rebuild_table(conn, table, force=True)
+    # Los scripts de actualización seguían insertando ids explícitos después de la migración 4
+    _advance_sequences(conn)
+
+
+def _migrate_lab_revisions(conn: duckdb.DuckDBPyConnection):
+    conn.execute(TABLES['lab_revisions'].format(table='lab_revisions'))
+
+
+def _migrate_dialysis_patient(conn: duckdb.DuckDBPyConnection):
+    # Las recomendaciones existentes son del paciente por defecto
+    _rebuild_table(conn, 'dialysis_recommendations')
+
+
+def _migrate_clinical_timestamps(conn: duckdb.DuckDBPyConnection):
+    # date DATE + time VARCHAR pasan a una sola columna date TIMESTAMP (ver DERIVED_COLUMNS)
+    _rebuild_table(conn, 'vital_signs')
+    _rebuild_table(conn, 'medical_events')
+
+
+def _migrate_lab_content_keys_without_source(conn: duckdb.DuckDBPyConnection):
+    # La clave de contenido deja de incluir el origen: dos scripts que cargaban
+    # el mismo panel guardaban cada uno su copia. Se conserva la fila más vieja.
+    rows = conn.execute("""
+        SELECT id, patient_id, test_name, date, value FROM lab_results
+        WHERE content_key IS NOT NULL
+        ORDER BY id
+    """).fetchall()
+    keys = pd.DataFrame({
+        'id': [row[0] for row in rows],
+        'content_key': [_content_key(patient_id, test_name, to_timestamp(date), value)
+                        for _, patient_id, test_name, date, value in rows],
+    })
+    duplicated = keys['content_key'].duplicated()
+    if duplicated.any():
+        conn.execute("DELETE FROM lab_results WHERE id IN (SELECT unnest(?))",
+                     [keys.loc[duplicated, 'id'].tolist()])
+    keys = keys[~duplicated]
+
+    # Las claves nuevas no coinciden con ninguna vieja (que incluían el origen)
+    conn.register('lab_content_keys', keys)
+    try:
+        conn.execute("""
+            UPDATE lab_results SET content_key = new_keys.content_key
+            FROM lab_content_keys AS new_keys
+            WHERE lab_results.id = new_keys.id
+        """)
+    finally:
+        conn.unregister('lab_content_keys')
+
+    if duplicated.any():
+        # Las copias estaban contadas dos veces en los resúmenes
+        rebuild_lab_latest(conn)
+        rebuild_lab_rollups(conn)
+
+
+def recluster(conn: duckdb.DuckDBPyConnection, tables=None) -> list:
+    """
+    Reordena físicamente las tablas por paciente (ver CLUSTER_KEYS).
+
+    Las filas nuevas se agregan al final de cada tabla; tras muchas cargas de
+    varios pacientes conviene reordenar para que las consultas de un paciente
+    vuelvan a leer solo sus grupos de filas. Se hace en una transacción.
+
+    Args:
+        conn: Conexión a la base de datos
+        tables: Tablas a reordenar (por defecto todas las de CLUSTER_KEYS)
+
+    Returns:
+        Lista de tablas reordenadas
+    """
+    return _in_transaction(conn, _recluster_tables, tables or list(CLUSTER_KEYS))
+
+
+def _recluster_tables(conn: duckdb.DuckDBPyConnection, tables: list) -> list:
+    return [table for table in tables if _rebuild_table(conn, table, force=True)]
+
+
+# Migraciones en orden: (versión, descripción, función). Nunca modificar una ya publicada.
+MIGRATIONS = [
+    (1, "Esquema base", _migrate_base_schema),
+    (2, "Laboratorios con fecha y hora y patient_id", _migrate_lab_results),
+    (3, "Condiciones médicas por paciente", _migrate_conditions),
+    (4, "Medicaciones, signos vitales y eventos unificados", _migrate_clinical_tables),
+    (5, "Índices por test y fecha", _migrate_indexes),
+    (6, "Último valor por test (lab_latest)", _migrate_lab_latest),
+    (7, "Resúmenes diarios, semanales y mensuales (lab_rollups)", _migrate_lab_rollups),
+    (8, "Registro del archivo Parquet (archive_partitions)", _migrate_archive),
+    (9, "Progreso de la cola de ingesta (ingest_log)", _migrate_ingest_log),
+    (10, "Origen y clave de contenido de los laboratorios", _migrate_lab_content_keys),
+    (11, "patient_id en todas las tablas y filas ordenadas por paciente", _migrate_patient_clustering),
+    (12, "Clave de contenido sin el origen de la carga", _migrate_lab_content_keys_without_source),
+    (13, "patient_id en las recomendaciones de diálisis", _migrate_dialysis_patient),
+    (14, "Revisión de laboratorios por paciente (lab_revisions)", _migrate_lab_revisions),
+    (15, "Signos vitales y eventos con fecha y hora en un TIMESTAMP", _migrate_clinical_timestamps),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(conn: duckdb.DuckDBPyConnection) -> int:
+    """Versión del esquema aplicada a la base (0 si nunca se migró)"""
+    exists = conn.execute("""
+        SELECT COUNT(*) FROM duckdb_tables() WHERE table_name = 'schema_migrations'
+    """).fetchone()[0]
+    if not exists:
+        return 0
+    # fetchall cierra el resultado: un fetchone deja abierta la transacción de
+    # lectura y eso impide el CHECKPOINT de ConnectionManager.publish
+    return conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_migrations").fetchall()[0][0]
 
+
+def migrate(conn: duckdb.DuckDBPyConnection) -> list:
+    """
+    Aplica las migraciones pendientes, cada una en su propia transacción.
+
+    Las bases creadas antes del control de versiones (sin schema_migrations)
+    empiezan en la versión 0; las migraciones detectan el estado real de
+    cada tabla, así que sirven tanto para bases nuevas como para bases viejas.
+
+    Args:
+        conn: Conexión a la base de datos
+
+    Returns:
+        Lista de versiones aplicadas
+    """
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            description VARCHAR,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    current = get_schema_version(conn)
+
+    applied = []
+    for version, description, apply in MIGRATIONS:
+        if version <= current:
+            continue
+        conn.begin()
+        try:
+            apply(conn)
+            conn.execute("INSERT INTO schema_migrations (version, description) VALUES (?, ?)",
+                         [version, description])
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        applied.append(version)
+    return applied
+
+
+def init_database(db_path: str = "medical_data.db") -> duckdb.DuckDBPyConnection:
+    """
+    Inicializa la base de datos y la lleva a la última versión del esquema.
+
+    Args:
+        db_path: Ruta a la base de datos
+
+    Returns:
+        Conexión a la base de datos
+    """
+    conn = duckdb.connect(db_path)
+    migrate(conn)
     return conn
 
 
+def load_patient(conn: duckdb.DuckDBPyConnection, patient_id: int) -> Optional[PatientData]:
+    """
+    Carga un paciente completo desde la base de datos.
+
+    Args:
+        conn: Conexión a la base de datos
+        patient_id: Identificador del paciente
+
+    Returns:
+        PatientData con sus datos, o None si el paciente no existe
+    """
+    row = conn.execute("""
+        SELECT name, age, weight, height FROM patients WHERE id = ?
+    """, [patient_id]).fetchone()
+    if row is None:
+        return None
+
+    name, age, weight, height = row
+    patient_data = PatientData(name=name, age=age, weight=weight, height=height, patient_id=patient_id)
+    load_existing_data(conn, patient_data)
+    return patient_data
+
+
+def list_patients(conn: duckdb.DuckDBPyConnection) -> list:
+    """
+    Lista los pacientes registrados.
+
+    Returns:
+        Lista de tuplas (id, nombre)
+    """
+    return conn.execute("SELECT id, name FROM patients ORDER BY id").fetchall()
+
+
 def load_existing_data(conn: duckdb.DuckDBPyConnection, patient_data: PatientData):
     """
     Carga datos existentes de la base de datos al objeto PatientData.
 
+    Las tablas del paciente (laboratorios y su último valor por test,
+    condiciones, medicaciones, signos vitales y eventos) se leen en
+    paralelo, cada una con su propio cursor; el tiempo de cada lectura se
+    registra con logging (nivel INFO).
+    Un error en una tabla se informa y no impide cargar las demás.
+
     Args:
         conn: Conexión a la base de datos
-        patient_data: Objeto PatientData a llenar
+        patient_data: Objeto PatientData a llenar (se usa su patient_id)
     """
-    # Cargar resultados de laboratorio
+    start = time.perf_counter()
+    # Antes que las filas: un cambio entre ambas lecturas provoca una recarga de más, nunca de menos
+    watermarks = data_watermarks(conn, patient_data.patient_id)
+    loaders = hydration_loaders(patient_data)
+    cursors = [conn.cursor() for _ in loaders]
     try:
-        results = conn.execute("""
-            SELECT test_name, value, unit, date, reference_min, reference_max, alert_level, notes
-            FROM lab_results
-            ORDER BY date DESC, test_name
-        """).fetchall()
-
-        for row in results:
-            test_name, value, unit, date, ref_min, ref_max, alert_level, notes = row
-
-            # Convertir alert_level string a enum
-            alert_enum = AlertLevel.NORMAL
-            if alert_level == "critico":
-                alert_enum = AlertLevel.CRITICO
-            elif alert_level == "alerta":
-                alert_enum = AlertLevel.ALERTA
-            elif alert_level == "atencion":
-                alert_enum = AlertLevel.ATENCION
-
-            # Convertir date a datetime si es necesario
-            from datetime import datetime, date as date_type
-            if isinstance(date, date_type) and not isinstance(date, datetime):
-                date = datetime.combine(date, datetime.min.time())
-
-            lab_result = LabResult(
-                test_name=test_name,
-                value=value,
-                unit=unit,
-                date=date,
-                reference_min=ref_min if ref_min else None,
-                reference_max=ref_max if ref_max else None,
-                alert_level=alert_enum,
-                notes=notes if notes else None
-            )
-            patient_data.lab_results.append(lab_result)
-    except Exception as e:
-        print(f"Error cargando resultados de laboratorio: {e}")
+        with ThreadPoolExecutor(max_workers=len(loaders), thread_name_prefix="hydrate") as executor:
+            futures = {table: executor.submit(load_table, cursor, table, loader)
+                       for cursor, (table, loader) in zip(cursors, loaders.items())}
+            fetched = {table: future.result() for table, future in futures.items()}
+    finally:
+        for cursor in cursors:
+            cursor.close()
+    apply_hydration(patient_data, fetched, watermarks)
+    logger.info("Paciente %s cargado en %.3f s", patient_data.patient_id, time.perf_counter() - start)
+
+
+def hydration_loaders(patient_data: PatientData) -> Dict[str, Callable]:
+    """
+    Lecturas que componen la carga de un paciente, por tabla.
+
+    Cada función recibe solo la conexión y no modifica patient_data, así que
+    pueden ejecutarse en cualquier hilo (ver load_existing_data y
+    AsyncMedicalStore.load_patient_data).
+    """
+    patient_id = patient_data.patient_id
+    return {
+        'lab_results': partial(fetch_lab_results, patient_id=patient_id, after_id=patient_data.lab_watermark),
+        'lab_latest': partial(load_latest_results, patient_id=patient_id),
+        'medical_conditions': partial(load_conditions, patient_id=patient_id),
+        'medications': partial(load_medications, patient_id=patient_id),
+        'vital_signs': partial(load_vital_signs, patient_id=patient_id),
+        'medical_events': partial(load_clinical_events, patient_id=patient_id),
+    }
+
 
-    # Cargar condiciones médicas
+def load_table(conn: duckdb.DuckDBPyConnection, table: str, loader: Callable) -> Any:
+    """
+    Ejecuta una lectura de hydration_loaders y registra cuánto tardó.
+
+    Returns:
+        El resultado de la lectura, o la excepción que produjo
+    """
+    start = time.perf_counter()
     try:
-        conditions = conn.execute("""
-            SELECT condition, active
-            FROM medical_conditions
-            WHERE active = TRUE
-        """).fetchall()
-
-        for row in conditions:
-            condition, active = row
-            # Mapear condiciones a ConditionType
-            condition_map = {
-                "Insuficiencia Renal Crónica": ConditionType.IRC_TERMINAL,
-                "Hipotiroidismo": ConditionType.HIPOTIROIDISMO,
-                "Hiperparatiroidismo Secundario": ConditionType.HIPERPARATIROIDISMO,
-                "Anemia": ConditionType.ANEMIA,
-                "Hipertensión": ConditionType.HIPERTENSION,
-                "Diabetes": ConditionType.DIABETES,
-                "Enfermedad Cardíaca": ConditionType.ENFERMEDAD_CARDIACA
-            }
-
-            if condition in condition_map:
-                patient_data.conditions.append(condition_map[condition])
+        records = loader(conn)
     except Exception as e:
-        print(f"Error cargando condiciones médicas: {e}")
+        logger.warning("Error leyendo %s tras %.3f s: %s", table, time.perf_counter() - start, e)
+        return e
+    rows = records.count if isinstance(records, FetchedLabResults) else len(records)
+    logger.info("Lectura de %s: %d filas en %.3f s", table, rows, time.perf_counter() - start)
+    return records
+
+
+# Tablas que se releen completas cuando cambian (ver data_watermarks)
+CLINICAL_TABLES = ('medications', 'vital_signs', 'medical_events')
+
+_HYDRATION_ERRORS = {
+    'lab_results': "resultados de laboratorio",
+    'lab_latest': "últimos resultados de laboratorio",
+    'medical_conditions': "condiciones médicas",
+    'medications': "medicaciones",
+    'vital_signs': "signos vitales",
+    'medical_events': "eventos clínicos",
+}
+
+
+def apply_hydration(patient_data: PatientData, fetched: Dict[str, Any],
+                    watermarks: Optional['DataWatermarks'] = None):
+    """
+    Llena patient_data con las lecturas de hydration_loaders.
+
+    Args:
+        patient_data: Paciente a llenar (se modifica en el hilo que llama)
+        fetched: Tabla -> resultado de load_table (las excepciones se informan)
+        watermarks: data_watermarks leído antes que las filas; se guarda el
+            de cada tabla clínica leída sin error (ver refresh_existing_data)
+    """
+    for table, records in fetched.items():
+        if isinstance(records, Exception):
+            print(f"Error cargando {_HYDRATION_ERRORS[table]}: {records}")
+        elif watermarks is not None and table in CLINICAL_TABLES:
+            patient_data.clinical_watermarks[table] = watermarks.tables[table]
+
+    def records_of(table: str) -> Any:
+        records = fetched.get(table)
+        return None if isinstance(records, Exception) else records
+
+    labs = records_of('lab_results')
+    if labs is not None:
+        add_fetched_lab_results(patient_data, labs)
+    # Los tests con todo su historial archivado solo están en lab_latest
+    latest = records_of('lab_latest')
+    if latest is not None:
+        patient_data.set_latest_results(latest)
+    for condition in records_of('medical_conditions') or []:
+        patient_data.add_condition(condition)
+    # Se reemplazan (no se agregan): volver a cargar el mismo paciente no duplica
+    patient_data.set_clinical_records(records_of('medications'),
+                                      records_of('vital_signs'),
+                                      records_of('medical_events'))
+
+
+def refresh_existing_data(conn: duckdb.DuckDBPyConnection, patient_data: PatientData) -> Optional[int]:
+    """
+    Trae a un PatientData ya cargado solo los cambios desde la última carga.
+
+    Primero lee data_watermarks (una sola consulta barata) y solo relee lo
+    que cambió: los resultados de laboratorio a partir de
+    patient_data.lab_watermark, las condiciones si cambió la lista de
+    activas, y medicaciones, signos vitales o eventos si cambió su cantidad
+    o su mayor id (así aparecen los que guardó la cola de ingesta). Una
+    recarga sin novedades cuesta esa única consulta, así que el dashboard
+    puede llamarla en cada sondeo.
+
+    Args:
+        conn: Conexión a la base de datos
+        patient_data: Paciente cargado con load_existing_data
+
+    Returns:
+        Cantidad de resultados nuevos, o None si se borraron o reemplazaron
+        filas ya cargadas y hace falta una carga completa
+    """
+    watermarks = data_watermarks(conn, patient_data.patient_id, patient_data.lab_watermark)
+    if not lab_results_current(patient_data, watermarks):
+        return None
+
+    new_results = 0
+    if watermarks.lab_last_id > patient_data.lab_watermark:
+        new_results = load_lab_results(conn, patient_data)
+
+    if set(watermarks.conditions) != set(patient_data.conditions):
+        patient_data.set_conditions(watermarks.conditions)
+
+    changed = changed_clinical_tables(patient_data, watermarks)
+    if changed:
+        loaders = hydration_loaders(patient_data)
+        apply_hydration(patient_data, {table: load_table(conn, table, loaders[table]) for table in changed},
+                        watermarks)
+    return new_results
+
+
+class DataWatermarks(NamedTuple):
+    """Estado de las tablas de un paciente leído con una sola consulta (ver data_watermarks)"""
+    # Resultados con fecha e id menor o igual al watermark consultado
+    lab_count: int
+    # Mayor id de lab_results con fecha (0 si no hay)
+    lab_last_id: int
+    lab_revision: int
+    # Condiciones activas (ConditionType)
+    conditions: list
+    # Tabla clínica -> (cantidad de filas, mayor id)
+    tables: Dict[str, tuple]
+
+
+def data_watermarks(conn: duckdb.DuckDBPyConnection, patient_id: int, lab_watermark: int = 0) -> DataWatermarks:
+    """
+    Lee en una sola consulta lo necesario para saber qué cambió desde una carga.
+
+    Cada tabla se resume por cantidad de filas y mayor id (los ids nunca se
+    reutilizan, así que un alta, una baja o un reemplazo los cambian); los
+    laboratorios suman su revisión, que cubre las correcciones en el lugar.
+    Solo se leen las tablas, nunca el archivo Parquet.
+
+    Args:
+        conn: Conexión a la base de datos
+        patient_id: Paciente a consultar
+        lab_watermark: Mayor id de lab_results ya cargado
+
+    Returns:
+        DataWatermarks
+    """
+    clinical = ', '.join(f"""
+            (SELECT [count(*), coalesce(max(id), 0)] FROM {table}
+             WHERE patient_id = ?{' AND date IS NOT NULL' if table != 'medications' else ''})"""
+                         for table in CLINICAL_TABLES)
+    row = conn.execute(f"""
+        SELECT labs.lab_count, labs.lab_last_id,
+            (SELECT coalesce(max(revision), 0) FROM lab_revisions WHERE patient_id = ?),
+            (SELECT list(condition) FROM medical_conditions WHERE patient_id = ? AND active = TRUE),
+            {clinical}
+        FROM (
+            SELECT count(*) FILTER (WHERE id <= ?) AS lab_count, coalesce(max(id), 0) AS lab_last_id
+            FROM lab_results WHERE patient_id = ? AND date IS NOT NULL
+        ) AS labs
+    """, [patient_id] * (2 + len(CLINICAL_TABLES)) + [lab_watermark, patient_id]).fetchone()
+    lab_count, lab_last_id, revision, conditions, *tables = row
+    return DataWatermarks(
+        lab_count, lab_last_id, revision,
+        [CONDITION_MAP[condition] for condition in conditions or [] if condition in CONDITION_MAP],
+        {table: tuple(marks) for table, marks in zip(CLINICAL_TABLES, tables)}
+    )
+
+
+def lab_results_current(patient_data: PatientData, watermarks: DataWatermarks) -> bool:
+    """
+    False si cambiaron resultados ya cargados y hace falta una carga completa.
+
+    Si cambió la cantidad de filas ya vistas se borraron datos (p. ej. un
+    script de carga); si cambió la revisión, se corrigieron o archivaron.
+    """
+    loaded = len(patient_data.lab_results) - patient_data.pending_lab_count
+    return watermarks.lab_count == loaded and watermarks.lab_revision == patient_data.lab_revision
+
+
+def changed_clinical_tables(patient_data: PatientData, watermarks: DataWatermarks) -> List[str]:
+    """Tablas clínicas cuyo watermark difiere del que tenían al cargarse"""
+    return [table for table in CLINICAL_TABLES
+            if watermarks.tables[table] != patient_data.clinical_watermarks.get(table)]
+
+
+def lab_revision(conn: duckdb.DuckDBPyConnection, patient_id: int) -> int:
+    """Revisión de los laboratorios del paciente (0 si nunca cambiaron filas cargadas)"""
+    rows = conn.execute("SELECT revision FROM lab_revisions WHERE patient_id = ?", [patient_id]).fetchall()
+    return rows[0][0] if rows else 0
+
+
+def bump_lab_revision(conn: duckdb.DuckDBPyConnection, patient_id: int) -> None:
+    """
+    Avisa que cambiaron resultados ya cargados de un paciente: la próxima
+    refresh_existing_data hace una carga completa (y la caché de la interfaz
+    se descarta con el PatientData anterior).
+    """
+    conn.execute("""
+        INSERT INTO lab_revisions (patient_id, revision, updated_at) VALUES (?, 1, now())
+        ON CONFLICT (patient_id) DO UPDATE SET
+            revision = lab_revisions.revision + 1, updated_at = excluded.updated_at
+    """, [patient_id])
+
+
+def load_conditions(conn: duckdb.DuckDBPyConnection, patient_id: int) -> list:
+    """
+    Obtiene las condiciones médicas activas de un paciente.
+
+    Args:
+        conn: Conexión a la base de datos
+        patient_id: Paciente a consultar
+
+    Returns:
+        Lista de ConditionType (las condiciones sin equivalente se omiten)
+    """
+    rows = conn.execute("""
+        SELECT condition
+        FROM medical_conditions
+        WHERE patient_id = ? AND active = TRUE
+    """, [patient_id]).fetchall()
+    return [CONDITION_MAP[condition] for condition, in rows if condition in CONDITION_MAP]
+
+
+def load_lab_results(conn: duckdb.DuckDBPyConnection, patient_data: PatientData) -> int:
+    """
+    Carga los resultados de laboratorio del paciente en bloque.
+
+    Solo lee filas con id mayor a patient_data.lab_watermark y lo actualiza,
+    de modo que llamadas sucesivas traen únicamente lo nuevo.
+
+    Args:
+        conn: Conexión a la base de datos
+        patient_data: Objeto PatientData a llenar
+
+    Returns:
+        Cantidad de resultados cargados
+    """
+    fetched = fetch_lab_results(conn, patient_data.patient_id, patient_data.lab_watermark)
+    return add_fetched_lab_results(patient_data, fetched)
+
 
+class FetchedLabResults(NamedTuple):
+    """Resultados leídos de la base como columnas (argumentos de ColumnarLabStore.extend_columns)"""
+    columns: Dict[str, Any]
+    last_id: int
+    # Revisión leída antes que las filas (ver lab_revision)
+    revision: int = 0
 
-def save_lab_result(conn: duckdb.DuckDBPyConnection, lab_result: LabResult):
+    @property
+    def count(self) -> int:
+        """Cantidad de resultados leídos"""
+        return len(self.columns.get('values', ()))
+
+
+def fetch_lab_results(conn: duckdb.DuckDBPyConnection, patient_id: int, after_id: int = 0) -> FetchedLabResults:
+    """
+    Lee los resultados de laboratorio de un paciente sin tocar PatientData.
+
+    Trae todas las columnas en un solo fetch NumPy, traduce los niveles de
+    alerta con una tabla de búsqueda y devuelve las columnas del almacén
+    columnar sin crear un LabResult por fila (PatientData los arma bajo
+    demanda). Al no modificar al paciente puede correr en otro hilo (ver
+    AsyncMedicalStore).
+
+    Args:
+        conn: Conexión a la base de datos
+        patient_id: Paciente a consultar
+        after_id: Leer solo filas con id mayor a este
+
+    Returns:
+        FetchedLabResults ordenados por fecha
+    """
+    # Antes que las filas: un cambio entre ambas lecturas provoca una recarga de más, nunca de menos
+    revision = lab_revision(conn, patient_id)
+    columns = conn.execute("""
+        SELECT id, test_name, value, unit, date, epoch_us(date) AS timestamp,
+               reference_min, reference_max, alert_level, notes
+        FROM lab_results
+        WHERE patient_id = ? AND date IS NOT NULL AND id > ?
+        ORDER BY date, id
+    """, [patient_id, after_id]).fetchnumpy()
+
+    if len(columns['value']) == 0:
+        return FetchedLabResults({}, after_id, revision)
+
+    test_names = np.ma.filled(columns['test_name'], "")
+    units = np.ma.filled(columns['unit'], "")
+    values = np.ma.filled(columns['value'], np.nan)
+    timestamps = np.ma.getdata(columns['timestamp'])
+    # Referencias ausentes (NULL o 0) se tratan como sin referencia
+    ref_min = np.ma.filled(columns['reference_min'], 0.0)
+    ref_max = np.ma.filled(columns['reference_max'], 0.0)
+    ref_min = np.where(ref_min == 0, np.nan, ref_min)
+    ref_max = np.where(ref_max == 0, np.nan, ref_max)
+
+    level_inverse, levels = pd.factorize(np.ma.filled(columns['alert_level'], ""))
+    level_enums = [ALERT_LEVEL_LOOKUP.get(level, AlertLevel.NORMAL) for level in levels.tolist()]
+    alert_codes = np.array([ALERT_CODES[level] for level in level_enums], dtype=np.int8)[level_inverse]
+
+    return FetchedLabResults({
+        'test_names': test_names, 'values': values, 'units': units, 'timestamps': timestamps,
+        'reference_min': ref_min, 'reference_max': ref_max,
+        'alert_codes': alert_codes, 'notes': np.ma.filled(columns['notes'], None)
+    }, int(columns['id'].max()), revision)
+
+
+def add_fetched_lab_results(patient_data: PatientData, fetched: FetchedLabResults) -> int:
+    """
+    Añade al paciente resultados leídos con fetch_lab_results y avanza su watermark.
+
+    Returns:
+        Cantidad de resultados leídos
+    """
+    columns = fetched.columns
+    patient_data.lab_revision = fetched.revision
+    if not fetched.count:
+        return 0
+    # Filas que la sesión ya tiene en memoria porque las envió a la cola de ingesta
+    claimed = np.array(patient_data.claim_pending_lab_results(
+        columns['test_names'], columns['timestamps'], columns['values']), dtype=bool)
+    if claimed.any():
+        columns = {name: column[~claimed] for name, column in columns.items()}
+    patient_data.add_lab_results(columns=columns)
+    patient_data.lab_watermark = max(patient_data.lab_watermark, fetched.last_id)
+    return fetched.count
+
+
+def load_medications(conn: duckdb.DuckDBPyConnection, patient_id: int = DEFAULT_PATIENT_ID) -> List[Medication]:
+    """
+    Obtiene las medicaciones de un paciente ordenadas por fecha de inicio.
+
+    Args:
+        conn: Conexión a la base de datos
+        patient_id: Paciente a consultar
+
+    Returns:
+        Lista de Medication (la dosis "10 mg" se separa en valor y unidad)
+    """
+    rows = conn.execute("""
+        SELECT name, dose, frequency, route, COALESCE(start_date, CAST(created_at AS DATE)),
+               end_date, active, notes
+        FROM medications
+        WHERE patient_id = ?
+        ORDER BY start_date, id
+    """, [patient_id]).fetchall()
+
+    medications = []
+    for name, dose, frequency, route, start_date, end_date, active, notes in rows:
+        dose_value, dose_unit = _parse_dose(dose)
+        medications.append(Medication(
+            name=name or "",
+            dose=dose_value,
+            unit=dose_unit,
+            frequency=frequency or "",
+            route=route or "",
+            start_date=start_date,
+            end_date=end_date,
+            is_active=bool(active),
+            notes=notes or ""
+        ))
+    return medications
+
+
+def _parse_dose(dose: Optional[str]) -> tuple:
+    """Separa una dosis como "10 mL/h" en (10.0, "mL/h"); si no empieza con un número, (0.0, dose)"""
+    if not dose:
+        return 0.0, ""
+    amount, _, unit = dose.strip().partition(" ")
+    try:
+        return float(amount.replace(",", ".")), unit.strip()
+    except ValueError:
+        return 0.0, dose.strip()
+
+
+def _history_source(conn: duckdb.DuckDBPyConnection, table: str, patient_id: int,
+                    start: Optional[datetime], end: Optional[datetime], include_archived: bool) -> tuple:
+    """
+    FROM y filtro de período para las lecturas de signos vitales y eventos.
+
+    La carga y la recarga del paciente leen solo la tabla; el archivo Parquet
+    se consulta únicamente si se pide el historial (include_archived).
+
+    Returns:
+        (expresión FROM, condición WHERE, parámetros)
+    """
+    source = table_source(conn, table, patient_id, start, end) if include_archived else table
+    where = ("patient_id = ? AND date IS NOT NULL"
+             " AND (?::TIMESTAMP IS NULL OR date >= ?) AND (?::TIMESTAMP IS NULL OR date <= ?)")
+    return source, where, [patient_id, start, start, end, end]
+
+
+def load_vital_signs(conn: duckdb.DuckDBPyConnection, patient_id: int = DEFAULT_PATIENT_ID,
+                     start: Optional[datetime] = None, end: Optional[datetime] = None,
+                     include_archived: bool = False) -> List[VitalSigns]:
+    """
+    Obtiene los registros de signos vitales de un paciente ordenados por fecha.
+
+    Args:
+        conn: Conexión a la base de datos
+        patient_id: Paciente a consultar
+        start: Inicio del período, inclusive (None = sin límite)
+        end: Fin del período, inclusive (None = sin límite)
+        include_archived: Incluir los registros archivados en Parquet del período
+
+    Returns:
+        Lista de VitalSigns
+    """
+    source, where, params = _history_source(conn, 'vital_signs', patient_id, start, end, include_archived)
+    rows = conn.execute(f"""
+        SELECT date, heart_rate, blood_pressure_systolic, blood_pressure_diastolic, temperature,
+               oxygen_saturation, respiratory_rate, glasgow_score, notes
+        FROM {source} AS vital_signs
+        WHERE {where}
+        ORDER BY date, id
+    """, params).fetchall()
+
+    return [
+        VitalSigns(date=recorded_at, heart_rate=heart_rate, blood_pressure_sys=systolic,
+                   blood_pressure_dia=diastolic, temperature=temperature,
+                   oxygen_saturation=saturation, respiratory_rate=respiratory_rate,
+                   glasgow_score=glasgow, notes=notes or "")
+        for recorded_at, heart_rate, systolic, diastolic, temperature,
+            saturation, respiratory_rate, glasgow, notes in rows
+    ]
+
+
+def load_clinical_events(conn: duckdb.DuckDBPyConnection, patient_id: int = DEFAULT_PATIENT_ID,
+                         start: Optional[datetime] = None, end: Optional[datetime] = None,
+                         include_archived: bool = False) -> List[ClinicalEvent]:
+    """
+    Obtiene los eventos clínicos de un paciente ordenados por fecha.
+
+    Args:
+        conn: Conexión a la base de datos
+        patient_id: Paciente a consultar
+        start: Inicio del período, inclusive (None = sin límite)
+        end: Fin del período, inclusive (None = sin límite)
+        include_archived: Incluir los eventos archivados en Parquet del período
+
+    Returns:
+        Lista de ClinicalEvent (type -> event_type, urgency -> severity)
+    """
+    source, where, params = _history_source(conn, 'medical_events', patient_id, start, end, include_archived)
+    rows = conn.execute(f"""
+        SELECT type, date, description, urgency
+        FROM {source} AS medical_events
+        WHERE {where}
+        ORDER BY date, id
+    """, params).fetchall()
+
+    return [
+        ClinicalEvent(event_type=event_type or "", date=occurred_at,
+                      description=description or "", severity=urgency or "moderate")
+        for event_type, occurred_at, description, urgency in rows
+    ]
+
+
+def save_lab_result(conn: duckdb.DuckDBPyConnection, lab_result: LabResult,
+                    patient_id: int = DEFAULT_PATIENT_ID):
     """
     Guarda un resultado de laboratorio en la base de datos.
 
+    lab_latest y lab_rollups se actualizan con los valores de la fila, sin
+    volver a leer lab_results. Para varios resultados conviene igual
+    save_lab_results o la cola de ingesta (una transacción por lote).
+
     Args:
         conn: Conexión a la base de datos
         lab_result: Resultado de laboratorio a guardar
+        patient_id: Paciente al que pertenece el resultado
+
+    Returns:
+        Id asignado al resultado
+    """
+    conn.begin()
+    try:
+        lab_result_id = conn.execute("""
+            INSERT INTO lab_results
+            (patient_id, test_name, value, unit, date, reference_min, reference_max, alert_level, notes)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            RETURNING id
+        """, [
+            patient_id,
+            lab_result.test_name,
+            lab_result.value,
+            lab_result.unit,
+            lab_result.date,
+            lab_result.reference_min,
+            lab_result.reference_max,
+            lab_result.alert_level.value,
+            lab_result.notes
+        ]).fetchone()[0]
+        _add_lab_summary(conn, patient_id, lab_result_id, lab_result)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return lab_result_id
+
+
+def save_lab_results(conn: duckdb.DuckDBPyConnection, lab_results: list,
+                     patient_id: int = DEFAULT_PATIENT_ID) -> list:
+    """
+    Guarda varios resultados de laboratorio en una sola transacción.
+
+    Los ids se reservan de la secuencia antes de insertar, así la lista
+    devuelta sigue el orden de lab_results. Si algo falla no se guarda ninguno.
+
+    Args:
+        conn: Conexión a la base de datos
+        lab_results: Resultados de laboratorio a guardar (un panel o un archivo importado)
+        patient_id: Paciente al que pertenecen los resultados
+
+    Returns:
+        Lista de ids asignados, en el mismo orden que lab_results
+    """
+    return _in_transaction(conn, insert_lab_results, lab_results, patient_id)
+
+
+def insert_lab_results(conn: duckdb.DuckDBPyConnection, lab_results: list,
+                       patient_id: int = DEFAULT_PATIENT_ID) -> list:
+    """
+    Como save_lab_results, pero dentro de la transacción abierta por quien llama.
+
+    Returns:
+        Lista de ids asignados, en el mismo orden que lab_results
+    """
+    if not lab_results:
+        return []
+    return _insert_lab_frame(conn, _lab_results_frame(lab_results), patient_id)
+
+
+def _lab_results_frame(lab_results: list) -> pd.DataFrame:
+    """Columnas de lab_results para una lista de LabResult"""
+    return pd.DataFrame({
+        'test_name': [result.test_name for result in lab_results],
+        'value': np.array([result.value for result in lab_results], dtype=np.float64),
+        'unit': [result.unit for result in lab_results],
+        'date': np.array([result.timestamp for result in lab_results], dtype='datetime64[us]'),
+        'reference_min': [result.reference_min for result in lab_results],
+        'reference_max': [result.reference_max for result in lab_results],
+        'alert_level': [result.alert_level.value for result in lab_results],
+        'notes': [result.notes for result in lab_results],
+    })
+
+
+def _insert_lab_frame(conn: duckdb.DuckDBPyConnection, frame: pd.DataFrame, patient_id: int) -> list:
+    """Inserta filas de lab_results con ids nuevos y actualiza los resúmenes"""
+    ids = _reserve_ids(conn, 'lab_results_seq', len(frame))
+    frame.insert(0, 'id', ids)
+    frame.insert(1, 'patient_id', patient_id)
+    _insert_frame(conn, 'lab_results', frame)
+    _update_lab_summaries(conn, patient_id, ids.tolist())
+    return ids.tolist()
+
+
+class UpsertCounts(NamedTuple):
+    """Resultado de upsert_lab_results"""
+    inserted: int
+    updated: int
+    unchanged: int
+
+
+def lab_content_key(lab_result: LabResult, patient_id: int = DEFAULT_PATIENT_ID) -> str:
+    """
+    Clave de contenido de un resultado: identifica la misma medición
+    (paciente, test, fecha y hora, valor) entre cargas sucesivas.
+
+    El origen no forma parte de la clave: la misma medición cargada por dos
+    scripts es una sola fila (conserva el origen de la primera carga).
+    """
+    return _content_key(patient_id, lab_result.test_name, lab_result.timestamp, lab_result.value)
+
+
+def _content_key(patient_id: int, test_name: str, timestamp: int, value: float) -> str:
+    content = "\x1f".join((str(patient_id), test_name, str(timestamp), repr(float(value))))
+    return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+
+# Columnas que una nueva carga puede corregir sin que cambie la clave de contenido
+_UPSERT_COLUMNS = ('unit', 'reference_min', 'reference_max', 'alert_level', 'notes')
+
+
+def upsert_lab_results(conn: duckdb.DuckDBPyConnection, lab_results: list, source: str,
+                       patient_id: int = DEFAULT_PATIENT_ID) -> UpsertCounts:
+    """
+    Carga resultados de forma idempotente, en una sola transacción.
+
+    Cada resultado se identifica por su clave de contenido (lab_content_key):
+    los que no están en la base (ni en el archivo Parquet) se insertan, los
+    que cargó este mismo origen con otra unidad, referencias, nivel de alerta
+    o notas se actualizan y el resto no se toca: un resultado que ya cargó
+    otro origen cuenta como sin cambios aunque sus anotaciones difieran.
+    Volver a cargar el mismo archivo no escribe nada, aunque otro script
+    comparta resultados con él, y las filas cargadas por otras vías
+    (formulario, cola de ingesta) nunca se borran.
+
+    Las filas sin clave con el mismo test, fecha y valor (cargadas antes de
+    existir content_key) se adoptan en lugar de duplicarse.
+
+    Args:
+        conn: Conexión a la base de datos
+        lab_results: Resultados a cargar
+        source: Origen de la carga (p. ej. el nombre del script o del archivo)
+        patient_id: Paciente al que pertenecen los resultados
+
+    Returns:
+        UpsertCounts con la cantidad de filas insertadas, actualizadas y sin cambios
+    """
+    return _in_transaction(conn, merge_lab_results, lab_results, source, patient_id)
+
+
+def merge_lab_results(conn: duckdb.DuckDBPyConnection, lab_results: list, source: str,
+                      patient_id: int = DEFAULT_PATIENT_ID) -> UpsertCounts:
+    """
+    Como upsert_lab_results, pero dentro de la transacción abierta por quien llama.
+
+    Returns:
+        UpsertCounts con la cantidad de filas insertadas, actualizadas y sin cambios
+    """
+    if not lab_results:
+        return UpsertCounts(0, 0, 0)
+    frame = _lab_results_frame(lab_results)
+    frame['source'] = source
+    frame['content_key'] = [lab_content_key(result, patient_id) for result in lab_results]
+    # Un resultado repetido en la misma carga cuenta una sola vez (gana el último)
+    frame = frame.drop_duplicates('content_key', keep='last').reset_index(drop=True)
+
+    conn.register('lab_results_upsert', frame)
+    try:
+        conn.execute("""
+            UPDATE lab_results SET source = legacy.source, content_key = legacy.content_key
+            FROM (
+                SELECT min(lab_results.id) AS id, upsert.source, upsert.content_key
+                FROM lab_results JOIN lab_results_upsert AS upsert
+                  ON lab_results.test_name = upsert.test_name
+                 AND lab_results.date = upsert.date
+                 AND lab_results.value = upsert.value
+                WHERE lab_results.patient_id = ? AND lab_results.content_key IS NULL
+                  AND upsert.content_key NOT IN (
+                      SELECT content_key FROM lab_results WHERE content_key IS NOT NULL)
+                GROUP BY upsert.source, upsert.content_key
+            ) AS legacy
+            WHERE lab_results.id = legacy.id
+        """, [patient_id])
+
+        # Se compara por test, fecha y valor (lo que resume la clave): las filas
+        # archivadas conservan la clave con que se escribieron, o ninguna
+        source_table = table_source(conn, 'lab_results', patient_id)
+        existing = conn.execute(f"""
+            SELECT DISTINCT upsert.content_key
+            FROM lab_results_upsert AS upsert JOIN {source_table} AS lab_results
+              ON lab_results.patient_id = ?
+             AND lab_results.test_name = upsert.test_name
+             AND lab_results.date = upsert.date
+             AND lab_results.value = upsert.value
+        """, [patient_id]).fetchnumpy()['content_key']
+
+        current = ', '.join(f"lab_results.{column}" for column in _UPSERT_COLUMNS)
+        loaded = ', '.join(f"upsert.{column}" for column in _UPSERT_COLUMNS)
+        # Solo se corrigen las filas de esta misma carga (o sin origen, que pasan
+        # a ser suyas): otro script puede transcribir el mismo resultado con sus
+        # propias referencias y notas, y cada uno pisaría al otro en cada corrida
+        updated = conn.execute(f"""
+            UPDATE lab_results SET {', '.join(f"{column} = upsert.{column}" for column in _UPSERT_COLUMNS)},
+                   source = upsert.source
+            FROM lab_results_upsert AS upsert
+            WHERE lab_results.content_key = upsert.content_key
+              AND (lab_results.source IS NULL OR lab_results.source = upsert.source)
+              AND ({current}) IS DISTINCT FROM ({loaded})
+        """).fetchone()[0]
+    finally:
+        conn.unregister('lab_results_upsert')
+
+    if updated:
+        # Las correcciones pueden tocar el último valor de un test (las sumas no cambian)
+        rebuild_lab_latest(conn, patient_id)
+        # y dejan desactualizados los resultados ya cargados en memoria
+        bump_lab_revision(conn, patient_id)
+
+    new_rows = frame[~frame['content_key'].isin(existing)].reset_index(drop=True)
+    if len(new_rows):
+        _insert_lab_frame(conn, new_rows, patient_id)
+    return UpsertCounts(len(new_rows), updated, len(frame) - len(new_rows) - updated)
+
+
+def save_vital_signs(conn: duckdb.DuckDBPyConnection, vital_signs: list,
+                     patient_id: int = DEFAULT_PATIENT_ID) -> list:
     """
+    Guarda varios registros de signos vitales en una sola transacción.
+
+    Args:
+        conn: Conexión a la base de datos
+        vital_signs: Registros VitalSigns a guardar
+        patient_id: Paciente al que pertenecen los registros
+
+    Returns:
+        Lista de ids asignados, en el mismo orden que vital_signs
+    """
+    return _in_transaction(conn, insert_vital_signs, vital_signs, patient_id)
+
+
+def insert_vital_signs(conn: duckdb.DuckDBPyConnection, vital_signs: list,
+                       patient_id: int = DEFAULT_PATIENT_ID) -> list:
+    """Como save_vital_signs, pero dentro de la transacción abierta por quien llama"""
+    if not vital_signs:
+        return []
+    ids = _reserve_ids(conn, 'vital_signs_seq', len(vital_signs))
+    frame = pd.DataFrame({
+        'id': ids,
+        'date': np.array([vitals.timestamp for vitals in vital_signs], dtype='datetime64[us]'),
+        'blood_pressure_systolic': pd.array([vitals.blood_pressure_sys for vitals in vital_signs], dtype="Int64"),
+        'blood_pressure_diastolic': pd.array([vitals.blood_pressure_dia for vitals in vital_signs], dtype="Int64"),
+        'heart_rate': pd.array([vitals.heart_rate for vitals in vital_signs], dtype="Int64"),
+        'oxygen_saturation': pd.array([vitals.oxygen_saturation for vitals in vital_signs], dtype="Int64"),
+        'temperature': pd.array([vitals.temperature for vitals in vital_signs], dtype="Float64"),
+        'respiratory_rate': pd.array([vitals.respiratory_rate for vitals in vital_signs], dtype="Int64"),
+        'glasgow_score': pd.array([vitals.glasgow_score for vitals in vital_signs], dtype="Int64"),
+        'notes': [vitals.notes for vitals in vital_signs],
+        'patient_id': patient_id,
+    })
+    _insert_frame(conn, 'vital_signs', frame)
+    return ids.tolist()
+
+
+def save_clinical_events(conn: duckdb.DuckDBPyConnection, events: list,
+                         patient_id: int = DEFAULT_PATIENT_ID) -> list:
+    """
+    Guarda varios eventos clínicos en una sola transacción.
+
+    Args:
+        conn: Conexión a la base de datos
+        events: Eventos ClinicalEvent a guardar
+        patient_id: Paciente al que pertenecen los eventos
+
+    Returns:
+        Lista de ids asignados, en el mismo orden que events
+    """
+    return _in_transaction(conn, insert_clinical_events, events, patient_id)
+
+
+def insert_clinical_events(conn: duckdb.DuckDBPyConnection, events: list,
+                           patient_id: int = DEFAULT_PATIENT_ID) -> list:
+    """Como save_clinical_events, pero dentro de la transacción abierta por quien llama"""
+    if not events:
+        return []
+    ids = _reserve_ids(conn, 'medical_events_seq', len(events))
+    frame = pd.DataFrame({
+        'id': ids,
+        'date': np.array([event.timestamp for event in events], dtype='datetime64[us]'),
+        'type': [event.event_type for event in events],
+        # El título es la primera línea de la descripción, como en los scripts de carga
+        'title': [event.description.split("\n", 1)[0] for event in events],
+        'description': [event.description for event in events],
+        'urgency': [event.severity for event in events],
+        'patient_id': patient_id,
+    })
+    _insert_frame(conn, 'medical_events', frame)
+    return ids.tolist()
+
+
+def _in_transaction(conn: duckdb.DuckDBPyConnection, insert, *args):
+    """Ejecuta una función insert_* en su propia transacción"""
+    conn.begin()
+    try:
+        result = insert(conn, *args)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return result
+
+
+def _reserve_ids(conn: duckdb.DuckDBPyConnection, sequence: str, count: int) -> np.ndarray:
+    """Reserva count ids de una secuencia, en orden creciente"""
+    return np.sort(conn.execute(
+        f"SELECT nextval('{sequence}') AS id FROM range(?)", [count]
+    ).fetchnumpy()['id'])
+
+
+def _insert_frame(conn: duckdb.DuckDBPyConnection, table: str, frame: pd.DataFrame):
+    """Inserta un DataFrame en una tabla con un solo INSERT ... SELECT"""
+    columns = ', '.join(frame.columns)
+    conn.register(f'{table}_batch', frame)
+    try:
+        conn.execute(f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {table}_batch")
+    finally:
+        conn.unregister(f'{table}_batch')
+
+
+# Resoluciones de lab_rollups (partes de date_trunc), de la más fina a la más gruesa
+ROLLUP_RESOLUTIONS = ('day', 'week', 'month')
+
+# Filas recién insertadas: el rango de ids deja usar los zonemaps y el IN filtra exacto
+_NEW_ROWS = "patient_id = ? AND id BETWEEN ? AND ? AND id IN (SELECT unnest(?)) AND date IS NOT NULL"
+# Con ids consecutivos (una sola fila, o un lote reservado de una vez) el rango ya es exacto
+_NEW_ROWS_RANGE = "patient_id = ? AND id BETWEEN ? AND ? AND date IS NOT NULL"
+
+# Agregación a intervalos de todas las resoluciones ({source}: lab_results o con el archivo; {where} filtra)
+_ROLLUP_SELECT = """
+        SELECT patient_id, test_name, resolution, date_trunc(resolution, date) AS bucket,
+               count(*), sum(value), min(value), max(value)
+        FROM {source} AS lab_results, (SELECT unnest(%s) AS resolution)
+        WHERE {where} AND value IS NOT NULL
+        GROUP BY ALL
+""" % list(ROLLUP_RESOLUTIONS)
+
+
+# Tablas que se pueden archivar a Parquet (todas tienen id y una columna date)
+ARCHIVABLE_TABLES = ('lab_results', 'vital_signs', 'medical_events')
+
+
+def archived_files(conn: duckdb.DuckDBPyConnection, table: str, patient_id: Optional[int] = None,
+                   start: Optional[datetime] = None, end: Optional[datetime] = None) -> list:
+    """
+    Archivos Parquet de una tabla cuyas particiones (paciente, mes) tocan el período.
+
+    Args:
+        conn: Conexión a la base de datos
+        table: Tabla archivada
+        patient_id: Paciente (None = todos)
+        start: Inicio del período (None = sin límite)
+        end: Fin del período (None = sin límite)
+
+    Returns:
+        Lista de rutas
+    """
+    rows = conn.execute("""
+        SELECT path FROM archive_partitions
+        WHERE table_name = ?
+          AND (?::INTEGER IS NULL OR patient_id = ?)
+          AND (?::TIMESTAMP IS NULL OR month >= date_trunc('month', ?::TIMESTAMP))
+          AND (?::TIMESTAMP IS NULL OR month <= ?::TIMESTAMP)
+        ORDER BY month, path
+    """, [table, patient_id, patient_id, start, start, end, end]).fetchall()
+    return [path for path, in rows]
+
+
+def table_source(conn: duckdb.DuckDBPyConnection, table: str, patient_id: Optional[int] = None,
+                 start: Optional[datetime] = None, end: Optional[datetime] = None) -> str:
+    """
+    Expresión para FROM con las filas de la tabla más las archivadas del período.
+
+    Si ninguna partición archivada toca el período devuelve solo el nombre de
+    la tabla, así que el historial archivado no cuesta nada hasta que se pide.
+    El filtro por paciente y fecha sigue siendo responsabilidad de la consulta.
+
+    Los archivos se unen por nombre de columna: los escritos antes de una
+    migración que agregó columnas (p. ej. source y content_key) las devuelven
+    en NULL, y los que aún tienen date y time separados se combinan.
+
+    Args:
+        conn: Conexión a la base de datos
+        table: Tabla a consultar
+        patient_id: Paciente (None = todos)
+        start: Inicio del período (None = sin límite)
+        end: Fin del período (None = sin límite)
+
+    Returns:
+        Nombre de la tabla o subconsulta UNION ALL con read_parquet
+    """
+    paths = archived_files(conn, table, patient_id, start, end)
+    if not paths:
+        return table
+    columns = ', '.join(table_columns(conn, table))
+    files = ', '.join("'" + path.replace("'", "''") + "'" for path in paths)
+    archive = f"read_parquet([{files}], hive_partitioning = true, union_by_name = true)"
+    # Archivos escritos antes de combinar columnas (ver DERIVED_COLUMNS)
+    archived_columns = {row[0] for row in conn.execute(f"DESCRIBE SELECT * FROM {archive}").fetchall()}
+    derived = [f"{expression} AS {column}"
+               for column, (needs, expression) in DERIVED_COLUMNS.get(table, {}).items()
+               if needs in archived_columns]
+    replace = f" REPLACE ({', '.join(derived)})" if derived else ""
+    return f"""(
+        SELECT {columns} FROM (
+            SELECT *{replace} FROM (
+                SELECT * FROM {table}
+                UNION ALL BY NAME
+                SELECT * FROM {archive}
+            )
+        )
+    )"""
+
+
+def _update_lab_summaries(conn: duckdb.DuckDBPyConnection, patient_id: int, ids: list):
+    """
+    Actualiza lab_latest y lab_rollups con los resultados recién insertados.
+
+    Son dos upserts por llamada (unos 5 ms cada uno aunque sea una sola
+    fila), así que conviene llamarla una vez por lote: save_lab_results y la
+    cola de ingesta lo hacen; save_lab_result usa _add_lab_summary.
+    """
+    first, last = min(ids), max(ids)
+    if last - first + 1 == len(ids):
+        where, params = _NEW_ROWS_RANGE, [patient_id, first, last]
+    else:
+        where, params = _NEW_ROWS, [patient_id, first, last, ids]
+    _update_lab_latest(conn, where, params)
+    _update_lab_rollups(conn, where, params)
+
+
+def _add_lab_summary(conn: duckdb.DuckDBPyConnection, patient_id: int, lab_result_id: int,
+                     lab_result: LabResult):
+    """
+    Como _update_lab_summaries para una sola fila, con sus valores como
+    parámetros: no lee lab_results. Lo que queda (unos 8 ms por fila, con el
+    INSERT) es el costo fijo de cada sentencia de DuckDB.
+    """
+    date = lab_result.date
+    if date is None:
+        return
+    conn.execute("""
+        INSERT INTO lab_latest
+        (patient_id, test_name, lab_result_id, value, unit, date,
+         reference_min, reference_max, alert_level, notes, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, now())
+        ON CONFLICT (patient_id, test_name) DO UPDATE SET
+            lab_result_id = excluded.lab_result_id,
+            value = excluded.value,
+            unit = excluded.unit,
+            date = excluded.date,
+            reference_min = excluded.reference_min,
+            reference_max = excluded.reference_max,
+            alert_level = excluded.alert_level,
+            notes = excluded.notes,
+            updated_at = excluded.updated_at
+        WHERE (excluded.date, excluded.lab_result_id) > (lab_latest.date, lab_latest.lab_result_id)
+    """, [patient_id, lab_result.test_name, lab_result_id, lab_result.value, lab_result.unit, date,
+          lab_result.reference_min, lab_result.reference_max, lab_result.alert_level.value,
+          lab_result.notes])
+    if lab_result.value is None:
+        return
     conn.execute("""
-        INSERT INTO lab_results
-        (test_name, value, unit, date, reference_min, reference_max, alert_level, notes)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-    """, [
-        lab_result.test_name,
-        lab_result.value,
-        lab_result.unit,
-        lab_result.date,
-        lab_result.reference_min,
-        lab_result.reference_max,
-        lab_result.alert_level.value,
-        lab_result.notes
-    ])
-    conn.commit()
-
-
-def save_conditions(conn: duckdb.DuckDBPyConnection, conditions: list):
+        INSERT INTO lab_rollups (patient_id, test_name, resolution, bucket, count, sum, min, max)
+        SELECT ?, ?, resolution, date_trunc(resolution, ?::TIMESTAMP), 1, ?, ?, ?
+        FROM (SELECT unnest(?) AS resolution)
+        ON CONFLICT (patient_id, test_name, resolution, bucket) DO UPDATE SET
+            count = lab_rollups.count + excluded.count,
+            sum = lab_rollups.sum + excluded.sum,
+            min = least(lab_rollups.min, excluded.min),
+            max = greatest(lab_rollups.max, excluded.max)
+    """, [patient_id, lab_result.test_name, date, lab_result.value, lab_result.value,
+          lab_result.value, list(ROLLUP_RESOLUTIONS)])
+
+
+def _update_lab_latest(conn: duckdb.DuckDBPyConnection, where: str, params: list):
+    """Lleva a lab_latest los resultados nuevos que sean más recientes que los guardados"""
+    conn.execute(f"""
+        INSERT INTO lab_latest
+        (patient_id, test_name, lab_result_id, value, unit, date,
+         reference_min, reference_max, alert_level, notes, updated_at)
+        SELECT patient_id, test_name, row.id, row.value, row.unit, row.date,
+               row.reference_min, row.reference_max, row.alert_level, row.notes, now()
+        FROM (
+            SELECT patient_id, test_name, arg_max(lab_results, (date, id)) AS row
+            FROM lab_results
+            WHERE {where}
+            GROUP BY patient_id, test_name
+        )
+        ON CONFLICT (patient_id, test_name) DO UPDATE SET
+            lab_result_id = excluded.lab_result_id,
+            value = excluded.value,
+            unit = excluded.unit,
+            date = excluded.date,
+            reference_min = excluded.reference_min,
+            reference_max = excluded.reference_max,
+            alert_level = excluded.alert_level,
+            notes = excluded.notes,
+            updated_at = excluded.updated_at
+        WHERE (excluded.date, excluded.lab_result_id) > (lab_latest.date, lab_latest.lab_result_id)
+    """, params)
+
+
+def _update_lab_rollups(conn: duckdb.DuckDBPyConnection, where: str, params: list):
+    """Suma los resultados nuevos a sus intervalos de lab_rollups"""
+    conn.execute(f"""
+        INSERT INTO lab_rollups (patient_id, test_name, resolution, bucket, count, sum, min, max)
+        {_ROLLUP_SELECT.format(source='lab_results', where=where)}
+        ON CONFLICT (patient_id, test_name, resolution, bucket) DO UPDATE SET
+            count = lab_rollups.count + excluded.count,
+            sum = lab_rollups.sum + excluded.sum,
+            min = least(lab_rollups.min, excluded.min),
+            max = greatest(lab_rollups.max, excluded.max)
+    """, params)
+
+
+def rebuild_lab_rollups(conn: duckdb.DuckDBPyConnection, patient_id: Optional[int] = None):
+    """
+    Recalcula lab_rollups desde lab_results.
+
+    Args:
+        conn: Conexión a la base de datos
+        patient_id: Paciente a recalcular (None = todos)
+    """
+    where = "patient_id = ? AND date IS NOT NULL" if patient_id is not None else "date IS NOT NULL"
+    params = [patient_id] if patient_id is not None else []
+    conn.execute(f"DELETE FROM lab_rollups {'WHERE patient_id = ?' if patient_id is not None else ''}", params)
+    conn.execute(f"""
+        INSERT INTO lab_rollups (patient_id, test_name, resolution, bucket, count, sum, min, max)
+        {_ROLLUP_SELECT.format(source=table_source(conn, 'lab_results', patient_id), where=where)}
+    """, params)
+
+
+def rebuild_lab_summaries(conn: duckdb.DuckDBPyConnection, patient_id: Optional[int] = None):
+    """
+    Recalcula lab_latest y lab_rollups desde lab_results.
+
+    Necesario tras escrituras que no pasan por save_lab_result/save_lab_results
+    (borrados o INSERT directos de los scripts de carga).
+
+    Args:
+        conn: Conexión a la base de datos
+        patient_id: Paciente a recalcular (None = todos)
+    """
+    rebuild_lab_latest(conn, patient_id)
+    rebuild_lab_rollups(conn, patient_id)
+
+
+def rebuild_lab_latest(conn: duckdb.DuckDBPyConnection, patient_id: Optional[int] = None):
+    """
+    Recalcula lab_latest desde lab_results.
+
+    Args:
+        conn: Conexión a la base de datos
+        patient_id: Paciente a recalcular (None = todos)
+    """
+    where = "WHERE patient_id = ?" if patient_id is not None else ""
+    params = [patient_id] if patient_id is not None else []
+    conn.execute(f"DELETE FROM lab_latest {where}", params)
+    conn.execute(f"""
+        INSERT INTO lab_latest
+        (patient_id, test_name, lab_result_id, value, unit, date,
+         reference_min, reference_max, alert_level, notes, updated_at)
+        SELECT patient_id, test_name, row.id, row.value, row.unit, row.date,
+               row.reference_min, row.reference_max, row.alert_level, row.notes, now()
+        FROM (
+            SELECT patient_id, test_name, arg_max(lab_results, (date, id)) AS row
+            FROM {table_source(conn, 'lab_results', patient_id)} AS lab_results
+            {where}{" AND" if where else "WHERE"} date IS NOT NULL
+            GROUP BY patient_id, test_name
+        )
+    """, params)
+
+
+def load_latest_results(conn: duckdb.DuckDBPyConnection, patient_id: int = DEFAULT_PATIENT_ID) -> dict:
+    """
+    Obtiene el último resultado de cada test desde lab_latest.
+
+    El costo depende de la cantidad de tests, no del tamaño del historial.
+
+    Args:
+        conn: Conexión a la base de datos
+        patient_id: Paciente a consultar
+
+    Returns:
+        Diccionario test_name -> LabResult
+    """
+    rows = conn.execute("""
+        SELECT test_name, value, unit, date, reference_min, reference_max, alert_level, notes
+        FROM lab_latest
+        WHERE patient_id = ?
+        ORDER BY test_name
+    """, [patient_id]).fetchall()
+
+    latest = {}
+    for test_name, value, unit, date, ref_min, ref_max, alert_level, notes in rows:
+        latest[test_name] = LabResult(
+            test_name=test_name,
+            value=value,
+            unit=unit,
+            date=date,
+            reference_min=ref_min if ref_min else None,
+            reference_max=ref_max if ref_max else None,
+            alert_level=ALERT_LEVEL_LOOKUP.get(alert_level, AlertLevel.NORMAL),
+            notes=notes or ""
+        )
+    return latest
+
+
+def load_lab_series(conn: duckdb.DuckDBPyConnection, test_name: str, start: Optional[datetime] = None,
+                    end: Optional[datetime] = None, patient_id: int = DEFAULT_PATIENT_ID) -> LabSeries:
+    """
+    Obtiene los resultados crudos de un test en un período, incluidos los archivados.
+
+    Solo se leen los archivos Parquet de los meses que toca el período.
+
+    Args:
+        conn: Conexión a la base de datos
+        test_name: Nombre del test
+        start: Inicio del período (None = desde el primer resultado)
+        end: Fin del período (None = hasta el último resultado)
+        patient_id: Paciente a consultar
+
+    Returns:
+        LabSeries ordenada por fecha
+    """
+    columns = conn.execute(f"""
+        SELECT epoch_us(date) AS timestamp, value, unit, reference_min, reference_max, alert_level
+        FROM {table_source(conn, 'lab_results', patient_id, start, end)}
+        WHERE patient_id = ? AND test_name = ? AND value IS NOT NULL
+          AND (?::TIMESTAMP IS NULL OR date >= ?::TIMESTAMP)
+          AND (?::TIMESTAMP IS NULL OR date <= ?::TIMESTAMP)
+        ORDER BY date, id
+    """, [patient_id, test_name, start, start, end, end]).fetchnumpy()
+
+    ref_min = np.ma.filled(columns['reference_min'], 0.0)
+    ref_max = np.ma.filled(columns['reference_max'], 0.0)
+    level_inverse, levels = pd.factorize(np.ma.filled(columns['alert_level'], ""))
+    level_codes = [ALERT_CODES[ALERT_LEVEL_LOOKUP.get(level, AlertLevel.NORMAL)] for level in levels.tolist()]
+    units = np.ma.filled(columns['unit'], "")
+    return LabSeries(
+        test_name=test_name,
+        unit=units[-1] if len(units) else "",
+        timestamps=np.ma.getdata(columns['timestamp']),
+        values=np.ma.getdata(columns['value']),
+        reference_min=np.where(ref_min == 0, np.nan, ref_min),
+        reference_max=np.where(ref_max == 0, np.nan, ref_max),
+        alert_codes=np.array(level_codes, dtype=np.int8)[level_inverse]
+    )
+
+
+def load_lab_trend(conn: duckdb.DuckDBPyConnection, test_name: str, start: datetime,
+                   end: Optional[datetime] = None, patient_id: int = DEFAULT_PATIENT_ID,
+                   max_points: int = 500) -> LabTrend:
+    """
+    Obtiene la tendencia de un test eligiendo la resolución según el período.
+
+    Devuelve los puntos crudos si no superan max_points; si no, la resolución
+    más fina de lab_rollups (día, semana, mes) con a lo sumo max_points
+    intervalos. La elección se hace contando filas de lab_rollups, sin
+    recorrer lab_results.
+
+    Args:
+        conn: Conexión a la base de datos
+        test_name: Nombre del test
+        start: Inicio del período
+        end: Fin del período (None = hasta el último resultado)
+        patient_id: Paciente a consultar
+        max_points: Máximo de puntos a devolver (salvo con resolución mensual)
+
+    Returns:
+        LabTrend con resolution 'raw', 'day', 'week' o 'month'
+    """
+    counts = conn.execute("""
+        SELECT resolution, COUNT(*), SUM(count)
+        FROM lab_rollups
+        WHERE patient_id = ? AND test_name = ?
+          AND bucket >= date_trunc(resolution, ?::TIMESTAMP)
+          AND (?::TIMESTAMP IS NULL OR bucket <= ?::TIMESTAMP)
+        GROUP BY resolution
+    """, [patient_id, test_name, start, end, end]).fetchall()
+    buckets = {resolution: bucket_count for resolution, bucket_count, _ in counts}
+    raw_points = sum(points for resolution, _, points in counts if resolution == ROLLUP_RESOLUTIONS[0])
+
+    latest = conn.execute("""
+        SELECT unit, reference_min, reference_max FROM lab_latest
+        WHERE patient_id = ? AND test_name = ?
+    """, [patient_id, test_name]).fetchone()
+    unit, ref_min, ref_max = latest if latest else ("", None, None)
+
+    if raw_points <= max_points:
+        series = load_lab_series(conn, test_name, start, end, patient_id)
+        values = series.values
+        return LabTrend(test_name, unit, 'raw', series.timestamps,
+                        values, values, values, np.ones(len(values), dtype=np.int64),
+                        ref_min or None, ref_max or None, series)
+
+    resolution = next((resolution for resolution in ROLLUP_RESOLUTIONS
+                       if buckets.get(resolution, 0) <= max_points), ROLLUP_RESOLUTIONS[-1])
+    columns = conn.execute("""
+        SELECT epoch_us(bucket) AS timestamp, sum / count AS mean, min, max, count
+        FROM lab_rollups
+        WHERE patient_id = ? AND test_name = ? AND resolution = ?
+          AND bucket >= date_trunc(resolution, ?::TIMESTAMP)
+          AND (?::TIMESTAMP IS NULL OR bucket <= ?::TIMESTAMP)
+        ORDER BY bucket
+    """, [patient_id, test_name, resolution, start, end, end]).fetchnumpy()
+    return LabTrend(test_name, unit, resolution,
+                    *(np.ma.getdata(columns[name]) for name in ('timestamp', 'mean', 'min', 'max', 'count')),
+                    ref_min or None, ref_max or None)
+
+
+def save_conditions(conn: duckdb.DuckDBPyConnection, conditions: list,
+                    patient_id: int = DEFAULT_PATIENT_ID):
     """
     Actualiza las condiciones médicas en la base de datos.
 
     Args:
         conn: Conexión a la base de datos
         conditions: Lista de condiciones activas
+        patient_id: Paciente al que pertenecen las condiciones
     """
     # Primero desactivar todas
-    conn.execute("UPDATE medical_conditions SET active = FALSE")
+    conn.execute("UPDATE medical_conditions SET active = FALSE WHERE patient_id = ?", [patient_id])
 
     # Activar las seleccionadas
     for condition in conditions:
@@ -192,11 +1843,11 @@ def save_conditions(conn: duckdb.DuckDBPyConnection, conditions: list):
 
         if condition_name:
             conn.execute("""
-                INSERT INTO medical_conditions (condition, active)
-                VALUES (?, TRUE)
-                ON CONFLICT (condition) DO UPDATE SET
+                INSERT INTO medical_conditions (patient_id, condition, active)
+                VALUES (?, ?, TRUE)
+                ON CONFLICT (patient_id, condition) DO UPDATE SET
                 active = TRUE,
-                updated_at = CURRENT_TIMESTAMP
-            """, [condition_name])
+                updated_at = now()
+            """, [patient_id, condition_name])
 
     conn.commit()
\ No newline at end of file
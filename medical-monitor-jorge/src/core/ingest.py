@@ -0,0 +1,308 @@
+"""
+Cola de ingesta con escritura diferida.
+Los formularios e importadores encolan resultados de laboratorio, signos
+vitales y eventos y siguen de inmediato; un hilo en segundo plano los guarda
+en lotes (por tamaño o por tiempo) en una sola transacción por lote.
+
+Cada envío se agrega primero a un archivo JSONL local (con fsync), de modo
+que un corte del proceso no pierde datos: al reiniciar se reenvían las
+entradas que la base todavía no registró en ingest_log.
+"""
+
+import json
+import os
+import threading
+from dataclasses import fields
+from datetime import datetime
+from enum import Enum
+from typing import Dict, List, Optional, Tuple
+
+from src.core import database as db
+from src.core.connection import ConnectionManager, get_connection_manager
+from src.core.models import AlertLevel, ClinicalEvent, LabResult, VitalSigns
+
+# Tipos de entrada: clase del modelo y función que inserta un lote
+_KINDS = {
+    'lab': (LabResult, db.insert_lab_results),
+    'vital': (VitalSigns, db.insert_vital_signs),
+    'event': (ClinicalEvent, db.insert_clinical_events),
+}
+
+# Tablas que modifica el guardado de cada tipo (se informan al publicar)
+_TABLES = {
+    'lab': ('lab_results', 'lab_latest', 'lab_rollups'),
+    'vital': ('vital_signs',),
+    'event': ('medical_events',),
+}
+
+
+def _to_record(item) -> dict:
+    record = {}
+    for item_field in fields(item):
+        if not item_field.init:
+            continue
+        value = getattr(item, item_field.name)
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        elif isinstance(value, Enum):
+            value = value.value
+        record[item_field.name] = value
+    return record
+
+
+def _from_record(kind: str, record: dict):
+    model = _KINDS[kind][0]
+    values = dict(record)
+    for name in ('date', 'start_date', 'end_date'):
+        if isinstance(values.get(name), str):
+            values[name] = datetime.fromisoformat(values[name])
+    if 'alert_level' in values:
+        values['alert_level'] = AlertLevel(values['alert_level'])
+    return model(**values)
+
+
+class IngestionQueue:
+    """
+    Cola de escrituras pendientes con un hilo que las guarda en lotes.
+
+    El número de secuencia de cada entrada se guarda en ingest_log en la misma
+    transacción que sus filas, así que el reenvío tras un corte nunca duplica.
+    """
+
+    def __init__(self, manager: ConnectionManager, spool_path: str,
+                 batch_size: int = 500, flush_interval: float = 2.0, max_backoff: float = 60.0):
+        """
+        Args:
+            manager: Conexión compartida a la base de datos
+            spool_path: Archivo JSONL donde se registran las entradas pendientes
+            batch_size: Entradas pendientes que disparan un guardado inmediato
+            flush_interval: Segundos máximos que una entrada espera a guardarse
+            max_backoff: Espera máxima entre reintentos mientras la base sigue fallando
+        """
+        self.manager = manager
+        self.spool_path = spool_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_backoff = max_backoff
+
+        self._spool_key = os.path.basename(spool_path)
+        # Entradas pendientes: (secuencia, tipo, paciente, elemento)
+        self._pending: List[Tuple[int, str, int, object]] = []
+        self._seq = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._stopped = False
+
+        self.flushed = 0
+        self.batches = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+
+        self._recover()
+        self._spool = open(self.spool_path, 'a', encoding='utf-8')
+        self._thread = threading.Thread(target=self._run, name="ingestion-flusher", daemon=True)
+        self._thread.start()
+
+    def _recover(self) -> None:
+        """Recarga del archivo local las entradas que la base no registró"""
+        if not os.path.exists(self.spool_path):
+            return
+        row = self.manager.cursor().execute(
+            "SELECT last_seq FROM ingest_log WHERE spool = ?", [self._spool_key]).fetchone()
+        last_seq = row[0] if row else 0
+
+        with open(self.spool_path, encoding='utf-8') as spool:
+            for line in spool:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # Última línea a medio escribir durante un corte
+                    continue
+                self._seq = max(self._seq, entry['seq'])
+                if entry['seq'] > last_seq:
+                    self._pending.append((entry['seq'], entry['kind'], entry['patient_id'],
+                                          _from_record(entry['kind'], entry['data'])))
+        self._seq = max(self._seq, last_seq)
+        self._compact()
+
+    def submit(self, kind: str, item, patient_id: int = db.DEFAULT_PATIENT_ID) -> int:
+        """
+        Encola una escritura; vuelve en cuanto quedó registrada en el archivo local.
+
+        Args:
+            kind: 'lab', 'vital' o 'event'
+            item: LabResult, VitalSigns o ClinicalEvent
+            patient_id: Paciente al que pertenece
+
+        Returns:
+            Número de secuencia de la entrada
+        """
+        if kind not in _KINDS:
+            raise ValueError(f"Tipo de entrada desconocido: {kind}")
+        with self._lock:
+            if self._stopped:
+                raise RuntimeError("La cola de ingesta está cerrada")
+            self._seq += 1
+            entry = {'seq': self._seq, 'kind': kind, 'patient_id': patient_id, 'data': _to_record(item)}
+            self._spool.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._spool.flush()
+            os.fsync(self._spool.fileno())
+            self._pending.append((self._seq, kind, patient_id, item))
+            if len(self._pending) >= self.batch_size:
+                self._wakeup.notify()
+            return self._seq
+
+    def submit_lab_result(self, result: LabResult, patient_id: int = db.DEFAULT_PATIENT_ID) -> int:
+        """Encola un resultado de laboratorio"""
+        return self.submit('lab', result, patient_id)
+
+    def submit_vital_signs(self, vitals: VitalSigns, patient_id: int = db.DEFAULT_PATIENT_ID) -> int:
+        """Encola un registro de signos vitales"""
+        return self.submit('vital', vitals, patient_id)
+
+    def submit_clinical_event(self, event: ClinicalEvent, patient_id: int = db.DEFAULT_PATIENT_ID) -> int:
+        """Encola un evento clínico"""
+        return self.submit('event', event, patient_id)
+
+    def pending(self) -> int:
+        """Cantidad de entradas todavía no guardadas"""
+        with self._lock:
+            return len(self._pending)
+
+    def _run(self) -> None:
+        failures = 0
+        while True:
+            with self._lock:
+                if failures:
+                    # Tras un error se espera (el doble cada vez) aunque haya un
+                    # lote completo: reintentar enseguida solo repetiría el error
+                    delay = min(self.flush_interval * 2 ** (failures - 1), self.max_backoff)
+                    self._wakeup.wait_for(lambda: self._stopped, delay)
+                elif not self._stopped and len(self._pending) < self.batch_size:
+                    self._wakeup.wait(self.flush_interval)
+                if self._stopped:
+                    return
+            errors = self.errors
+            self.flush()
+            failures = failures + 1 if self.errors > errors else 0
+
+    def flush(self) -> int:
+        """
+        Guarda ahora todas las entradas pendientes, en lotes de batch_size.
+
+        Returns:
+            Cantidad de entradas guardadas (0 si la base falló; se reintentará)
+        """
+        with self._flush_lock:
+            total, tables = self._flush_batches()
+        if total:
+            # Las instantáneas de lectura (ver snapshot.py) copian de nuevo solo estas tablas
+            self.manager.publish(tables)
+        return total
+
+    def _flush_batches(self) -> Tuple[int, set]:
+        total = 0
+        tables = set()
+        while True:
+            with self._lock:
+                batch = self._pending[:self.batch_size]
+            if not batch:
+                return total, tables
+            try:
+                self._write_batch(batch)
+            except Exception as e:
+                self.errors += 1
+                self.last_error = str(e)
+                print(f"Error guardando la cola de ingesta: {e}")
+                return total, tables
+            with self._lock:
+                del self._pending[:len(batch)]
+                self.flushed += len(batch)
+                self.batches += 1
+                if not self._pending:
+                    self._compact()
+            total += len(batch)
+            for _, kind, _, _ in batch:
+                tables.update(_TABLES[kind])
+
+    def _write_batch(self, batch: List[Tuple[int, str, int, object]]) -> None:
+        groups: Dict[Tuple[str, int], list] = {}
+        for _, kind, patient_id, item in batch:
+            groups.setdefault((kind, patient_id), []).append(item)
+
+        with self.manager.writer() as conn:
+            conn.begin()
+            try:
+                for (kind, patient_id), items in groups.items():
+                    _KINDS[kind][1](conn, items, patient_id)
+                conn.execute("""
+                    INSERT INTO ingest_log (spool, last_seq, updated_at) VALUES (?, ?, now())
+                    ON CONFLICT (spool) DO UPDATE SET last_seq = excluded.last_seq, updated_at = now()
+                """, [self._spool_key, batch[-1][0]])
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+    def _compact(self) -> None:
+        """Reescribe el archivo local con solo las entradas pendientes (con el lock tomado)"""
+        temp_path = self.spool_path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as spool:
+            for seq, kind, patient_id, item in self._pending:
+                entry = {'seq': seq, 'kind': kind, 'patient_id': patient_id, 'data': _to_record(item)}
+                spool.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            spool.flush()
+            os.fsync(spool.fileno())
+        spool_file = getattr(self, '_spool', None)
+        if spool_file is not None:
+            spool_file.close()
+        os.replace(temp_path, self.spool_path)
+        if spool_file is not None:
+            self._spool = open(self.spool_path, 'a', encoding='utf-8')
+
+    def close(self) -> None:
+        """Guarda lo pendiente y detiene el hilo"""
+        with self._lock:
+            self._stopped = True
+            self._wakeup.notify()
+        self._thread.join()
+        self.flush()
+        with self._lock:
+            self._spool.close()
+
+    def stats(self) -> Dict[str, Optional[object]]:
+        """Estadísticas de la cola"""
+        with self._lock:
+            return {
+                'pending': len(self._pending),
+                'flushed': self.flushed,
+                'batches': self.batches,
+                'errors': self.errors,
+                'last_error': self.last_error
+            }
+
+
+_queues: Dict[str, IngestionQueue] = {}
+_queues_lock = threading.Lock()
+
+
+def get_ingestion_queue(db_path: str = "medical_data.db") -> IngestionQueue:
+    """
+    Cola de ingesta compartida por todo el proceso para una base de datos.
+
+    El archivo local se guarda junto a la base (<db_path>.spool.jsonl).
+
+    Args:
+        db_path: Ruta a la base de datos
+
+    Returns:
+        La misma IngestionQueue para todas las llamadas con la misma ruta
+    """
+    key = os.path.abspath(db_path)
+    with _queues_lock:
+        queue = _queues.get(key)
+        if queue is None:
+            queue = IngestionQueue(get_connection_manager(db_path), key + ".spool.jsonl")
+            _queues[key] = queue
+        return queue
@@ -0,0 +1,146 @@
+"""
+Índice de intervalos para consultas temporales sobre medicaciones.
+Árbol de intervalos centrado (estático) sobre timestamps canónicos.
+"""
+
+import heapq
+from typing import Callable, Generic, Iterable, List, Optional, Tuple, TypeVar
+
+from .models import Medication, LabResult, to_timestamp
+
+T = TypeVar('T')
+
+# Fin de los intervalos abiertos (medicaciones sin fecha de fin)
+OPEN_END = 2 ** 63 - 1
+
+
+class _Node:
+    __slots__ = ('center', 'by_start', 'by_end', 'left', 'right')
+
+    def __init__(self, center, by_start, by_end, left, right):
+        self.center = center
+        self.by_start = by_start
+        self.by_end = by_end
+        self.left = left
+        self.right = right
+
+
+class IntervalIndex(Generic[T]):
+    """
+    Árbol de intervalos cerrados [inicio, fin].
+
+    Las consultas de punto y de rango cuestan O(log n + k), con k la cantidad
+    de intervalos devueltos. El índice es inmutable: se reconstruye cuando
+    cambian los datos.
+    """
+
+    def __init__(self, items: Iterable[T], start: Callable[[T], int], end: Callable[[T], Optional[int]]):
+        """
+        Args:
+            items: Elementos a indexar
+            start: Función que devuelve el timestamp de inicio de un elemento
+            end: Función que devuelve el timestamp de fin (None = sigue abierto)
+        """
+        intervals = []
+        for item in items:
+            item_end = end(item)
+            intervals.append((start(item), OPEN_END if item_end is None else item_end, item))
+        self._intervals = sorted(intervals, key=lambda interval: interval[0])
+        self._root = self._build(self._intervals)
+
+    def __len__(self) -> int:
+        return len(self._intervals)
+
+    def _build(self, intervals: List[tuple]) -> Optional[_Node]:
+        if not intervals:
+            return None
+        endpoints = sorted(point for interval in intervals for point in interval[:2])
+        center = endpoints[len(endpoints) // 2]
+
+        left, right, here = [], [], []
+        for interval in intervals:
+            if interval[1] < center:
+                left.append(interval)
+            elif interval[0] > center:
+                right.append(interval)
+            else:
+                here.append(interval)
+
+        by_start = sorted(here, key=lambda interval: interval[0])
+        by_end = sorted(here, key=lambda interval: interval[1], reverse=True)
+        return _Node(center, by_start, by_end, self._build(left), self._build(right))
+
+    def at(self, when) -> List[T]:
+        """Elementos cuyo intervalo contiene el instante indicado (datetime o timestamp)"""
+        return self.overlapping(when, when)
+
+    def overlapping(self, start, end) -> List[T]:
+        """Elementos cuyo intervalo se superpone con [start, end] (datetime o timestamp)"""
+        lo, hi = to_timestamp(start), to_timestamp(end)
+        found = []
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            if node is None:
+                continue
+            if hi < node.center:
+                for interval in node.by_start:
+                    if interval[0] > hi:
+                        break
+                    found.append(interval)
+                stack.append(node.left)
+            elif lo > node.center:
+                for interval in node.by_end:
+                    if interval[1] < lo:
+                        break
+                    found.append(interval)
+                stack.append(node.right)
+            else:
+                found.extend(node.by_start)
+                stack.append(node.left)
+                stack.append(node.right)
+        found.sort(key=lambda interval: interval[0])
+        return [interval[2] for interval in found]
+
+    def join(self, points: Iterable, timestamp: Callable) -> List[Tuple]:
+        """
+        Cruza una colección de puntos con los intervalos activos en cada uno.
+
+        Recorre puntos e intervalos en orden temporal una sola vez, en
+        O((n + m) log m + k).
+
+        Args:
+            points: Elementos con un instante (p. ej. resultados de laboratorio)
+            timestamp: Función que devuelve el timestamp de un punto
+
+        Returns:
+            Lista de (punto, [elementos activos]) en orden temporal
+        """
+        ordered = sorted(points, key=timestamp)
+        active: List[tuple] = []  # heap por fin de intervalo
+        next_interval = 0
+        joined = []
+        for point in ordered:
+            t = timestamp(point)
+            while next_interval < len(self._intervals) and self._intervals[next_interval][0] <= t:
+                interval = self._intervals[next_interval]
+                heapq.heappush(active, (interval[1], next_interval, interval[2]))
+                next_interval += 1
+            while active and active[0][0] < t:
+                heapq.heappop(active)
+            current = sorted(active, key=lambda entry: entry[1])
+            joined.append((point, [entry[2] for entry in current]))
+        return joined
+
+
+class MedicationTimeline(IntervalIndex[Medication]):
+    """Índice de medicaciones por su período [start_date, end_date]"""
+
+    def __init__(self, medications: Iterable[Medication]):
+        super().__init__(medications,
+                         start=lambda medication: medication.timestamp,
+                         end=lambda medication: medication.end_timestamp)
+
+    def join_lab_results(self, lab_results: Iterable[LabResult]) -> List[Tuple[LabResult, List[Medication]]]:
+        """Medicaciones concurrentes con cada resultado de laboratorio (análisis dosis-respuesta)"""
+        return self.join(lab_results, timestamp=lambda result: result.timestamp)
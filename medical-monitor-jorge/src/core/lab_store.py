@@ -0,0 +1,424 @@
+"""
+Almacén columnar de resultados de laboratorio respaldado por NumPy.
+Guarda cada campo en un arreglo propio (struct-of-arrays) con nombres de test,
+unidades y notas codificados por diccionario y fechas como timestamps int64
+canónicos. Es la representación de los laboratorios en PatientData: los
+LabResult se construyen bajo demanda como vistas de sus filas.
+"""
+
+from collections.abc import Sequence
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .models import AlertLevel, LabResult, to_timestamp, from_timestamp
+
+_ALERT_LEVELS = list(AlertLevel)
+ALERT_CODES = {level: code for code, level in enumerate(_ALERT_LEVELS)}
+
+
+def _nan_if_none(value: Optional[float]) -> float:
+    return np.nan if value is None else value
+
+
+_DAY_US = 86_400_000_000
+
+
+def _bucket_starts(timestamps: np.ndarray, resolution: str) -> np.ndarray:
+    """Inicio del intervalo de cada timestamp, como date_trunc de DuckDB (semanas desde el lunes)"""
+    if resolution == 'month':
+        months = timestamps.astype('datetime64[us]').astype('datetime64[M]')
+        return months.astype('datetime64[us]').astype(np.int64)
+    days = timestamps // _DAY_US
+    if resolution == 'week':
+        # El 1970-01-01 fue jueves: (días + 3) % 7 es el día de la semana con lunes = 0
+        days = days - (days + 3) % 7
+    return days * _DAY_US
+
+
+def _nullable(column: np.ndarray) -> list:
+    """Convierte un arreglo float a lista con None en lugar de NaN"""
+    values = column.astype(object)
+    values[np.isnan(column)] = None
+    return values.tolist()
+
+
+@dataclass
+class LabSeries:
+    """Serie temporal de un test como vistas sobre los arreglos del almacén"""
+    test_name: str
+    unit: str
+    timestamps: np.ndarray
+    values: np.ndarray
+    reference_min: np.ndarray
+    reference_max: np.ndarray
+    alert_codes: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    @property
+    def dates(self) -> np.ndarray:
+        """Fechas como datetime64[us], aptas para gráficos"""
+        return self.timestamps.astype('datetime64[us]')
+
+    def alert_mask(self, *levels: AlertLevel) -> np.ndarray:
+        """Máscara booleana de los puntos con alguno de los niveles indicados"""
+        codes = [ALERT_CODES[level] for level in levels]
+        return np.isin(self.alert_codes, codes)
+
+    def take(self, index: Sequence) -> 'LabSeries':
+        """Serie con los puntos indicados (posiciones o máscara booleana del largo de la serie)"""
+        index = np.asarray(index)
+        if index.dtype != bool:
+            index = index.astype(np.int64)
+        return LabSeries(self.test_name, self.unit, self.timestamps[index], self.values[index],
+                         self.reference_min[index], self.reference_max[index], self.alert_codes[index])
+
+    def merge(self, other: 'LabSeries') -> 'LabSeries':
+        """Serie con los puntos de ambas, ordenada por fecha (la unidad de other si esta no tiene)"""
+        merged = LabSeries(self.test_name, self.unit or other.unit,
+                           *(np.concatenate([getattr(self, name), getattr(other, name)])
+                             for name in ('timestamps', 'values', 'reference_min',
+                                          'reference_max', 'alert_codes')))
+        return merged.take(np.argsort(merged.timestamps, kind='stable'))
+
+    @classmethod
+    def from_results(cls, results: List[LabResult], test_name: str) -> 'LabSeries':
+        """Construye una serie con los resultados de un test (se ordenan por fecha si hace falta)"""
+        results = [result for result in results if result.test_name == test_name]
+        count = len(results)
+        series = cls(
+            test_name=test_name,
+            unit="",
+            timestamps=np.fromiter((result.timestamp for result in results), np.int64, count),
+            values=np.fromiter((result.value for result in results), np.float64, count),
+            reference_min=np.fromiter((_nan_if_none(result.reference_min) for result in results),
+                                      np.float64, count),
+            reference_max=np.fromiter((_nan_if_none(result.reference_max) for result in results),
+                                      np.float64, count),
+            alert_codes=np.fromiter((ALERT_CODES[result.alert_level] for result in results), np.int8, count)
+        )
+        last = count - 1
+        if count > 1 and (np.diff(series.timestamps) < 0).any():
+            order = np.argsort(series.timestamps, kind='stable')
+            series = series.take(order)
+            last = int(order[-1])
+        if count:
+            series.unit = results[last].unit or ""
+        return series
+
+
+@dataclass
+class LabTrend:
+    """Serie de un test para un período: puntos crudos (min = mean = max) o intervalos resumidos"""
+    test_name: str
+    unit: str
+    resolution: str  # 'raw', 'day', 'week' o 'month'
+    timestamps: np.ndarray
+    mean: np.ndarray
+    min: np.ndarray
+    max: np.ndarray
+    count: np.ndarray
+    reference_min: Optional[float] = None
+    reference_max: Optional[float] = None
+    # Con resolución 'raw', la serie completa (alertas y referencias por punto)
+    series: Optional[LabSeries] = None
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    @property
+    def dates(self) -> np.ndarray:
+        """Fechas como datetime64[us], aptas para gráficos"""
+        return self.timestamps.astype('datetime64[us]')
+
+    def with_points(self, points: LabSeries) -> 'LabTrend':
+        """
+        Tendencia con puntos agregados, p. ej. resultados que aún no están en la base.
+
+        Con resolución 'raw' se suman a la serie; si no, se acumulan en los
+        intervalos que les corresponden (creando los que falten).
+
+        Args:
+            points: Puntos del mismo test
+
+        Returns:
+            Una LabTrend nueva (esta no se modifica)
+        """
+        if len(points) == 0:
+            return self
+        unit = self.unit or points.unit
+        if self.resolution == 'raw':
+            series = self.series.merge(points) if self.series is not None else points
+            values = series.values
+            return LabTrend(self.test_name, unit, 'raw', series.timestamps, values, values, values,
+                            np.ones(len(values), dtype=np.int64),
+                            self.reference_min, self.reference_max, series)
+
+        timestamps, inverse = np.unique(
+            np.concatenate([self.timestamps, _bucket_starts(points.timestamps, self.resolution)]),
+            return_inverse=True)
+        total = np.zeros(len(timestamps))
+        np.add.at(total, inverse, np.concatenate([self.mean * self.count, points.values]))
+        count = np.zeros(len(timestamps), dtype=np.int64)
+        np.add.at(count, inverse, np.concatenate([self.count, np.ones(len(points), dtype=np.int64)]))
+        minimum = np.full(len(timestamps), np.inf)
+        np.minimum.at(minimum, inverse, np.concatenate([self.min, points.values]))
+        maximum = np.full(len(timestamps), -np.inf)
+        np.maximum.at(maximum, inverse, np.concatenate([self.max, points.values]))
+        return LabTrend(self.test_name, unit, self.resolution, timestamps, total / count,
+                        minimum, maximum, count, self.reference_min, self.reference_max)
+
+
+class ColumnarLabStore:
+    """
+    Resultados de laboratorio en columnas NumPy.
+    Las consultas por test usan un orden (test, fecha) que se calcula una vez
+    tras una carga en lote y se mantiene al agregar resultados sueltos.
+
+    Ocupa unos 70 bytes/registro (unos 280 por LabResult): PatientData guarda
+    solo el almacén y arma los LabResult que le piden con view()/views().
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self._size = 0
+        self._timestamps = np.empty(capacity, dtype=np.int64)
+        self._values = np.empty(capacity, dtype=np.float64)
+        self._reference_min = np.empty(capacity, dtype=np.float64)
+        self._reference_max = np.empty(capacity, dtype=np.float64)
+        self._reference_irc_min = np.empty(capacity, dtype=np.float64)
+        self._reference_irc_max = np.empty(capacity, dtype=np.float64)
+        self._alert_codes = np.empty(capacity, dtype=np.int8)
+        self._test_codes = np.empty(capacity, dtype=np.int32)
+        self._unit_codes = np.empty(capacity, dtype=np.int32)
+        self._note_codes = np.empty(capacity, dtype=np.int32)
+
+        # Diccionarios de codificación
+        self._test_names: List[str] = []
+        self._test_lookup: Dict[str, int] = {}
+        self._units: List[str] = []
+        self._unit_lookup: Dict[str, int] = {}
+        self._notes: List[str] = []
+        self._note_lookup: Dict[str, int] = {}
+
+        # Orden por (test, fecha) y límites de cada test dentro de ese orden
+        self._order: Optional[np.ndarray] = None
+        self._bounds: Optional[np.ndarray] = None
+
+    @classmethod
+    def from_results(cls, results: Iterable[LabResult]) -> 'ColumnarLabStore':
+        """Crea un almacén a partir de una colección de resultados"""
+        results = list(results)
+        store = cls(capacity=max(len(results), 1))
+        store.extend(results)
+        return store
+
+    def __len__(self) -> int:
+        return self._size
+
+    @staticmethod
+    def _encode(value: str, names: List[str], lookup: Dict[str, int]) -> int:
+        code = lookup.get(value)
+        if code is None:
+            code = len(names)
+            names.append(value)
+            lookup[value] = code
+        return code
+
+    def _grow(self, needed: int) -> None:
+        capacity = len(self._values)
+        if needed <= capacity:
+            return
+        new_capacity = max(needed, capacity * 2)
+        for name in ('_timestamps', '_values', '_reference_min', '_reference_max',
+                     '_reference_irc_min', '_reference_irc_max', '_alert_codes',
+                     '_test_codes', '_unit_codes', '_note_codes'):
+            old = getattr(self, name)
+            new = np.empty(new_capacity, dtype=old.dtype)
+            new[:self._size] = old[:self._size]
+            setattr(self, name, new)
+
+    def append(self, result: LabResult) -> int:
+        """Añade un resultado y devuelve su número de fila"""
+        row = self._size
+        self._grow(row + 1)
+        self._timestamps[row] = result.timestamp
+        self._values[row] = result.value
+        self._reference_min[row] = _nan_if_none(result.reference_min)
+        self._reference_max[row] = _nan_if_none(result.reference_max)
+        self._reference_irc_min[row] = _nan_if_none(result.reference_irc_min)
+        self._reference_irc_max[row] = _nan_if_none(result.reference_irc_max)
+        self._alert_codes[row] = ALERT_CODES[result.alert_level]
+        code = self._encode(result.test_name, self._test_names, self._test_lookup)
+        self._test_codes[row] = code
+        self._unit_codes[row] = self._encode(result.unit or "", self._units, self._unit_lookup)
+        self._note_codes[row] = self._encode(result.notes or "", self._notes, self._note_lookup)
+        self._size = row + 1
+        if self._order is not None:
+            self._insert_order(row, code)
+        return row
+
+    def _insert_order(self, row: int, code: int) -> None:
+        """Ubica una fila nueva en el orden (test, fecha) sin reordenar todo"""
+        if code == len(self._bounds) - 1:
+            self._bounds = np.append(self._bounds, self._bounds[-1])
+        lo, hi = self._bounds[code], self._bounds[code + 1]
+        position = lo + np.searchsorted(self._timestamps[self._order[lo:hi]], self._timestamps[row], 'right')
+        self._order = np.insert(self._order, position, row)
+        self._bounds[code + 1:] += 1
+
+    def extend(self, results: Iterable[LabResult]) -> None:
+        """Añade varios resultados (el orden se recalcula una sola vez, al consultarlo)"""
+        self._order = None
+        for result in results:
+            self.append(result)
+
+    def extend_columns(self, test_names: np.ndarray, values: np.ndarray, units: np.ndarray,
+                       timestamps: np.ndarray, reference_min: np.ndarray, reference_max: np.ndarray,
+                       alert_codes: np.ndarray, notes: np.ndarray,
+                       reference_irc_min: Optional[np.ndarray] = None,
+                       reference_irc_max: Optional[np.ndarray] = None) -> None:
+        """
+        Añade filas directamente desde columnas (p. ej. un fetch de DuckDB),
+        sin pasar por objetos LabResult. Referencias ausentes como NaN.
+        """
+        count = len(values)
+        if count == 0:
+            return
+        start, end = self._size, self._size + count
+        self._grow(end)
+        self._timestamps[start:end] = timestamps
+        self._values[start:end] = values
+        self._reference_min[start:end] = reference_min
+        self._reference_max[start:end] = reference_max
+        self._reference_irc_min[start:end] = np.nan if reference_irc_min is None else reference_irc_min
+        self._reference_irc_max[start:end] = np.nan if reference_irc_max is None else reference_irc_max
+        self._alert_codes[start:end] = alert_codes
+        self._test_codes[start:end] = self._encode_column(test_names, self._test_names, self._test_lookup)
+        self._unit_codes[start:end] = self._encode_column(units, self._units, self._unit_lookup)
+        self._note_codes[start:end] = self._encode_column(notes, self._notes, self._note_lookup)
+        self._size = end
+        self._order = None
+
+    def _encode_column(self, column: np.ndarray, names: List[str], lookup: Dict[str, int]) -> np.ndarray:
+        # Los nulos (None o NaN) se codifican como cadena vacía
+        inverse, uniques = pd.factorize(np.asarray(column), use_na_sentinel=False)
+        codes = np.array([self._encode(value if isinstance(value, str) else "", names, lookup)
+                          for value in uniques.tolist()], dtype=np.int32)
+        return codes[inverse]
+
+    def _ensure_order(self) -> None:
+        if self._order is not None:
+            return
+        n = self._size
+        self._order = np.lexsort((self._timestamps[:n], self._test_codes[:n]))
+        sorted_codes = self._test_codes[:n][self._order]
+        self._bounds = np.searchsorted(sorted_codes, np.arange(len(self._test_names) + 1))
+
+    def _rows_for_test(self, test_name: str) -> np.ndarray:
+        code = self._test_lookup.get(test_name)
+        if code is None:
+            return np.empty(0, dtype=np.int64)
+        self._ensure_order()
+        return self._order[self._bounds[code]:self._bounds[code + 1]]
+
+    def test_names(self) -> List[str]:
+        """Nombres de los tests presentes en el almacén, en el orden en que aparecieron"""
+        return list(self._test_names)
+
+    def rows(self, test_name: str, start: Optional[datetime] = None,
+             end: Optional[datetime] = None) -> np.ndarray:
+        """Filas de un test entre dos fechas (inclusive), ordenadas por fecha"""
+        rows = self._rows_for_test(test_name)
+        if start is None and end is None:
+            return rows
+        timestamps = self._timestamps[rows]
+        lo = np.searchsorted(timestamps, to_timestamp(start), 'left') if start is not None else 0
+        hi = np.searchsorted(timestamps, to_timestamp(end), 'right') if end is not None else len(rows)
+        return rows[lo:hi]
+
+    def latest_row(self, test_name: str) -> Optional[int]:
+        """Fila del resultado más reciente de un test (None si no hay)"""
+        rows = self._rows_for_test(test_name)
+        return int(rows[-1]) if len(rows) else None
+
+    def timestamps_of(self, rows: np.ndarray) -> np.ndarray:
+        """Timestamps de las filas indicadas"""
+        return self._timestamps[rows]
+
+    def series(self, test_name: str, start: Optional[datetime] = None,
+               end: Optional[datetime] = None) -> LabSeries:
+        """Serie de un test entre dos fechas (inclusive), ordenada por fecha"""
+        rows = self.rows(test_name, start, end)
+        unit = self._units[self._unit_codes[rows[-1]]] if len(rows) else ""
+        return LabSeries(
+            test_name=test_name,
+            unit=unit,
+            timestamps=self._timestamps[rows],
+            values=self._values[rows],
+            reference_min=self._reference_min[rows],
+            reference_max=self._reference_max[rows],
+            alert_codes=self._alert_codes[rows]
+        )
+
+    def view(self, row: int) -> LabResult:
+        """Construye el LabResult de una fila (una copia: modificarlo no cambia el almacén)"""
+        return self.views([row])[0]
+
+    def views(self, rows: Iterable[int]) -> List[LabResult]:
+        """Construye los LabResult de varias filas, en el orden indicado"""
+        rows = np.asarray(rows, dtype=np.int64)
+        test_names, units, notes = self._test_names, self._units, self._notes
+        return [
+            LabResult(test_name=test_names[test], value=value, unit=units[unit],
+                      date=from_timestamp(timestamp), reference_min=minimum, reference_max=maximum,
+                      reference_irc_min=irc_min, reference_irc_max=irc_max,
+                      alert_level=_ALERT_LEVELS[alert], notes=notes[note])
+            for test, value, unit, timestamp, minimum, maximum, irc_min, irc_max, alert, note in zip(
+                self._test_codes[rows].tolist(), self._values[rows].tolist(),
+                self._unit_codes[rows].tolist(), self._timestamps[rows].tolist(),
+                _nullable(self._reference_min[rows]), _nullable(self._reference_max[rows]),
+                _nullable(self._reference_irc_min[rows]), _nullable(self._reference_irc_max[rows]),
+                self._alert_codes[rows].tolist(), self._note_codes[rows].tolist())
+        ]
+
+
+class LabResultViews(Sequence):
+    """
+    Secuencia de LabResult respaldada por un ColumnarLabStore.
+
+    Cada acceso construye los objetos de las filas pedidas; el almacén sigue
+    siendo la única copia de los datos. Sin filas explícitas abarca todo el
+    almacén en orden de inserción, incluidas las filas que se agreguen después.
+    """
+
+    # Filas por lote al iterar: acota la memoria de los objetos vivos a la vez
+    _CHUNK = 1024
+
+    def __init__(self, store: ColumnarLabStore, rows: Optional[np.ndarray] = None):
+        self._store = store
+        self._rows = rows
+
+    def __len__(self) -> int:
+        return len(self._store) if self._rows is None else len(self._rows)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            if self._rows is None:
+                return self._store.views(np.arange(*index.indices(len(self))))
+            return self._store.views(self._rows[index])
+        if not -len(self) <= index < len(self):
+            raise IndexError("índice fuera de rango")
+        index %= len(self)
+        return self._store.view(index if self._rows is None else int(self._rows[index]))
+
+    def __iter__(self) -> Iterator[LabResult]:
+        for start in range(0, len(self), self._CHUNK):
+            yield from self[start:start + self._CHUNK]
+
+    def __repr__(self) -> str:
+        return f"LabResultViews({len(self)} resultados)"
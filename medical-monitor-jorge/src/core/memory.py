@@ -0,0 +1,105 @@
+"""
+Medición del uso de memoria de los modelos en memoria.
+"""
+
+import sys
+from enum import Enum
+from types import ModuleType, FunctionType
+from typing import Any, Dict, Iterable, Optional, Set
+
+import numpy as np
+
+
+def deep_sizeof(obj: Any, seen: Optional[Set[int]] = None) -> int:
+    """
+    Calcula el tamaño en bytes de un objeto y todo lo que referencia.
+
+    Los objetos compartidos (cadenas internadas, rangos de referencia,
+    miembros de Enum) se cuentan una sola vez por conjunto `seen`.
+
+    Args:
+        obj: Objeto a medir
+        seen: Ids ya contados (para medir varios objetos sin duplicar)
+
+    Returns:
+        Tamaño en bytes
+    """
+    if seen is None:
+        seen = set()
+
+    stack = [obj]
+    total = 0
+    while stack:
+        current = stack.pop()
+        if id(current) in seen or isinstance(current, (type, ModuleType, FunctionType, Enum)):
+            continue
+        seen.add(id(current))
+
+        if isinstance(current, np.ndarray):
+            total += sys.getsizeof(current) + (current.nbytes if current.base is None else 0)
+            continue
+
+        total += sys.getsizeof(current)
+
+        if isinstance(current, dict):
+            stack.extend(current.keys())
+            stack.extend(current.values())
+        elif isinstance(current, (list, tuple, set, frozenset)):
+            stack.extend(current)
+
+        if hasattr(current, '__dict__'):
+            stack.append(vars(current))
+        for cls in type(current).__mro__:
+            for slot in getattr(cls, '__slots__', ()):
+                if hasattr(current, slot):
+                    stack.append(getattr(current, slot))
+
+    return total
+
+
+def records_footprint(records: Iterable[Any], seen: Optional[Set[int]] = None) -> Dict[str, float]:
+    """
+    Mide una colección de registros.
+
+    Returns:
+        Dict con cantidad de registros, bytes totales y bytes por registro
+    """
+    records = list(records)
+    if seen is None:
+        seen = set()
+    total = sum(deep_sizeof(record, seen) for record in records)
+    return {
+        'records': len(records),
+        'bytes': total,
+        'bytes_per_record': total / len(records) if records else 0.0
+    }
+
+
+def patient_footprint(patient) -> Dict[str, Any]:
+    """
+    Reporte de memoria de un PatientData por colección y total.
+
+    Args:
+        patient: Objeto PatientData
+
+    Returns:
+        Dict con el detalle por colección y el tamaño total del objeto
+    """
+    seen: Set[int] = set()
+    labs = patient.get_lab_columns()
+    lab_bytes = deep_sizeof(labs, seen)
+    collections = {
+        # Los laboratorios viven en columnas (ColumnarLabStore), no como objetos
+        'lab_results': {
+            'records': len(labs),
+            'bytes': lab_bytes,
+            'bytes_per_record': lab_bytes / len(labs) if len(labs) else 0.0
+        },
+        'medications': records_footprint(patient.medications, seen),
+        'clinical_events': records_footprint(patient.clinical_events, seen),
+        'vital_signs': records_footprint(patient.vital_signs, seen),
+    }
+    return {
+        'collections': collections,
+        'total_bytes': deep_sizeof(patient)
+    }
@@ -3,9 +3,14 @@ Modelos de datos flexibles para el sistema de monitoreo médico.
 NO contiene datos precargados - diseñado para recibir datos actualizados.
 """
 
-from dataclasses import dataclass, field
+import sys
+from bisect import bisect_right
+from collections import Counter
+from dataclasses import astuple, dataclass, field
+from functools import lru_cache, wraps
+from numbers import Integral
 from datetime import datetime, date, timedelta
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Callable, Iterable, Sequence
 from enum import Enum
 
 
@@ -32,7 +37,75 @@ class AlertLevel(Enum):
     CRITICO = "crítico"
 
 
-@dataclass
+def _intern(value):
+    """Interna cadenas para compartir una sola copia en memoria"""
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def _as_datetime(value) -> datetime:
+    """Normaliza fechas (date o datetime) a datetime para poder compararlas"""
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime.combine(value, datetime.min.time())
+    return value
+
+
+def to_timestamp(value) -> int:
+    """
+    Convierte una fecha (date o datetime) al timestamp canónico:
+    microsegundos desde epoch como entero (int64), conservando la hora del día.
+    Un valor que ya es timestamp se devuelve como int.
+    """
+    if isinstance(value, Integral):
+        return int(value)
+    return (_as_datetime(value) - _EPOCH) // _MICROSECOND
+
+
+def from_timestamp(timestamp: int) -> datetime:
+    """Convierte un timestamp canónico a datetime"""
+    return _EPOCH + timedelta(microseconds=int(timestamp))
+
+
+class _TimestampOf:
+    """
+    Timestamp canónico de un campo de fecha, como propiedad de solo lectura.
+
+    Se guarda junto con la fecha de la que salió y se recalcula solo si la
+    fecha cambió: nunca queda desactualizado y leerlo no convierte nada.
+    """
+
+    def __init__(self, date_field: str, stamped_field: str, stamp_field: str):
+        """
+        Args:
+            date_field: Campo con la fecha
+            stamped_field: Campo con la última fecha convertida
+            stamp_field: Campo con su timestamp
+        """
+        self.date_field = date_field
+        self.stamped_field = stamped_field
+        self.stamp_field = stamp_field
+
+    def stamp(self, obj) -> None:
+        """Normaliza la fecha de obj a datetime y calcula su timestamp"""
+        value = _as_datetime(getattr(obj, self.date_field))
+        setattr(obj, self.date_field, value)
+        setattr(obj, self.stamped_field, value)
+        setattr(obj, self.stamp_field, None if value is None else to_timestamp(value))
+
+    def __get__(self, obj, owner=None):
+        if obj is None:
+            return self
+        if getattr(obj, self.stamped_field) is not getattr(obj, self.date_field):
+            self.stamp(obj)
+        return getattr(obj, self.stamp_field)
+
+
+@dataclass(slots=True)
 class LabResult:
     """Resultado de laboratorio individual"""
     test_name: str
@@ -45,6 +118,18 @@ class LabResult:
     reference_irc_max: Optional[float] = None
     alert_level: AlertLevel = AlertLevel.NORMAL
     notes: str = ""
+    # Última fecha convertida y su timestamp (ver timestamp)
+    _stamped_date: Optional[datetime] = field(default=None, init=False, repr=False, compare=False)
+    _stamp: Optional[int] = field(default=None, init=False, repr=False, compare=False)
+
+    timestamp = _TimestampOf('date', '_stamped_date', '_stamp')
+
+    def __post_init__(self):
+        # Nombres de test y unidades se repiten miles de veces: compartir una sola copia
+        self.test_name = _intern(self.test_name)
+        self.unit = _intern(self.unit)
+        # La fecha se normaliza una sola vez, al ingresar el resultado
+        LabResult.timestamp.stamp(self)
 
     def is_critical(self, has_irc: bool = False) -> bool:
         """Determina si el valor es crítico"""
@@ -55,7 +140,102 @@ class LabResult:
         return False
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
+class ReferenceRange:
+    """Rango de referencia inmutable, compartido entre resultados con los mismos límites"""
+    min: Optional[float] = None
+    max: Optional[float] = None
+    irc_min: Optional[float] = None
+    irc_max: Optional[float] = None
+
+    @classmethod
+    def shared(cls, min: Optional[float] = None, max: Optional[float] = None,
+               irc_min: Optional[float] = None, irc_max: Optional[float] = None) -> 'ReferenceRange':
+        """Obtiene la instancia compartida para estos límites"""
+        return _shared_reference_range(min, max, irc_min, irc_max)
+
+
+# Instancias compartidas de ReferenceRange: lru_cache acota la cantidad y es
+# seguro entre hilos (dos hilos pueden crear la misma instancia, nunca romper la caché)
+_shared_reference_range = lru_cache(maxsize=4096)(ReferenceRange)
+
+
+@dataclass(frozen=True, slots=True)
+class CompactLabResult:
+    """
+    Variante inmutable y compacta de LabResult para historiales grandes.
+    Usa cadenas internadas y un ReferenceRange compartido en lugar de cuatro floats.
+    """
+    test_name: str
+    value: float
+    unit: str
+    date: datetime
+    reference: Optional[ReferenceRange] = None
+    alert_level: AlertLevel = AlertLevel.NORMAL
+    notes: str = ""
+    timestamp: int = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        reference = self.reference or ReferenceRange()
+        object.__setattr__(self, 'date', _as_datetime(self.date))
+        object.__setattr__(self, 'timestamp', to_timestamp(self.date))
+        object.__setattr__(self, 'test_name', _intern(self.test_name))
+        object.__setattr__(self, 'unit', _intern(self.unit))
+        object.__setattr__(self, 'notes', _intern(self.notes))
+        object.__setattr__(self, 'reference', ReferenceRange.shared(
+            reference.min, reference.max, reference.irc_min, reference.irc_max))
+
+    @property
+    def reference_min(self) -> Optional[float]:
+        return self.reference.min
+
+    @property
+    def reference_max(self) -> Optional[float]:
+        return self.reference.max
+
+    @property
+    def reference_irc_min(self) -> Optional[float]:
+        return self.reference.irc_min
+
+    @property
+    def reference_irc_max(self) -> Optional[float]:
+        return self.reference.irc_max
+
+    def is_critical(self, has_irc: bool = False) -> bool:
+        """Determina si el valor es crítico"""
+        return LabResult.is_critical(self, has_irc)
+
+    @classmethod
+    def from_lab_result(cls, result: LabResult) -> 'CompactLabResult':
+        """Crea la variante compacta de un LabResult"""
+        return cls(
+            test_name=result.test_name,
+            value=result.value,
+            unit=result.unit,
+            date=result.date,
+            reference=ReferenceRange.shared(result.reference_min, result.reference_max,
+                                            result.reference_irc_min, result.reference_irc_max),
+            alert_level=result.alert_level,
+            notes=result.notes
+        )
+
+    def to_lab_result(self) -> LabResult:
+        """Convierte a un LabResult mutable"""
+        return LabResult(
+            test_name=self.test_name,
+            value=self.value,
+            unit=self.unit,
+            date=self.date,
+            reference_min=self.reference_min,
+            reference_max=self.reference_max,
+            reference_irc_min=self.reference_irc_min,
+            reference_irc_max=self.reference_irc_max,
+            alert_level=self.alert_level,
+            notes=self.notes
+        )
+
+
+@dataclass(slots=True)
 class Medication:
     """Información de medicación"""
     name: str
@@ -68,9 +248,21 @@ class Medication:
     is_active: bool = True
     adjusted_for_irc: bool = False
     notes: str = ""
+    # Última fecha convertida y su timestamp (ver timestamp)
+    _stamped_date: Optional[datetime] = field(default=None, init=False, repr=False, compare=False)
+    _stamp: Optional[int] = field(default=None, init=False, repr=False, compare=False)
+    _stamped_end_date: Optional[datetime] = field(default=None, init=False, repr=False, compare=False)
+    _end_stamp: Optional[int] = field(default=None, init=False, repr=False, compare=False)
 
+    timestamp = _TimestampOf('start_date', '_stamped_date', '_stamp')
+    end_timestamp = _TimestampOf('end_date', '_stamped_end_date', '_end_stamp')
 
-@dataclass
+    def __post_init__(self):
+        Medication.timestamp.stamp(self)
+        Medication.end_timestamp.stamp(self)
+
+
+@dataclass(slots=True)
 class ClinicalEvent:
     """Evento clínico significativo"""
     event_type: str
@@ -79,9 +271,17 @@ class ClinicalEvent:
     severity: str = "moderate"
     action_taken: str = ""
     outcome: str = ""
+    # Última fecha convertida y su timestamp (ver timestamp)
+    _stamped_date: Optional[datetime] = field(default=None, init=False, repr=False, compare=False)
+    _stamp: Optional[int] = field(default=None, init=False, repr=False, compare=False)
 
+    timestamp = _TimestampOf('date', '_stamped_date', '_stamp')
 
-@dataclass
+    def __post_init__(self):
+        ClinicalEvent.timestamp.stamp(self)
+
+
+@dataclass(slots=True)
 class VitalSigns:
     """Signos vitales"""
     date: datetime
@@ -93,6 +293,35 @@ class VitalSigns:
     respiratory_rate: Optional[int] = None
     glasgow_score: Optional[int] = None
     notes: str = ""
+    # Última fecha convertida y su timestamp (ver timestamp)
+    _stamped_date: Optional[datetime] = field(default=None, init=False, repr=False, compare=False)
+    _stamp: Optional[int] = field(default=None, init=False, repr=False, compare=False)
+
+    timestamp = _TimestampOf('date', '_stamped_date', '_stamp')
+
+    def __post_init__(self):
+        VitalSigns.timestamp.stamp(self)
+
+
+def _memoized(method):
+    """
+    Memoriza el resultado de un método de PatientData hasta el próximo cambio de versión.
+
+    Las listas y diccionarios se devuelven como copia: quien modifique el
+    resultado no altera el valor memorizado que reciben los demás.
+    """
+    name = method.__name__
+
+    @wraps(method)
+    def wrapper(self):
+        cached = self._memo.get(name)
+        if cached is not None and cached[0] == self._version:
+            value = cached[1]
+        else:
+            value = method(self)
+            self._memo[name] = (self._version, value)
+        return value.copy() if isinstance(value, (list, dict)) else value
+    return wrapper
 
 
 @dataclass
@@ -100,18 +329,21 @@ class PatientData:
     """
     Modelo principal del paciente.
     Flexible para recibir cualquier tipo de dato cuando esté disponible.
+
+    Los datos se modifican a través de los métodos add_*/set_*, que incrementan
+    la versión del paciente e invalidan las vistas derivadas memorizadas.
     """
     # Información básica
     name: str = "Jorge Agustín"
     age: int = 65
     weight: Optional[float] = None  # kg
     height: Optional[float] = None  # cm
+    patient_id: int = 1
 
     # Condiciones médicas (vacío inicialmente)
     conditions: List[ConditionType] = field(default_factory=list)
 
-    # Datos clínicos (todos vacíos inicialmente)
-    lab_results: List[LabResult] = field(default_factory=list)
+    # Datos clínicos (todos vacíos inicialmente; los laboratorios, en lab_results)
     medications: List[Medication] = field(default_factory=list)
     clinical_events: List[ClinicalEvent] = field(default_factory=list)
     vital_signs: List[VitalSigns] = field(default_factory=list)
@@ -119,68 +351,460 @@ class PatientData:
     # Metadatos
     created_at: datetime = field(default_factory=datetime.now)
     last_updated: datetime = field(default_factory=datetime.now)
+    # Mayor id de lab_results ya cargado desde la base (recarga incremental)
+    lab_watermark: int = field(default=0, repr=False, compare=False)
+    # Revisión de lab_revisions con la que se cargaron (cambia si se corrigen filas ya cargadas)
+    lab_revision: int = field(default=0, repr=False, compare=False)
+    # Tabla clínica -> (cantidad de filas, mayor id) con que se cargó (ver database.data_watermarks)
+    clinical_watermarks: Dict[str, tuple] = field(default_factory=dict, repr=False, compare=False)
+
+    # Resultados de laboratorio en columnas NumPy (ColumnarLabStore): es la
+    # única copia; lab_results y las consultas por test arman LabResult bajo demanda
+    _labs: Optional[Any] = field(default=None, init=False, repr=False, compare=False)
+    # Último resultado de cada test según la base (lab_latest, que resume también
+    # el historial archivado): cubre los tests sin resultados en memoria
+    _stored_latest: Dict[str, LabResult] = field(default_factory=dict, init=False, repr=False, compare=False)
+
+    # Signos vitales, medicaciones y eventos ordenados por timestamp para la
+    # línea de tiempo: tipo -> (timestamps, elementos) en listas paralelas
+    _timeline_index: Dict[str, tuple] = field(default_factory=dict, init=False, repr=False, compare=False)
+
+    # Buffer de signos vitales de monitor, creado con get_vitals_buffer()
+    _vitals_buffer: Optional[Any] = field(default=None, init=False, repr=False, compare=False)
+
+    # Valores críticos actuales (último resultado de cada test fuera de rango),
+    # mantenidos al insertar resultados y al cambiar la condición de IRC
+    _critical: Dict[str, LabResult] = field(default_factory=dict, init=False, repr=False, compare=False)
+    _critical_has_irc: bool = field(default=False, init=False, repr=False, compare=False)
+    _critical_listeners: List[Callable[[LabResult, bool], None]] = field(
+        default_factory=list, init=False, repr=False, compare=False)
+
+    # Versión de los datos (crece con cada modificación) y vistas derivadas
+    # memorizadas como (versión, valor)
+    _version: int = field(default=0, init=False, repr=False, compare=False)
+    _memo: Dict[str, tuple] = field(default_factory=dict, init=False, repr=False, compare=False)
+    # Versión en la que cambió por última vez cada test (invalidación por test)
+    _test_versions: Dict[str, int] = field(default_factory=dict, init=False, repr=False, compare=False)
+
+    # Resultados añadidos en memoria que todavía no llegaron a la base (cola de
+    # ingesta): (test, timestamp, valor) -> cantidad
+    _pending_labs: Dict[tuple, int] = field(default_factory=dict, init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        from .lab_store import ColumnarLabStore
+        self._labs = ColumnarLabStore(capacity=0)
+        self._critical_has_irc = self.has_condition(ConditionType.IRC_TERMINAL)
+        for kind, items in (('vital', self.vital_signs), ('medication', self.medications),
+                            ('event', self.clinical_events)):
+            self._timeline_index[kind] = ([], [])
+            for item in items:
+                self._index_timeline(kind, item)
+
+    def _index_timeline(self, kind: str, item) -> None:
+        """Inserta un elemento en su fuente ordenada de la línea de tiempo"""
+        keys, items = self._timeline_index[kind]
+        pos = bisect_right(keys, item.timestamp)
+        keys.insert(pos, item.timestamp)
+        items.insert(pos, item)
+
+    @property
+    def lab_results(self):
+        """
+        Resultados de laboratorio en orden de carga, como secuencia de
+        LabResult construidos bajo demanda (LabResultViews): son copias, así
+        que los cambios se hacen con add_lab_result/add_lab_results.
+        """
+        from .lab_store import LabResultViews
+        return LabResultViews(self._labs)
+
+    def _update_critical(self, latest: LabResult) -> None:
+        """Reevalúa el estado crítico de un test a partir de su último resultado"""
+        test_name = latest.test_name
+        was_critical = test_name in self._critical
+        if latest.is_critical(self._critical_has_irc):
+            self._critical[test_name] = latest
+            if not was_critical:
+                self._notify_critical(latest, True)
+        elif was_critical:
+            del self._critical[test_name]
+            self._notify_critical(latest, False)
+
+    def _notify_critical(self, result: LabResult, is_critical: bool) -> None:
+        for listener in self._critical_listeners:
+            listener(result, is_critical)
+
+    def _sync_critical(self) -> None:
+        """Reevalúa todos los tests si cambió la condición de IRC"""
+        has_irc = self.has_condition(ConditionType.IRC_TERMINAL)
+        if has_irc == self._critical_has_irc:
+            return
+        self._critical_has_irc = has_irc
+        for test_name in self._all_test_names():
+            self._update_critical(self.get_latest_lab(test_name))
+
+    def on_critical_change(self, listener: Callable[[LabResult, bool], None]) -> None:
+        """
+        Registra una función que se llama cuando un test entra o sale de estado crítico.
+
+        Args:
+            listener: Recibe el último resultado del test y True si entró en
+                estado crítico o False si salió
+        """
+        self._critical_listeners.append(listener)
+
+    @property
+    def version(self) -> int:
+        """Versión de los datos; cambia con cada modificación"""
+        return self._version
+
+    def test_version(self, test_name: str) -> int:
+        """Versión de los datos de un test; cambia solo cuando cambian sus resultados"""
+        return self._test_versions.get(test_name, 0)
+
+    def _touch(self, test_names: Iterable[str] = ()) -> None:
+        """Registra una modificación de los datos (y de los tests indicados)"""
+        self._version += 1
+        for test_name in test_names:
+            self._test_versions[test_name] = self._version
+        self.last_updated = datetime.now()
 
     def add_lab_result(self, result: LabResult) -> None:
         """Añade un resultado de laboratorio"""
-        self.lab_results.append(result)
-        self.last_updated = datetime.now()
+        row = self._labs.append(result)
+        if self._labs.latest_row(result.test_name) == row:
+            self._update_critical(self.get_latest_lab(result.test_name))
+        self._touch((result.test_name,))
+
+    def set_latest_results(self, latest: Dict[str, LabResult]) -> None:
+        """
+        Registra el último resultado de cada test según la base (lab_latest).
+
+        Los tests cuyo historial está todo archivado no tienen filas en
+        memoria; con esto siguen apareciendo en get_test_names, en el último
+        valor y en los valores críticos.
+
+        Args:
+            latest: test_name -> último LabResult (ver database.load_latest_results)
+        """
+        changed = set(latest) | set(self._stored_latest)
+        self._stored_latest = dict(latest)
+        for test_name in changed:
+            current = self.get_latest_lab(test_name)
+            if current is not None:
+                self._update_critical(current)
+            elif test_name in self._critical:
+                self._notify_critical(self._critical.pop(test_name), False)
+        self._touch(changed)
+
+    def add_pending_lab_result(self, result: LabResult) -> None:
+        """
+        Añade un resultado que se está guardando en segundo plano.
+
+        Queda visible de inmediato; cuando la recarga incremental trae la
+        misma fila desde la base no se duplica (ver claim_pending_lab_results).
+        """
+        key = (result.test_name, result.timestamp, result.value)
+        self._pending_labs[key] = self._pending_labs.get(key, 0) + 1
+        self.add_lab_result(result)
+
+    @property
+    def pending_lab_count(self) -> int:
+        """Cantidad de resultados en memoria que aún no están en la base"""
+        return sum(self._pending_labs.values())
+
+    def get_pending_lab_series(self, test_name: str, start: Optional[datetime] = None,
+                               end: Optional[datetime] = None) -> Optional['LabSeries']:
+        """
+        Serie de los resultados pendientes de un test, para sumarlos a consultas a la base.
+
+        Args:
+            test_name: Nombre del test
+            start: Inicio del período (inclusive)
+            end: Fin del período (inclusive)
+
+        Returns:
+            LabSeries con los pendientes del período, o None si el test no tiene pendientes
+        """
+        pending = Counter({key[1:]: count for key, count in self._pending_labs.items()
+                           if key[0] == test_name})
+        if not pending:
+            return None
+        series = self._labs.series(test_name, start, end)
+        positions = []
+        for position, key in enumerate(zip(series.timestamps.tolist(), series.values.tolist())):
+            if pending[key] > 0:
+                pending[key] -= 1
+                positions.append(position)
+        return series.take(positions)
+
+    def claim_pending_lab_results(self, test_names: Sequence[str], timestamps: Sequence[int],
+                                  values: Sequence[float]) -> List[bool]:
+        """
+        Marca como guardados los resultados pendientes que coinciden con filas leídas de la base.
+
+        Args:
+            test_names: Tests de las filas recién leídas
+            timestamps: Sus timestamps canónicos
+            values: Sus valores
+
+        Returns:
+            Para cada fila, True si ya estaba en memoria como pendiente
+        """
+        if not self._pending_labs:
+            return [False] * len(values)
+        claimed = []
+        claimed_tests = set()
+        for key in zip(test_names, timestamps, values):
+            count = self._pending_labs.get(key, 0)
+            if count:
+                if count == 1:
+                    del self._pending_labs[key]
+                else:
+                    self._pending_labs[key] = count - 1
+                claimed_tests.add(key[0])
+            claimed.append(bool(count))
+        if claimed_tests:
+            # Los datos en memoria no cambian, pero las consultas a la base de esos tests sí
+            self._touch(claimed_tests)
+        return claimed
+
+    def add_lab_results(self, results: Optional[List[LabResult]] = None,
+                        columns: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Añade un lote de resultados de laboratorio como una sola modificación.
+
+        Args:
+            results: Resultados a añadir
+            columns: En lugar de results, los resultados en columnas
+                (argumentos de ColumnarLabStore.extend_columns), que se copian
+                al almacén sin crear objetos
+        """
+        if columns is not None:
+            if len(columns.get('values', ())) == 0:
+                return
+            self._labs.extend_columns(**columns)
+            test_names = list(dict.fromkeys(columns['test_names'].tolist()))
+        else:
+            if not results:
+                return
+            self._labs.extend(results)
+            test_names = list(dict.fromkeys(result.test_name for result in results))
+        for test_name in test_names:
+            self._update_critical(self.get_latest_lab(test_name))
+        self._touch(test_names)
+
+    def add_medication(self, medication: Medication) -> None:
+        """Añade una medicación"""
+        self.medications.append(medication)
+        self._index_timeline('medication', medication)
+        self._touch()
+
+    def add_clinical_event(self, event: ClinicalEvent) -> None:
+        """Añade un evento clínico"""
+        self.clinical_events.append(event)
+        self._index_timeline('event', event)
+        self._touch()
+
+    def add_vital_signs(self, vitals: VitalSigns) -> None:
+        """Añade un registro de signos vitales"""
+        self.vital_signs.append(vitals)
+        self._index_timeline('vital', vitals)
+        if self._vitals_buffer is not None:
+            self._vitals_buffer.add_vital_signs(vitals)
+        self._touch()
+
+    def set_clinical_records(self, medications: Optional[List[Medication]] = None,
+                             vital_signs: Optional[List[VitalSigns]] = None,
+                             events: Optional[List[ClinicalEvent]] = None) -> bool:
+        """
+        Reemplaza medicaciones, signos vitales y eventos por los leídos de la base.
+
+        Cargar dos veces lo mismo no duplica nada. El buffer de monitor solo
+        recibe los signos vitales que no tenía.
+
+        Args:
+            medications: Medicaciones (None = no cambiar)
+            vital_signs: Signos vitales (None = no cambiar)
+            events: Eventos clínicos (None = no cambiar)
+
+        Returns:
+            True si algo cambió
+        """
+        changed = False
+        for kind, attribute, items in (('medication', 'medications', medications),
+                                       ('vital', 'vital_signs', vital_signs),
+                                       ('event', 'clinical_events', events)):
+            if items is None or items == getattr(self, attribute):
+                continue
+            if kind == 'vital' and self._vitals_buffer is not None:
+                known = Counter(astuple(vitals) for vitals in self.vital_signs)
+                for vitals in items:
+                    key = astuple(vitals)
+                    if known[key]:
+                        known[key] -= 1
+                    else:
+                        self._vitals_buffer.add_vital_signs(vitals)
+            setattr(self, attribute, list(items))
+            self._timeline_index[kind] = ([], [])
+            for item in items:
+                self._index_timeline(kind, item)
+            changed = True
+        if changed:
+            self._touch()
+        return changed
+
+    def get_vitals_buffer(self):
+        """Obtiene el buffer de signos vitales de alta frecuencia (VitalsBuffer)"""
+        if self._vitals_buffer is None:
+            from .vitals_buffer import VitalsBuffer
+            self._vitals_buffer = VitalsBuffer()
+            for vitals in sorted(self.vital_signs, key=lambda v: v.timestamp):
+                self._vitals_buffer.add_vital_signs(vitals)
+        return self._vitals_buffer
+
+    def record_vital_sample(self, channel: str, when, value: float) -> bool:
+        """
+        Registra una muestra de monitor (p. ej. FC cada segundo) en el buffer
+        de alta frecuencia, sin guardarla como VitalSigns individual.
+        """
+        return self.get_vitals_buffer().add_sample(channel, when, value)
+
+    def get_lab_columns(self):
+        """
+        Obtiene el almacén columnar de laboratorios.
+
+        Returns:
+            ColumnarLabStore con todos los resultados (la fila i es lab_results[i])
+        """
+        return self._labs
+
+    def _all_test_names(self) -> List[str]:
+        """Tests con resultados en memoria y, después, los que solo están en lab_latest"""
+        names = self._labs.test_names()
+        loaded = set(names)
+        return names + [test_name for test_name in self._stored_latest if test_name not in loaded]
+
+    @_memoized
+    def get_test_names(self) -> List[str]:
+        """Obtiene los nombres de todos los tests registrados (incluidos los archivados)"""
+        return self._all_test_names()
+
+    @_memoized
+    def get_latest_snapshot(self) -> Dict[str, LabResult]:
+        """Obtiene el último resultado de cada test"""
+        return {test_name: self.get_latest_lab(test_name) for test_name in self._all_test_names()}
 
     def get_latest_lab(self, test_name: str) -> Optional[LabResult]:
-        """Obtiene el último valor de un test específico"""
-        matching = [r for r in self.lab_results if r.test_name == test_name]
-        if matching:
-            return max(matching, key=lambda x: x.date)
-        return None
+        """Obtiene el último valor de un test específico (también si ya se archivó)"""
+        row = self._labs.latest_row(test_name)
+        stored = self._stored_latest.get(test_name)
+        if row is None:
+            return stored
+        latest = self._labs.view(row)
+        if stored is not None and stored.timestamp > latest.timestamp:
+            return stored
+        return latest
+
+    def get_lab_range(self, test_name: str, start: Optional[datetime] = None,
+                      end: Optional[datetime] = None) -> List[LabResult]:
+        """Obtiene los resultados de un test entre dos fechas (inclusive), ordenados por fecha"""
+        return self._labs.views(self._labs.rows(test_name, start, end))
 
     def get_lab_trend(self, test_name: str, days: int = 30) -> List[LabResult]:
         """Obtiene la tendencia de un test en los últimos días"""
         cutoff = datetime.now() - timedelta(days=days)
-
-        matching = []
-        for r in self.lab_results:
-            # Manejar tanto datetime como date
-            if isinstance(r.date, datetime):
-                r_date = r.date
-            elif isinstance(r.date, date):
-                r_date = datetime.combine(r.date, datetime.min.time())
-            else:
-                r_date = r.date
-
-            if r.test_name == test_name and r_date >= cutoff:
-                matching.append(r)
-
-        return sorted(matching, key=lambda x: x.date)
+        return self.get_lab_range(test_name, start=cutoff)
+
+    def _timeline_sources(self, kinds: Optional[List[str]] = None):
+        from .timeline import TIMELINE_KINDS
+        kinds = TIMELINE_KINDS if kinds is None else kinds
+        unknown = set(kinds) - set(TIMELINE_KINDS)
+        if unknown:
+            raise ValueError(f"Tipos de línea de tiempo desconocidos: {sorted(unknown)}")
+
+        sources = []
+        if 'lab' in kinds:
+            from .lab_store import LabResultViews
+            for test_name in self._labs.test_names():
+                rows = self._labs.rows(test_name)
+                sources.append(('lab', test_name, self._labs.timestamps_of(rows),
+                                LabResultViews(self._labs, rows)))
+        for kind in ('vital', 'medication', 'event'):
+            if kind in kinds:
+                keys, items = self._timeline_index[kind]
+                sources.append((kind, kind, keys, items))
+        return sources
+
+    def iter_timeline(self, start=None, end=None, kinds: Optional[List[str]] = None, after=None):
+        """
+        Itera laboratorios, signos vitales, medicaciones (por inicio) y eventos
+        en orden temporal, de forma perezosa.
+
+        Args:
+            start: Inicio de la ventana (inclusive)
+            end: Fin de la ventana (inclusive)
+            kinds: Tipos a incluir ('lab', 'vital', 'medication', 'event'); todos por defecto
+            after: TimelineCursor de la última entrada ya vista
+
+        Returns:
+            Iterador de TimelineEntry
+        """
+        from .timeline import iter_timeline
+        return iter_timeline(self._timeline_sources(kinds), start, end, after)
+
+    def get_timeline_page(self, start=None, end=None, kinds: Optional[List[str]] = None,
+                          after=None, limit: int = 50):
+        """Obtiene una página de la línea de tiempo (TimelinePage) con cursor a la siguiente"""
+        from .timeline import timeline_page
+        return timeline_page(self._timeline_sources(kinds), start, end, after, limit)
 
     def has_condition(self, condition: ConditionType) -> bool:
         """Verifica si el paciente tiene una condición específica"""
         return condition in self.conditions
 
+    def add_condition(self, condition: ConditionType) -> None:
+        """Añade una condición médica"""
+        if condition not in self.conditions:
+            self.conditions.append(condition)
+            self._sync_critical()
+            self._touch()
+
+    def set_conditions(self, conditions: List[ConditionType]) -> None:
+        """Reemplaza las condiciones médicas del paciente"""
+        self.conditions = list(conditions)
+        self._sync_critical()
+        self._touch()
+
+    @_memoized
     def get_active_medications(self) -> List[Medication]:
         """Obtiene medicaciones activas"""
         return [m for m in self.medications if m.is_active]
 
-    def get_critical_values(self) -> List[LabResult]:
-        """Obtiene todos los valores críticos actuales"""
-        critical = []
-        has_irc = self.has_condition(ConditionType.IRC_TERMINAL)
+    @_memoized
+    def get_medication_timeline(self):
+        """Obtiene el índice temporal de medicaciones (MedicationTimeline)"""
+        from .intervals import MedicationTimeline
+        return MedicationTimeline(self.medications)
 
-        # Obtener solo los últimos valores de cada test
-        test_names = set(r.test_name for r in self.lab_results)
-        for test in test_names:
-            latest = self.get_latest_lab(test)
-            if latest and latest.is_critical(has_irc):
-                critical.append(latest)
+    def get_medications_at(self, when) -> List[Medication]:
+        """Obtiene las medicaciones que estaban en curso en un instante dado"""
+        return self.get_medication_timeline().at(when)
 
-        return critical
+    @_memoized
+    def get_critical_values(self) -> List[LabResult]:
+        """Obtiene todos los valores críticos actuales"""
+        self._sync_critical()
+        return list(self._critical.values())
 
+    @_memoized
     def get_summary(self) -> Dict[str, Any]:
         """Genera un resumen del estado actual del paciente"""
         return {
             'name': self.name,
             'age': self.age,
             'conditions': [c.value for c in self.conditions],
-            'total_labs': len(self.lab_results),
-            'unique_tests': len(set(r.test_name for r in self.lab_results)),
+            'total_labs': len(self._labs),
+            'unique_tests': len(self._all_test_names()),
             'active_medications': len(self.get_active_medications()),
             'critical_values': len(self.get_critical_values()),
             'latest_update': self.last_updated.strftime('%d/%m/%Y %H:%M')
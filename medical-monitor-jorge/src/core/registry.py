@@ -0,0 +1,135 @@
+"""
+Registro de pacientes con carga diferida y desalojo LRU.
+Permite seguir a muchos pacientes desde un mismo proceso manteniendo en
+memoria solo los consultados recientemente.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import duckdb
+
+from src.core import database as db
+from src.core.memory import deep_sizeof
+from src.core.models import PatientData
+
+
+class PatientRegistry:
+    """
+    Pacientes cargados bajo demanda desde DuckDB.
+
+    Mantiene un LRU acotado por cantidad de pacientes y por presupuesto de
+    memoria; al superar cualquiera de los dos límites desaloja a los pacientes
+    menos usados (el más reciente nunca se desaloja).
+    """
+
+    def __init__(self, conn: duckdb.DuckDBPyConnection, max_patients: int = 100,
+                 memory_budget: int = 512 * 1024 * 1024):
+        """
+        Args:
+            conn: Conexión a la base de datos
+            max_patients: Máximo de pacientes en memoria
+            memory_budget: Máximo de bytes estimados para todos los pacientes cargados
+        """
+        self._conn = conn
+        self.max_patients = max_patients
+        self.memory_budget = memory_budget
+
+        self._patients: "OrderedDict[int, PatientData]" = OrderedDict()
+        # Tamaño estimado de cada paciente y versión de sus datos al medirlo
+        self._sizes: Dict[int, Tuple[int, int]] = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._patients)
+
+    def __contains__(self, patient_id: int) -> bool:
+        return patient_id in self._patients
+
+    def get(self, patient_id: int) -> PatientData:
+        """
+        Obtiene un paciente, cargándolo desde la base de datos si no está en memoria.
+
+        Raises:
+            KeyError: Si el paciente no existe
+        """
+        with self._lock:
+            patient = self._patients.get(patient_id)
+            if patient is not None:
+                self._patients.move_to_end(patient_id)
+                self.hits += 1
+                return patient
+            self.misses += 1
+
+        # Cargar fuera del lock para no bloquear a otros pacientes
+        cursor = self._conn.cursor()
+        try:
+            patient = db.load_patient(cursor, patient_id)
+        finally:
+            cursor.close()
+        if patient is None:
+            raise KeyError(f"Paciente {patient_id} no existe")
+
+        with self._lock:
+            # Otro hilo pudo haberlo cargado mientras tanto
+            existing = self._patients.get(patient_id)
+            if existing is not None:
+                self._patients.move_to_end(patient_id)
+                return existing
+            self._patients[patient_id] = patient
+            self._sizes[patient_id] = (patient.version, deep_sizeof(patient))
+            self._evict_cold()
+        return patient
+
+    def list_patients(self) -> List[Tuple[int, str]]:
+        """Lista (id, nombre) de todos los pacientes de la base de datos"""
+        cursor = self._conn.cursor()
+        try:
+            return db.list_patients(cursor)
+        finally:
+            cursor.close()
+
+    def evict(self, patient_id: int) -> None:
+        """Quita un paciente de memoria (se recargará al pedirlo de nuevo)"""
+        with self._lock:
+            self._patients.pop(patient_id, None)
+            self._sizes.pop(patient_id, None)
+
+    def memory_usage(self) -> int:
+        """Bytes estimados de todos los pacientes en memoria"""
+        with self._lock:
+            return self._memory_usage()
+
+    def _memory_usage(self) -> int:
+        total = 0
+        for patient_id, patient in self._patients.items():
+            version, size = self._sizes[patient_id]
+            if version != patient.version:
+                # Los datos cambiaron desde la última medición
+                size = deep_sizeof(patient)
+                self._sizes[patient_id] = (patient.version, size)
+            total += size
+        return total
+
+    def _evict_cold(self) -> None:
+        while len(self._patients) > 1 and (
+                len(self._patients) > self.max_patients or self._memory_usage() > self.memory_budget):
+            patient_id, _ = self._patients.popitem(last=False)
+            self._sizes.pop(patient_id, None)
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Optional[int]]:
+        """Estadísticas del registro"""
+        with self._lock:
+            return {
+                'loaded': len(self._patients),
+                'memory_bytes': self._memory_usage(),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
@@ -0,0 +1,260 @@
+"""
+Instantáneas de lectura en memoria.
+Los dashboards solo leen: en lugar de consultar medical_data.db, leen una
+copia de las tablas en una base DuckDB en memoria. Cuando el escritor
+publica un punto de control (ConnectionManager.publish), un hilo vuelve a
+copiar solo las tablas que esa publicación declaró modificadas, como mucho
+una vez cada min_interval segundos; si el archivo cambia en disco por otra
+vía se copian todas. Las tablas nuevas reemplazan a las anteriores en una
+sola transacción: las lecturas en curso terminan sobre la versión anterior.
+
+En un proceso que además escribe (la app), la copia se toma de la conexión
+compartida. Con un ConnectionManager en modo solo lectura el archivo se abre
+únicamente mientras se copia, pero DuckDB no permite abrirlo mientras otro
+proceso lo tiene abierto para escribir: ese modo sirve para leer una base
+que se actualiza con scripts que terminan (p. ej. update_medical_data_17_09.py),
+no para leer junto a la app en marcha. Si la copia falla se sigue leyendo la
+anterior.
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Dict, Iterable, Optional, Set
+
+import duckdb
+
+from src.core.connection import ConnectionManager, get_connection_manager
+
+logger = logging.getLogger(__name__)
+
+# Tablas que leen database.load_* y los gráficos
+SNAPSHOT_TABLES = (
+    'patients', 'lab_results', 'lab_latest', 'lab_rollups', 'lab_revisions', 'archive_partitions',
+    'medical_conditions', 'medications', 'vital_signs', 'medical_events',
+)
+
+
+class SnapshotManager:
+    """
+    Copia en memoria de las tablas de lectura, renovada al publicar el escritor.
+
+    Expone cursor() como ConnectionManager, así que las funciones de
+    database.py funcionan igual sobre la instantánea:
+
+        snapshots = get_snapshot_manager()
+        db.load_existing_data(snapshots.cursor(), patient_data)
+    """
+
+    def __init__(self, manager: ConnectionManager, tables=SNAPSHOT_TABLES, poll_interval: float = 5.0,
+                 min_interval: float = 2.0):
+        """
+        Args:
+            manager: Origen de la copia (compartido o en modo solo lectura)
+            tables: Tablas a copiar
+            poll_interval: Segundos entre revisiones del archivo en disco
+            min_interval: Segundos mínimos entre dos renovaciones (las
+                publicaciones del intervalo se juntan en una sola copia)
+        """
+        self.manager = manager
+        self.tables = tuple(tables)
+        self.poll_interval = poll_interval
+        self.min_interval = min_interval
+
+        self._snapshot = duckdb.connect(":memory:")
+        # Se incrementa con cada renovación
+        self._generation = 0
+        # Tablas publicadas como modificadas y todavía no copiadas
+        self._dirty: Set[str] = set()
+        # Publicación y fecha de modificación del archivo de la copia actual
+        self._published = -1
+        self._mtime: Optional[float] = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._stopped = False
+
+        self.refreshes = 0
+        self.tables_copied = 0
+        self.last_refresh_seconds = 0.0
+        self.refreshed_at: Optional[float] = None
+
+        self.refresh()
+        manager.on_publish(self._on_publish)
+        self._thread = threading.Thread(target=self._run, name="snapshot-refresher", daemon=True)
+        self._thread.start()
+
+    def cursor(self) -> duckdb.DuckDBPyConnection:
+        """Cursor del hilo actual sobre la instantánea"""
+        local = self._local
+        if getattr(local, 'cursor', None) is None:
+            local.cursor = self._snapshot.cursor()
+        return local.cursor
+
+    def refresh(self, tables: Optional[Iterable[str]] = None) -> int:
+        """
+        Copia tablas a la base en memoria y reemplaza las anteriores.
+
+        Las tablas se leen en una sola transacción del origen y se reemplazan
+        en una sola transacción de la copia, así que la instantánea es
+        consistente entre tablas aunque el escritor siga trabajando.
+
+        Args:
+            tables: Tablas a copiar (por defecto todas)
+
+        Returns:
+            Número de la renovación en uso
+        """
+        with self._refresh_lock:
+            start = time.perf_counter()
+            with self._lock:
+                published, mtime = self.manager.published, self._file_mtime()
+                if tables is None:
+                    tables = self.tables
+                    self._dirty.clear()
+                else:
+                    tables = [table for table in self.tables if table in set(tables)]
+                    self._dirty.difference_update(tables)
+
+            copied = self._copy_tables(tables)
+
+            with self._lock:
+                self._generation += 1
+                self._published, self._mtime = published, mtime
+                generation = self._generation
+            self.refreshes += 1
+            self.tables_copied += len(copied)
+            self.last_refresh_seconds = time.perf_counter() - start
+            self.refreshed_at = time.time()
+            logger.info("Instantánea %d de %s (%s) en %.3f s", generation, self.manager.db_path,
+                        ', '.join(copied) or 'sin tablas', self.last_refresh_seconds)
+            return generation
+
+    def _copy_tables(self, tables) -> list:
+        source = self.manager.cursor()
+        copied = []
+        source.begin()
+        try:
+            existing = {name for name, in source.execute(
+                "SELECT table_name FROM duckdb_tables() WHERE schema_name = 'main'").fetchall()}
+            for table in tables:
+                if table not in existing:
+                    continue
+                # Arrow pasa las columnas de una base a la otra sin convertir filas a Python
+                self._snapshot.register('snapshot_source', source.execute(f"SELECT * FROM {table}").arrow())
+                self._snapshot.execute(f"CREATE OR REPLACE TABLE {table}__next AS SELECT * FROM snapshot_source")
+                self._snapshot.unregister('snapshot_source')
+                copied.append(table)
+        finally:
+            source.rollback()
+            if self.manager.read_only:
+                # Liberar el archivo para que un script de carga pueda abrirlo
+                self.manager.close()
+
+        swap = self._snapshot.cursor()
+        swap.begin()
+        try:
+            for table in copied:
+                swap.execute(f"DROP TABLE IF EXISTS {table}")
+                swap.execute(f"ALTER TABLE {table}__next RENAME TO {table}")
+            swap.commit()
+        except duckdb.Error:
+            swap.rollback()
+            raise
+        finally:
+            swap.close()
+        return copied
+
+    def is_stale(self) -> bool:
+        """True si el escritor publicó o el archivo cambió desde la última copia"""
+        return self.manager.published != self._published or self._file_mtime() != self._mtime
+
+    def _file_mtime(self) -> Optional[float]:
+        try:
+            return os.path.getmtime(self.manager.db_path)
+        except OSError:
+            return None
+
+    def _on_publish(self, version: int, tables: Optional[Iterable[str]] = None) -> None:
+        with self._lock:
+            # Sin detalle de tablas, la publicación pudo tocar cualquiera
+            self._dirty.update(self.tables if tables is None else tables)
+            self._wakeup.notify()
+
+    def _pending_tables(self) -> Optional[list]:
+        """Tablas a copiar en la próxima renovación (None = todas)"""
+        with self._lock:
+            if self.manager.published != self._published:
+                return list(self._dirty)
+        # Cambio en disco que no pasó por publish (otro proceso, archive_data.py)
+        return None
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                if not self._stopped:
+                    self._wakeup.wait(self.poll_interval)
+                if self._stopped:
+                    return
+                since = time.time() - (self.refreshed_at or 0)
+                if since < self.min_interval:
+                    # Juntar las publicaciones seguidas (la cola de ingesta publica en cada guardado)
+                    self._wakeup.wait(self.min_interval - since)
+                    if self._stopped:
+                        return
+            if not self.is_stale():
+                continue
+            tables = self._pending_tables()
+            try:
+                self.refresh(tables)
+            except duckdb.Error as e:
+                # Se sigue leyendo la copia anterior; se reintenta en la próxima revisión
+                with self._lock:
+                    self._dirty.update(self.tables if tables is None else tables)
+                logger.warning("Error renovando la instantánea de %s: %s", self.manager.db_path, e)
+
+    def close(self) -> None:
+        """Detiene el hilo de renovación (la instantánea actual sigue legible)"""
+        with self._lock:
+            self._stopped = True
+            self._wakeup.notify()
+        self._thread.join()
+
+    def stats(self) -> Dict[str, Optional[object]]:
+        """Estadísticas de las instantáneas"""
+        return {
+            'generation': self._generation,
+            'refreshes': self.refreshes,
+            'tables_copied': self.tables_copied,
+            'last_refresh_seconds': self.last_refresh_seconds,
+            'refreshed_at': self.refreshed_at,
+            'stale': self.is_stale()
+        }
+
+
+_snapshots: Dict[str, SnapshotManager] = {}
+_snapshots_lock = threading.Lock()
+
+
+def get_snapshot_manager(db_path: str = "medical_data.db") -> SnapshotManager:
+    """
+    Instantánea de lectura compartida por todo el proceso para una base de datos.
+
+    Se copia desde la conexión compartida de get_connection_manager y se
+    renueva tras cada publish() (p. ej. tras los guardados de la cola de ingesta).
+
+    Args:
+        db_path: Ruta a la base de datos
+
+    Returns:
+        El mismo SnapshotManager para todas las llamadas con la misma ruta
+    """
+    key = db_path if db_path == ":memory:" else os.path.abspath(db_path)
+    with _snapshots_lock:
+        snapshots = _snapshots.get(key)
+        if snapshots is None:
+            snapshots = SnapshotManager(get_connection_manager(db_path))
+            _snapshots[key] = snapshots
+        return snapshots
@@ -0,0 +1,107 @@
+"""
+Línea de tiempo clínica unificada.
+Mezcla en forma perezosa (k-way merge) fuentes ya ordenadas por timestamp:
+laboratorios, signos vitales, medicaciones y eventos clínicos.
+"""
+
+import heapq
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from datetime import datetime
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from .models import from_timestamp, to_timestamp
+
+# Tipos de entrada, en el orden usado para desempatar timestamps iguales
+TIMELINE_KINDS = ('lab', 'vital', 'medication', 'event')
+_KIND_RANK = {kind: rank for rank, kind in enumerate(TIMELINE_KINDS)}
+
+
+class TimelineCursor(NamedTuple):
+    """Posición de una entrada; la paginación continúa justo después de ella"""
+    timestamp: int
+    kind: str
+    source: str
+    position: int
+
+    def _key(self) -> tuple:
+        return (self.timestamp, _KIND_RANK[self.kind], self.source, self.position)
+
+
+@dataclass(frozen=True)
+class TimelineEntry:
+    """Entrada de la línea de tiempo"""
+    timestamp: int
+    kind: str
+    item: Any
+    cursor: TimelineCursor
+
+    @property
+    def date(self) -> datetime:
+        return from_timestamp(self.timestamp)
+
+
+@dataclass
+class TimelinePage:
+    """Página de entradas y cursor para pedir la siguiente (None si no hay más)"""
+    entries: List[TimelineEntry]
+    next_cursor: Optional[TimelineCursor]
+
+
+# Fuente ordenada: (tipo, nombre de la fuente, timestamps, elementos)
+TimelineSource = Tuple[str, str, Sequence[int], Sequence[Any]]
+
+
+def _iter_source(kind: str, source: str, keys: Sequence[int], items: Sequence[Any],
+                 start: Optional[int], end: Optional[int],
+                 after: Optional[tuple]) -> Iterator[tuple]:
+    rank = _KIND_RANK[kind]
+    lo = bisect_left(keys, start) if start is not None else 0
+    hi = bisect_right(keys, end) if end is not None else len(keys)
+    if after is not None:
+        lo = max(lo, bisect_left(keys, after[0]))
+        # Saltar las entradas con el mismo timestamp que quedan antes del cursor
+        while lo < hi and (keys[lo], rank, source, lo) <= after:
+            lo += 1
+    for position in range(lo, hi):
+        # Las claves pueden venir en un arreglo NumPy (laboratorios): int para el cursor
+        yield (int(keys[position]), rank, source, position, kind, items[position])
+
+
+def iter_timeline(sources: Iterable[TimelineSource], start=None, end=None,
+                  after: Optional[TimelineCursor] = None) -> Iterator[TimelineEntry]:
+    """
+    Itera las entradas de varias fuentes en orden temporal.
+
+    Cada fuente se recorta por bisección a [start, end], de modo que el costo
+    es proporcional a la ventana y no al historial completo.
+
+    Args:
+        sources: Fuentes ordenadas por timestamp
+        start: Inicio de la ventana (datetime o timestamp), inclusive
+        end: Fin de la ventana (datetime o timestamp), inclusive
+        after: Cursor de la última entrada ya vista
+
+    Returns:
+        Iterador perezoso de TimelineEntry
+    """
+    start_ts = to_timestamp(start) if start is not None else None
+    end_ts = to_timestamp(end) if end is not None else None
+    after_key = after._key() if after is not None else None
+    streams = [
+        _iter_source(kind, source, keys, items, start_ts, end_ts, after_key)
+        for kind, source, keys, items in sources
+    ]
+    for timestamp, _, source, position, kind, item in heapq.merge(*streams):
+        yield TimelineEntry(timestamp, kind, item, TimelineCursor(timestamp, kind, source, position))
+
+
+def timeline_page(sources: Iterable[TimelineSource], start=None, end=None,
+                  after: Optional[TimelineCursor] = None, limit: int = 50) -> TimelinePage:
+    """Obtiene una página de la línea de tiempo"""
+    entries = list(islice(iter_timeline(sources, start, end, after), limit + 1))
+    if len(entries) > limit:
+        entries = entries[:limit]
+        return TimelinePage(entries, entries[-1].cursor)
+    return TimelinePage(entries, None)
@@ -0,0 +1,216 @@
+"""
+Buffer circular de signos vitales de alta frecuencia.
+Cada canal guarda las muestras crudas de una ventana reciente en arreglos
+NumPy de tamaño fijo y las resume en niveles de 1 minuto, 15 minutos y
+1 hora (mínimo, media, máximo), de modo que una semana de monitoreo ocupa
+memoria acotada.
+"""
+
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+from .models import VitalSigns, to_timestamp
+
+# Canales: nombres de campo de VitalSigns
+VITAL_CHANNELS = (
+    'heart_rate',
+    'blood_pressure_sys',
+    'blood_pressure_dia',
+    'temperature',
+    'oxygen_saturation',
+    'respiratory_rate',
+    'glasgow_score',
+)
+
+# Niveles de resumen: (nombre, ancho del intervalo, intervalos retenidos)
+TIERS = (
+    ('1min', timedelta(minutes=1), 24 * 60),      # 24 horas
+    ('15min', timedelta(minutes=15), 14 * 96),    # 14 días
+    ('1h', timedelta(hours=1), 90 * 24),          # 90 días
+)
+
+
+@dataclass
+class VitalSeries:
+    """Serie de un canal: muestras crudas (min = mean = max) o intervalos resumidos"""
+    channel: str
+    resolution: str
+    timestamps: np.ndarray
+    mean: np.ndarray
+    min: np.ndarray
+    max: np.ndarray
+    count: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    @property
+    def dates(self) -> np.ndarray:
+        """Fechas como datetime64[us], aptas para gráficos"""
+        return self.timestamps.astype('datetime64[us]')
+
+
+class _Ring:
+    """Arreglos de tamaño fijo que sobrescriben las entradas más viejas"""
+
+    def __init__(self, capacity: int, columns: Dict[str, type]):
+        self.capacity = capacity
+        self.columns = {name: np.zeros(capacity, dtype=dtype) for name, dtype in columns.items()}
+        self.head = 0
+        self.size = 0
+
+    def push(self, **values) -> None:
+        for name, value in values.items():
+            self.columns[name][self.head] = value
+        self.head = (self.head + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def ordered(self, name: str) -> np.ndarray:
+        """Columna en orden cronológico"""
+        column = self.columns[name]
+        if self.size < self.capacity:
+            return column[:self.size]
+        return np.concatenate((column[self.head:], column[:self.head]))
+
+    def covers(self, timestamp: int) -> bool:
+        """True si no se sobrescribió nada posterior al instante indicado"""
+        if self.size < self.capacity:
+            return True
+        return int(self.columns['timestamp'][self.head]) <= timestamp
+
+
+_RAW_COLUMNS = {'timestamp': np.int64, 'value': np.float64}
+_TIER_COLUMNS = {'timestamp': np.int64, 'min': np.float64, 'max': np.float64,
+                 'sum': np.float64, 'count': np.int32}
+
+
+class VitalChannel:
+    """Un canal de signos vitales (p. ej. frecuencia cardíaca)"""
+
+    def __init__(self, name: str, raw_capacity: int = 3600):
+        """
+        Args:
+            name: Nombre del canal
+            raw_capacity: Muestras crudas retenidas (3600 = 1 hora a 1 Hz)
+        """
+        self.name = name
+        self._raw = _Ring(raw_capacity, _RAW_COLUMNS)
+        self._tiers = {}
+        for tier_name, width, capacity in TIERS:
+            self._tiers[tier_name] = (width // timedelta(microseconds=1), _Ring(capacity, _TIER_COLUMNS))
+        # Intervalo abierto de cada nivel: [inicio, min, max, suma, cantidad]
+        self._open: Dict[str, list] = {}
+        self._last_timestamp: Optional[int] = None
+
+    def __len__(self) -> int:
+        return self._raw.size
+
+    def add(self, when, value: float) -> bool:
+        """
+        Añade una muestra. Las muestras deben llegar en orden temporal.
+
+        Returns:
+            False si la muestra es anterior a la última recibida y se descartó
+        """
+        timestamp = to_timestamp(when)
+        if self._last_timestamp is not None and timestamp < self._last_timestamp:
+            return False
+        self._last_timestamp = timestamp
+        self._raw.push(timestamp=timestamp, value=value)
+
+        for tier_name, (width, ring) in self._tiers.items():
+            bucket_start = timestamp - timestamp % width
+            bucket = self._open.get(tier_name)
+            if bucket is not None and bucket[0] != bucket_start:
+                ring.push(timestamp=bucket[0], min=bucket[1], max=bucket[2], sum=bucket[3], count=bucket[4])
+                bucket = None
+            if bucket is None:
+                self._open[tier_name] = [bucket_start, value, value, value, 1]
+            else:
+                bucket[1] = min(bucket[1], value)
+                bucket[2] = max(bucket[2], value)
+                bucket[3] += value
+                bucket[4] += 1
+        return True
+
+    def raw(self, start=None, end=None) -> VitalSeries:
+        """Muestras crudas dentro de la ventana retenida"""
+        timestamps = self._raw.ordered('timestamp')
+        values = self._raw.ordered('value')
+        lo, hi = self._bounds(timestamps, start, end)
+        values = values[lo:hi]
+        return VitalSeries(self.name, 'raw', timestamps[lo:hi], values, values, values,
+                           np.ones(len(values), dtype=np.int32))
+
+    def aggregated(self, resolution: str, start=None, end=None) -> VitalSeries:
+        """Intervalos resumidos de un nivel ('1min', '15min' o '1h'), incluido el abierto"""
+        _, ring = self._tiers[resolution]
+        columns = {name: ring.ordered(name) for name in _TIER_COLUMNS}
+        bucket = self._open.get(resolution)
+        if bucket is not None:
+            for name, value in zip(('timestamp', 'min', 'max', 'sum', 'count'), bucket):
+                columns[name] = np.append(columns[name], value)
+        lo, hi = self._bounds(columns['timestamp'], start, end)
+        count = columns['count'][lo:hi]
+        return VitalSeries(self.name, resolution, columns['timestamp'][lo:hi],
+                           columns['sum'][lo:hi] / np.maximum(count, 1),
+                           columns['min'][lo:hi], columns['max'][lo:hi], count)
+
+    def trend(self, start, end=None, max_points: int = 500) -> VitalSeries:
+        """
+        Serie para un período, eligiendo la resolución más fina que cubra el
+        inicio del período y no supere max_points puntos.
+        """
+        start_ts = to_timestamp(start)
+        end_ts = to_timestamp(end) if end is not None else self._last_timestamp or start_ts
+        span = max(end_ts - start_ts, 0)
+
+        if self._raw.covers(start_ts):
+            raw = self.raw(start, end)
+            if len(raw) <= max_points:
+                return raw
+        for tier_name, (width, ring) in self._tiers.items():
+            if ring.covers(start_ts) and span // width <= max_points:
+                return self.aggregated(tier_name, start, end)
+        return self.aggregated(TIERS[-1][0], start, end)
+
+    @staticmethod
+    def _bounds(timestamps: np.ndarray, start, end) -> Tuple[int, int]:
+        lo = np.searchsorted(timestamps, to_timestamp(start), 'left') if start is not None else 0
+        hi = np.searchsorted(timestamps, to_timestamp(end), 'right') if end is not None else len(timestamps)
+        return lo, hi
+
+
+class VitalsBuffer:
+    """Buffers de todos los canales de signos vitales de un paciente"""
+
+    def __init__(self, raw_capacity: int = 3600, channels: Iterable[str] = VITAL_CHANNELS):
+        self.channels: Dict[str, VitalChannel] = {
+            name: VitalChannel(name, raw_capacity) for name in channels
+        }
+
+    def add_sample(self, channel: str, when, value: float) -> bool:
+        """Añade una muestra a un canal"""
+        return self.channels[channel].add(when, value)
+
+    def add_vital_signs(self, vitals: VitalSigns) -> None:
+        """Añade todos los valores presentes de un registro de signos vitales"""
+        for name, channel in self.channels.items():
+            value = getattr(vitals, name, None)
+            if value is not None:
+                channel.add(vitals.timestamp, value)
+
+    def trend(self, channel: str, start, end=None, max_points: int = 500) -> VitalSeries:
+        """Serie de un canal para un período con resolución automática"""
+        return self.channels[channel].trend(start, end, max_points)
+
+    def nbytes(self) -> int:
+        """Memoria fija ocupada por los arreglos de todos los canales"""
+        total = 0
+        for channel in self.channels.values():
+            rings = [channel._raw] + [ring for _, ring in channel._tiers.values()]
+            total += sum(column.nbytes for ring in rings for column in ring.columns.values())
+        return total
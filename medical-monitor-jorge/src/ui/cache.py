@@ -0,0 +1,118 @@
+"""
+Caché de consultas para la interfaz.
+Guarda resultados de consultas a la base y de gráficos entre reruns de
+Streamlit. Cada entrada lleva la versión de los datos con la que se calculó
+(la del test consultado o la del paciente completo), así que guardar un
+resultado invalida solo las entradas de ese test.
+"""
+
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+import streamlit as st
+
+from src.core.models import PatientData
+
+
+class QueryCache:
+    """
+    Caché LRU de tamaño acotado, con clave (consulta, argumentos) y versión de datos.
+
+    Uso:
+        cache = get_query_cache()
+        trend = cache.get(patient_data, "trend", db.load_lab_trend, conn, test, cutoff,
+                          test_name=test)
+    """
+
+    def __init__(self, max_entries: int = 128):
+        """
+        Args:
+            max_entries: Entradas guardadas como máximo (se descartan las menos usadas)
+        """
+        self.max_entries = max_entries
+        # (consulta, argumentos) -> (test o None, versión, valor)
+        self._entries: "OrderedDict[Tuple[str, Hashable], Tuple[Optional[str], int, Any]]" = OrderedDict()
+        # Paciente cuyos datos están en caché; otro objeto (carga completa) vacía la caché
+        self._patient: Optional[PatientData] = None
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, patient_data: PatientData, name: str, compute: Callable, *args,
+            key: Hashable = None, test_name: Optional[str] = None) -> Any:
+        """
+        Devuelve compute(*args), recalculándolo solo si cambiaron los datos.
+
+        Args:
+            patient_data: Paciente del que dependen los datos
+            name: Nombre de la consulta
+            compute: Función que calcula el valor
+            *args: Argumentos de compute
+            key: Parte de la clave en lugar de args (si args no son hashables,
+                p. ej. una conexión)
+            test_name: Test del que depende el valor; None si depende de todo el paciente
+
+        Returns:
+            El valor guardado o recién calculado
+        """
+        if patient_data is not self._patient:
+            self.clear()
+            self._patient = patient_data
+        version = patient_data.test_version(test_name) if test_name else patient_data.version
+        entry_key = (name, args if key is None else key)
+
+        entry = self._entries.get(entry_key)
+        if entry is not None and entry[1] == version:
+            self._entries.move_to_end(entry_key)
+            self.hits += 1
+            return entry[2]
+
+        self.misses += 1
+        value = compute(*args)
+        self._entries[entry_key] = (test_name, version, value)
+        self._entries.move_to_end(entry_key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return value
+
+    def invalidate(self, test_name: Optional[str] = None) -> int:
+        """
+        Descarta las entradas de un test (o todas), p. ej. tras escribir en la
+        base sin pasar por PatientData.
+
+        Returns:
+            Cantidad de entradas descartadas
+        """
+        if test_name is None:
+            removed = len(self._entries)
+            self._entries.clear()
+            return removed
+        keys = [key for key, entry in self._entries.items() if entry[0] == test_name]
+        for key in keys:
+            del self._entries[key]
+        return len(keys)
+
+    def clear(self) -> None:
+        """Vacía la caché (los contadores se conservan)"""
+        self._entries.clear()
+        self._patient = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Estadísticas de la caché"""
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
+
+def get_query_cache() -> QueryCache:
+    """Caché de consultas de la sesión de Streamlit actual"""
+    if 'query_cache' not in st.session_state:
+        st.session_state.query_cache = QueryCache()
+    return st.session_state.query_cache
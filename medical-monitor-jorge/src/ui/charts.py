@@ -2,10 +2,19 @@
 Componentes de visualización y gráficos.
 """
 
+import numpy as np
 import plotly.graph_objects as go
 import plotly.express as px
+from datetime import date, datetime, timedelta
 from typing import List
-from src.core.models import LabResult
+from src.core.models import AlertLevel, LabResult
+from src.core.lab_store import LabSeries, LabTrend
+from src.ui.cache import get_query_cache
+
+
+def _year_cutoff() -> datetime:
+    """Inicio del último año al comienzo del día: la clave de la caché no cambia en cada rerun"""
+    return datetime.combine(date.today(), datetime.min.time()) - timedelta(days=365)
 
 
 def create_trend_chart(results: List[LabResult], test_name: str):
@@ -19,9 +28,23 @@ def create_trend_chart(results: List[LabResult], test_name: str):
     Returns:
         Figura de Plotly
     """
-    dates = [r.date for r in results]
-    values = [r.value for r in results]
-    unit = results[0].unit if results else ""
+    return create_series_chart(LabSeries.from_results(results, test_name), test_name)
+
+
+def create_series_chart(series: LabSeries, test_name: str):
+    """
+    Crea un gráfico de tendencia a partir de una serie columnar.
+
+    Args:
+        series: Serie del test (arreglos ordenados por fecha)
+        test_name: Nombre del test
+
+    Returns:
+        Figura de Plotly
+    """
+    dates = series.dates
+    values = series.values
+    unit = series.unit
 
     fig = go.Figure()
 
@@ -36,42 +59,43 @@ def create_trend_chart(results: List[LabResult], test_name: str):
     ))
 
     # Añadir rangos de referencia si están disponibles
-    if results[0].reference_min is not None and results[0].reference_max is not None:
+    ref_min = series.reference_min[0]
+    ref_max = series.reference_max[0]
+    if not np.isnan(ref_min) and not np.isnan(ref_max):
         fig.add_hline(
-            y=results[0].reference_min,
+            y=ref_min,
             line_dash="dash",
             line_color="green",
-            annotation_text=f"Mínimo normal ({results[0].reference_min})"
+            annotation_text=f"Mínimo normal ({ref_min})"
         )
         fig.add_hline(
-            y=results[0].reference_max,
+            y=ref_max,
             line_dash="dash",
             line_color="red",
-            annotation_text=f"Máximo normal ({results[0].reference_max})"
+            annotation_text=f"Máximo normal ({ref_max})"
         )
 
         # Área de rango normal
         fig.add_hrect(
-            y0=results[0].reference_min,
-            y1=results[0].reference_max,
+            y0=ref_min,
+            y1=ref_max,
             fillcolor="green",
             opacity=0.1,
             line_width=0
         )
 
     # Marcar valores críticos
-    for i, result in enumerate(results):
-        if result.alert_level.value in ['critico', 'alerta']:
-            fig.add_annotation(
-                x=dates[i],
-                y=values[i],
-                text="⚠️",
-                showarrow=True,
-                arrowhead=2,
-                arrowsize=1,
-                arrowwidth=2,
-                arrowcolor="red"
-            )
+    for i in np.flatnonzero(series.alert_mask(AlertLevel.CRITICO, AlertLevel.ALERTA)):
+        fig.add_annotation(
+            x=dates[i],
+            y=values[i],
+            text="⚠️",
+            showarrow=True,
+            arrowhead=2,
+            arrowsize=1,
+            arrowwidth=2,
+            arrowcolor="red"
+        )
 
     fig.update_layout(
         title=f"Tendencia de {test_name}",
@@ -85,10 +109,81 @@ def create_trend_chart(results: List[LabResult], test_name: str):
     return fig
 
 
+def create_rollup_chart(trend: LabTrend, test_name: str):
+    """
+    Crea un gráfico de tendencia a partir de intervalos resumidos (media y rango min-max).
+
+    Args:
+        trend: Tendencia con resolución 'day', 'week' o 'month'
+        test_name: Nombre del test
+
+    Returns:
+        Figura de Plotly
+    """
+    labels = {'day': 'diaria', 'week': 'semanal', 'month': 'mensual'}
+    dates = trend.dates
+
+    fig = go.Figure()
+
+    # Banda mínimo-máximo de cada intervalo
+    fig.add_trace(go.Scatter(
+        x=dates,
+        y=trend.max,
+        mode='lines',
+        line=dict(width=0),
+        showlegend=False,
+        hoverinfo='skip'
+    ))
+    fig.add_trace(go.Scatter(
+        x=dates,
+        y=trend.min,
+        mode='lines',
+        line=dict(width=0),
+        fill='tonexty',
+        fillcolor='rgba(0, 0, 255, 0.15)',
+        name='Mínimo - máximo'
+    ))
+
+    # Media de cada intervalo
+    fig.add_trace(go.Scatter(
+        x=dates,
+        y=trend.mean,
+        mode='lines+markers',
+        name=f"Media {labels.get(trend.resolution, trend.resolution)}",
+        line=dict(color='blue', width=2),
+        marker=dict(size=5),
+        customdata=trend.count,
+        hovertemplate='%{y:.2f} (%{customdata} mediciones)'
+    ))
+
+    if trend.reference_min is not None and trend.reference_max is not None:
+        fig.add_hrect(
+            y0=trend.reference_min,
+            y1=trend.reference_max,
+            fillcolor="green",
+            opacity=0.1,
+            line_width=0
+        )
+
+    fig.update_layout(
+        title=f"Tendencia de {test_name} (media {labels.get(trend.resolution, trend.resolution)})",
+        xaxis_title="Fecha",
+        yaxis_title=f"Valor ({trend.unit})",
+        hovermode='x unified',
+        showlegend=True,
+        height=400
+    )
+
+    return fig
+
+
 def create_comparison_chart(patient_data, test_names: List[str]):
     """
     Crea un gráfico comparativo de múltiples tests.
 
+    La figura se guarda en la caché de consultas de la sesión y se rearma
+    solo si cambian los datos del paciente.
+
     Args:
         patient_data: Datos del paciente
         test_names: Lista de tests a comparar
@@ -96,23 +191,24 @@ def create_comparison_chart(patient_data, test_names: List[str]):
     Returns:
         Figura de Plotly
     """
+    cutoff = _year_cutoff()
+    return get_query_cache().get(patient_data, "comparison_chart",
+                                 _build_comparison_chart, patient_data, test_names, cutoff,
+                                 key=(tuple(test_names), cutoff))
+
+
+def _build_comparison_chart(patient_data, test_names: List[str], cutoff: datetime):
     fig = go.Figure()
+    columns = patient_data.get_lab_columns()
 
     for test_name in test_names:
-        results = patient_data.get_lab_trend(test_name, days=365)
-        if results:
-            dates = [r.date for r in results]
-            values = [r.value for r in results]
-
+        series = columns.series(test_name, start=cutoff)
+        if len(series):
             # Normalizar valores para comparación
-            if len(values) > 0:
-                max_val = max(values)
-                normalized = [v/max_val * 100 for v in values]
-            else:
-                normalized = values
+            normalized = series.values / series.values.max() * 100
 
             fig.add_trace(go.Scatter(
-                x=dates,
+                x=series.dates,
                 y=normalized,
                 mode='lines+markers',
                 name=test_name
@@ -187,29 +283,34 @@ def create_heatmap_correlations(patient_data):
     Returns:
         Figura de Plotly o None si no hay suficientes datos
     """
+    cutoff = _year_cutoff()
+    return get_query_cache().get(patient_data, "heatmap_correlations",
+                                 _build_heatmap_correlations, patient_data, cutoff, key=cutoff)
+
+
+def _build_heatmap_correlations(patient_data, cutoff: datetime):
     import pandas as pd
-    import numpy as np
 
     # Obtener todos los tests únicos
-    test_names = list(set(r.test_name for r in patient_data.lab_results))
+    test_names = patient_data.get_test_names()
 
     if len(test_names) < 2:
         return None
 
     # Crear matriz de datos
-    data = []
+    data = {}
+    columns = patient_data.get_lab_columns()
     for test in test_names:
-        results = patient_data.get_lab_trend(test, days=365)
-        if results:
-            values = [r.value for r in results]
-            data.append(values[:10])  # Limitar a 10 valores más recientes
+        series = columns.series(test, start=cutoff)
+        if len(series):
+            data[test] = series.values[-10:].tolist()  # Limitar a 10 valores más recientes
 
     # Si no hay suficientes datos, retornar None
     if len(data) < 2:
         return None
 
     # Crear DataFrame y calcular correlaciones
-    df = pd.DataFrame(data, index=test_names).T
+    df = pd.DataFrame.from_dict(data, orient='index').T
     corr = df.corr()
 
     # Crear mapa de calor
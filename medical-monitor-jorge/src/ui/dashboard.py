@@ -11,7 +11,7 @@ def render_dashboard():
     """Renderiza el dashboard principal"""
     patient = st.session_state.patient_data
 
-    if not patient.lab_results:
+    if not patient.get_test_names():
         st.info("👋 Bienvenido al Sistema de Monitoreo Médico. Comience ingresando algunos datos de laboratorio usando el menú lateral.")
         render_empty_state()
         return
@@ -45,7 +45,7 @@ def render_latest_values():
     patient = st.session_state.patient_data
 
     # Obtener tests únicos
-    test_names = list(set(r.test_name for r in patient.lab_results))
+    test_names = patient.get_test_names()
 
     # Crear columnas para métricas
     cols = st.columns(min(4, len(test_names)))
@@ -4,8 +4,10 @@ Formularios de entrada de datos para la aplicación.
 
 import streamlit as st
 from datetime import datetime, date
+from src.core import database as db
 from src.core.models import LabResult, ConditionType, AlertLevel
 from src.core.validators import MedicalValidator
+from src.core.ingest import get_ingestion_queue
 
 
 def render_lab_form():
@@ -35,6 +37,7 @@ def render_lab_form():
 
         with col2:
             test_date = st.date_input("Fecha del análisis:", value=date.today())
+            test_time = st.time_input("Hora de la extracción:", value=datetime.now().time())
             ref_min = st.number_input("Valor mínimo normal (opcional):", min_value=0.0, step=0.01)
             ref_max = st.number_input("Valor máximo normal (opcional):", min_value=0.0, step=0.01)
             notes = st.text_area("Notas (opcional):")
@@ -58,15 +61,17 @@ def render_lab_form():
                 test_name=test_name,
                 value=value,
                 unit=unit,
-                date=datetime.combine(test_date, datetime.min.time()),
+                date=datetime.combine(test_date, test_time),
                 reference_min=ref_min if ref_min > 0 else None,
                 reference_max=ref_max if ref_max > 0 else None,
                 alert_level=validation.get('alert_level', AlertLevel.NORMAL),
                 notes=notes
             )
 
-            # Añadir al paciente
-            st.session_state.patient_data.add_lab_result(lab_result)
+            # Encolar el guardado (lo hace un hilo en segundo plano) y mostrarlo ya en memoria
+            patient_data = st.session_state.patient_data
+            get_ingestion_queue().submit_lab_result(lab_result, patient_data.patient_id)
+            patient_data.add_pending_lab_result(lab_result)
 
             # Mostrar resultado
             if validation['alert_level'] == AlertLevel.CRITICO:
@@ -100,10 +105,18 @@ def render_condition_form():
         submitted = st.form_submit_button("Actualizar Condiciones", use_container_width=True)
 
         if submitted:
-            # Actualizar condiciones
-            st.session_state.patient_data.conditions = [
-                cond for cond, selected in conditions.items() if selected
-            ]
+            # Guardar en la base antes del rerun: refresh_existing_data relee las
+            # condiciones de la base y descartaría un cambio hecho solo en memoria
+            patient_data = st.session_state.patient_data
+            selected = [cond for cond, selected in conditions.items() if selected]
+            manager = st.session_state.db_manager
+            with manager.writer() as conn:
+                db.save_conditions(conn, selected, patient_data.patient_id)
+            manager.publish(['medical_conditions'])
+            if st.session_state.db_reader is not manager:
+                # La instantánea se renueva en segundo plano; el rerun tiene que verla ya
+                st.session_state.db_reader.refresh(['medical_conditions'])
+            patient_data.set_conditions(selected)
             st.success("✅ Condiciones actualizadas")
             st.session_state.show_condition_form = False
             st.rerun()
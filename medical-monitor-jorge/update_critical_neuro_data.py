@@ -9,21 +9,18 @@ import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from datetime import datetime
-import duckdb
+from src.core.database import init_database, DEFAULT_PATIENT_ID
 
 def update_critical_neuro_data():
     """Actualiza los datos neurológicos críticos basados en TC del 17/09/2025."""
 
     # Conectar a la base de datos
-    conn = duckdb.connect('medical_data.db')
+    conn = init_database('medical_data.db')
 
     # Fecha del evento principal (estimada)
     surgery_date = datetime(2025, 9, 10)  # Probable fecha de craniectomía
     current_date = datetime(2025, 9, 17)
 
-    # Obtener el siguiente ID para eventos médicos
-    event_id = conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM medical_events").fetchone()[0]
-
     # Eventos neurológicos críticos
     events = [
         # Craniectomía descompresiva
@@ -154,10 +151,9 @@ SIGNOS DE ALARMA INMEDIATOS:
     for event_data in events:
         conn.execute("""
             INSERT INTO medical_events
-            (id, date, time, type, title, description, urgency)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        """, [event_id] + list(event_data))
-        event_id += 1
+            (patient_id, date, type, title, description, urgency)
+            VALUES (?, CAST(? AS DATE) + CAST(? AS TIME), ?, ?, ?, ?)
+        """, [DEFAULT_PATIENT_ID] + list(event_data))
 
     # Actualizar condiciones médicas
     new_conditions = [
@@ -170,23 +166,11 @@ SIGNOS DE ALARMA INMEDIATOS:
 
     for condition, active in new_conditions:
         conn.execute("""
-            INSERT OR REPLACE INTO medical_conditions (condition, active)
-            VALUES (?, ?)
-        """, [condition, active])
+            INSERT OR REPLACE INTO medical_conditions (patient_id, condition, active)
+            VALUES (?, ?, ?)
+        """, [DEFAULT_PATIENT_ID, condition, active])
 
     # Agregar parámetros de monitoreo objetivo
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS monitoring_targets (
-            parameter VARCHAR PRIMARY KEY,
-            target_min DOUBLE,
-            target_max DOUBLE,
-            unit VARCHAR,
-            frequency VARCHAR,
-            critical BOOLEAN,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-
     targets = [
         ("PIC", None, 20, "mmHg", "Continuo", True),
         ("CPP", 60, 70, "mmHg", "Continuo", True),
@@ -205,31 +189,18 @@ SIGNOS DE ALARMA INMEDIATOS:
             VALUES (?, ?, ?, ?, ?, ?)
         """, target_data)
 
-    # Actualizar recomendaciones de diálisis
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS dialysis_recommendations (
-            id INTEGER PRIMARY KEY,
-            date DATE,
-            mode VARCHAR,
-            parameters VARCHAR,
-            rationale VARCHAR,
-            priority VARCHAR,
-            active BOOLEAN,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-
-    dialysis_id = 1
-    conn.execute("""
-        DELETE FROM dialysis_recommendations
-    """)
+    # Actualizar recomendaciones de diálisis del paciente (la tabla no tiene
+    # secuencia: el id se toma después del mayor de todos los pacientes)
+    conn.execute("DELETE FROM dialysis_recommendations WHERE patient_id = ?", [DEFAULT_PATIENT_ID])
+    dialysis_id = conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM dialysis_recommendations").fetchone()[0]
 
     conn.execute("""
         INSERT INTO dialysis_recommendations
-        (id, date, mode, parameters, rationale, priority, active)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
+        (id, patient_id, date, mode, parameters, rationale, priority, active)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
     """, [
         dialysis_id,
+        DEFAULT_PATIENT_ID,
         current_date,
         "CRRT (preferido) o HD prolongada",
         """CRRT ideal. Si HD intermitente:
@@ -247,14 +218,16 @@ SIGNOS DE ALARMA INMEDIATOS:
 
     # Verificar inserción
     count_events = conn.execute(
-        "SELECT COUNT(*) FROM medical_events WHERE date >= ?",
-        [surgery_date]
+        "SELECT COUNT(*) FROM medical_events WHERE patient_id = ? AND date >= ?",
+        [DEFAULT_PATIENT_ID, surgery_date]
     ).fetchone()[0]
 
     count_conditions = conn.execute(
-        "SELECT COUNT(*) FROM medical_conditions WHERE active = TRUE"
+        "SELECT COUNT(*) FROM medical_conditions WHERE patient_id = ? AND active = TRUE",
+        [DEFAULT_PATIENT_ID]
     ).fetchone()[0]
 
+    # Los objetivos de monitoreo son del protocolo, comunes a todos los pacientes
     count_targets = conn.execute(
         "SELECT COUNT(*) FROM monitoring_targets"
     ).fetchone()[0]
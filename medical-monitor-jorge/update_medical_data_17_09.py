@@ -9,81 +9,26 @@ import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from datetime import datetime
-import duckdb
+from src.core.database import init_database, upsert_lab_results, ALERT_LEVEL_LOOKUP, DEFAULT_PATIENT_ID
+from src.core.models import LabResult
 
 def update_medical_data():
     """Actualiza los datos médicos con información del 17/09/2025."""
 
-    # Conectar a la base de datos
-    conn = duckdb.connect('medical_data.db')
-
-    # Crear secuencias si no existen
-    conn.execute("CREATE SEQUENCE IF NOT EXISTS medications_seq START 1")
-    conn.execute("CREATE SEQUENCE IF NOT EXISTS vital_signs_seq START 1")
-    conn.execute("CREATE SEQUENCE IF NOT EXISTS medical_events_seq START 1")
-
-    # Crear tabla de medicamentos si no existe
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS medications (
-            id INTEGER PRIMARY KEY DEFAULT nextval('medications_seq'),
-            medication_name VARCHAR,
-            type VARCHAR,
-            dose VARCHAR,
-            frequency VARCHAR,
-            route VARCHAR,
-            start_date DATE,
-            end_date DATE,
-            active BOOLEAN,
-            notes VARCHAR,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-
-    # Crear tabla de signos vitales si no existe
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS vital_signs (
-            id INTEGER PRIMARY KEY DEFAULT nextval('vital_signs_seq'),
-            date DATE,
-            time VARCHAR,
-            blood_pressure_systolic INTEGER,
-            blood_pressure_diastolic INTEGER,
-            heart_rate INTEGER,
-            oxygen_saturation INTEGER,
-            temperature DOUBLE,
-            respiratory_rate INTEGER,
-            notes VARCHAR,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-
-    # Crear tabla de eventos médicos si no existe
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS medical_events (
-            id INTEGER PRIMARY KEY DEFAULT nextval('medical_events_seq'),
-            date DATE,
-            time VARCHAR,
-            type VARCHAR,
-            title VARCHAR,
-            description VARCHAR,
-            urgency VARCHAR,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
+    # Conectar a la base de datos (crea o migra las tablas)
+    conn = init_database('medical_data.db')
 
     # Fecha actual
     current_date = datetime(2025, 9, 17)
 
-    # Obtener el siguiente ID para vital_signs
-    max_id = conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM vital_signs").fetchone()[0]
-
     # Insertar signos vitales del 17/09/2025
     conn.execute("""
         INSERT INTO vital_signs
-        (id, date, time, blood_pressure_systolic, blood_pressure_diastolic,
+        (patient_id, date, blood_pressure_systolic, blood_pressure_diastolic,
          heart_rate, oxygen_saturation, notes)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        VALUES (?, CAST(? AS DATE) + CAST(? AS TIME), ?, ?, ?, ?, ?)
     """, [
-        max_id,
+        DEFAULT_PATIENT_ID,
         current_date,
         "15:00",
         185,  # PA sistólica elevada
@@ -93,11 +38,8 @@ def update_medical_data():
         "PA elevada (MAP 126). Monitor SPACELABS Healthcare. Paciente en UCI con soporte respiratorio."
     ])
 
-    # Limpiar medicamentos anteriores e insertar los actuales
-    conn.execute("DELETE FROM medications")
-
-    # Obtener el ID inicial para medicamentos
-    med_id = 1
+    # Limpiar medicamentos anteriores del paciente e insertar los actuales
+    conn.execute("DELETE FROM medications WHERE patient_id = ?", [DEFAULT_PATIENT_ID])
 
     # Medicamentos activos al 17/09/2025
     # Formato: (nombre, dosis, frecuencia, fecha_inicio, fecha_fin, activo, notas)
@@ -127,13 +69,9 @@ def update_medical_data():
     for med_data in medications:
         conn.execute("""
             INSERT INTO medications
-            (id, name, dose, frequency, start_date, end_date, active, notes)
+            (patient_id, name, dose, frequency, start_date, end_date, active, notes)
             VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """, [med_id] + list(med_data))
-        med_id += 1
-
-    # Obtener el siguiente ID para eventos médicos
-    event_id = conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM medical_events").fetchone()[0]
+        """, [DEFAULT_PATIENT_ID] + list(med_data))
 
     # Insertar eventos médicos importantes
     events = [
@@ -183,10 +121,9 @@ Médicos: Dra. Cecilia Colabrese Díaz, Dr. Rubén Deporte Salcedo""",
     for event_data in events:
         conn.execute("""
             INSERT INTO medical_events
-            (id, date, time, type, title, description, urgency)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        """, [event_id] + list(event_data))
-        event_id += 1
+            (patient_id, date, type, title, description, urgency)
+            VALUES (?, CAST(? AS DATE) + CAST(? AS TIME), ?, ?, ?, ?)
+        """, [DEFAULT_PATIENT_ID] + list(event_data))
 
     # Actualizar condiciones médicas
     conn.execute("""
@@ -219,6 +156,7 @@ Médicos: Dra. Cecilia Colabrese Díaz, Dr. Rubén Deporte Salcedo""",
         ("Leucocitos", 6090, "/μL", 4500, 11000, None),
     ]
 
+    results_16 = []
     for test_name, value, unit, ref_min, ref_max, notes in lab_results_16:
         if value < ref_min:
             alert_level = "atencion" if (ref_min - value) / ref_min < 0.2 else "alerta"
@@ -232,17 +170,25 @@ Médicos: Dra. Cecilia Colabrese Díaz, Dr. Rubén Deporte Salcedo""",
         elif notes and ("severa" in notes.lower() or "crítico" in notes.lower()):
             alert_level = "critico"
 
-        conn.execute("""
-            INSERT INTO lab_results
-            (test_name, value, unit, date, reference_min, reference_max, alert_level, notes)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """, [test_name, value, unit, lab_date_16, ref_min, ref_max, alert_level, notes or ""])
+        results_16.append(LabResult(
+            test_name=test_name, value=value, unit=unit, date=lab_date_16,
+            reference_min=ref_min, reference_max=ref_max,
+            alert_level=ALERT_LEVEL_LOOKUP[alert_level], notes=notes or ""
+        ))
+
+    # Carga idempotente: volver a ejecutar el script no duplica los resultados
+    upsert_lab_results(conn, results_16, source="update_medical_data_17_09")
 
     # Verificar inserción
-    count_vitals = conn.execute("SELECT COUNT(*) FROM vital_signs WHERE date = ?", [current_date]).fetchone()[0]
-    count_meds = conn.execute("SELECT COUNT(*) FROM medications WHERE active = TRUE").fetchone()[0]
-    count_events = conn.execute("SELECT COUNT(*) FROM medical_events WHERE date >= ?", [current_date]).fetchone()[0]
-    count_labs = conn.execute("SELECT COUNT(*) FROM lab_results WHERE date = ?", [lab_date_16]).fetchone()[0]
+    patient = [DEFAULT_PATIENT_ID]
+    count_vitals = conn.execute("SELECT COUNT(*) FROM vital_signs WHERE patient_id = ? AND CAST(date AS DATE) = ?",
+                                patient + [current_date]).fetchone()[0]
+    count_meds = conn.execute("SELECT COUNT(*) FROM medications WHERE patient_id = ? AND active = TRUE",
+                              patient).fetchone()[0]
+    count_events = conn.execute("SELECT COUNT(*) FROM medical_events WHERE patient_id = ? AND date >= ?",
+                                patient + [current_date]).fetchone()[0]
+    count_labs = conn.execute("SELECT COUNT(*) FROM lab_results WHERE patient_id = ? AND date = ?",
+                              patient + [lab_date_16]).fetchone()[0]
 
     conn.close()
 